@@ -5,4 +5,7 @@ from .models import StudentProfile
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'created_at']
-    search_fields = ['user__username']
+    list_select_related = ['user']
+    search_fields = ['user__username__exact']
+    search_help_text = 'Exact username.'
+    autocomplete_fields = ['user']
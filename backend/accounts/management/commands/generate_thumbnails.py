@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from campus_events.thumbnails import THUMBNAIL_SPECS, generate_thumbnail, is_stale
+
+
+class Command(BaseCommand):
+    help = 'Backfill thumbnail variants for organization logos and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild every thumbnail, not only missing or stale ones',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows fetched per database round trip',
+        )
+
+    def handle(self, *args, **options):
+        for (model_label, source_field), (thumb_field, size) in THUMBNAIL_SPECS.items():
+            model = apps.get_model(model_label)
+            queryset = model.objects.exclude(
+                (Q(**{source_field: ''}) | Q(**{f'{source_field}__isnull': True}))
+                & Q(**{thumb_field: ''})
+            ).only('pk', source_field, thumb_field)
+
+            built = failed = 0
+            for instance in queryset.iterator(chunk_size=options['batch_size']):
+                if not options['force'] and not is_stale(instance, source_field, thumb_field, size):
+                    continue
+                if generate_thumbnail(model_label, instance.pk, source_field, force=True) is None:
+                    failed += 1
+                else:
+                    built += 1
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{model_label}.{source_field}: {built} thumbnail(s) built, {failed} failed'
+            ))
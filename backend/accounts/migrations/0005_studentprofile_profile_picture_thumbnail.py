@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_studentprofile_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='profile_picture_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='profile_pictures/thumbs/'),
+        ),
+    ]
@@ -11,6 +11,11 @@ class StudentProfile(models.Model):
         blank=True, 
         null=True
     )
+    profile_picture_thumbnail = models.ImageField(
+        upload_to='profile_pictures/thumbs/',
+        blank=True,
+        editable=False
+    )
     pronouns = models.CharField(
         max_length=20,
         blank=True
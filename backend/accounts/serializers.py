@@ -5,6 +5,7 @@ from .models import StudentProfile
 from organizations.models import OrganizationMember
 from organizations.serializers import OrganizationMemberSerializer
 from events.serializers import RSVPSerializer
+from campus_events.loaders import BatchedSerializerMixin, BatchListSerializer, prime_forward
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,7 +15,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class StudentProfileSerializer(serializers.ModelSerializer):
+class StudentProfileSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     rsvps = RSVPSerializer(many=True, read_only=True, source='user.rsvps')
     organizations_board_member = serializers.SerializerMethodField()
@@ -23,6 +24,10 @@ class StudentProfileSerializer(serializers.ModelSerializer):
         model = StudentProfile
         fields = ['id', 'user', 'description', 'profile_picture', 'pronouns', 'created_at', 'updated_at', 'rsvps', 'organizations_board_member']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, profiles):
+        prime_forward(profiles, 'user', self.loaders(User))
 
     def get_organizations_board_member(self, obj):
         board_memberships = OrganizationMember.objects.filter(user=obj.user, is_board_member=True)
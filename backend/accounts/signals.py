@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from campus_events import autocomplete
+from campus_events.thumbnails import schedule_stale_thumbnails
+from .backends import user_cache_key
+from .models import StudentProfile
+
+
+@receiver(post_save, sender=StudentProfile)
+def refresh_profile_picture_thumbnail(sender, instance, **kwargs):
+    """Regenerate the profile picture thumbnail off-request whenever it changes"""
+    schedule_stale_thumbnails(instance)
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logging in only touches last_login; skip re-indexing for it.
+    if not raw and update_fields != frozenset(['last_login']):
+        autocomplete.on_saved('users', instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def unindex_username(sender, instance, **kwargs):
+    autocomplete.on_deleted('users', instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the row CachedModelBackend keeps for this user"""
+    key = user_cache_key(instance.pk)
+    cache.delete(key)
+    # Again after commit, in case a request cached the old row meanwhile.
+    transaction.on_commit(lambda: cache.delete(key))
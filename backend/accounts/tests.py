@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .backends import CachedModelBackend
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('member', password='correct-horse')
+
+    def test_failed_login_checks_password_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, return_value=False) as check:
+            self.assertIsNone(authenticate(username='member', password='wrong'))
+        self.assertEqual(check.call_count, 1)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_serves_user_until_saved(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        # A save in another process would not reach this cache, so nothing is kept.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertNumQueries(1):
+            self.assertIsNone(backend.get_user(self.user.pk))
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CampusEventsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'campus_events'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .slowqueries import install
+
+        connection_created.connect(install, dispatch_uid='campus_events.slowqueries')
@@ -2,6 +2,8 @@
 ASGI config for campus_events project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-Sent Event streams are answered here directly, without entering the
+Django request cycle; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_events.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from .sse import STREAM_PATH, event_stream  # noqa: E402  (needs settings configured)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        return await event_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
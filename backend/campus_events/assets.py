@@ -0,0 +1,218 @@
+"""
+Serving for the built frontend and uploaded media.
+
+Files under ``frontend/dist`` are served with the precompressed ``.br`` /
+``.gz`` sibling written by ``manage.py compress_assets`` when the client
+accepts it. Vite's content-hashed bundles are cached forever, everything
+else is revalidated with ETag / Last-Modified. Media files additionally
+support ``Range`` requests so the browser can resume or seek large uploads.
+The SPA ``index.html`` is rendered per request, with the request's context
+like the ``TemplateView`` it replaced, but its gzip copy and ETag are kept in
+memory until the rendered bytes change.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.template import loader
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Vite writes its content-hashed bundles under assets/.
+HASHED_ASSET_PREFIX = 'assets/'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Ordered by preference when the client accepts several encodings.
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+CHUNK_SIZE = 64 * 1024
+
+_index_cache = None
+
+
+def _etag(stat, suffix=''):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _not_modified(request, etag, stat, cache_control):
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def _set_validators(response, etag, stat, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+
+
+def serve_precompressed(request, fullpath, cache_control):
+    """Serve a file, preferring a precompressed sibling the client accepts"""
+    content_type, _ = mimetypes.guess_type(fullpath)
+    accepted = _accepted_encodings(request)
+    encoding = None
+    stat = os.stat(fullpath)
+    for candidate, extension in PRECOMPRESSED_ENCODINGS:
+        if candidate in accepted and os.path.isfile(fullpath + extension):
+            encoding = candidate
+            fullpath += extension
+            stat = os.stat(fullpath)
+            break
+
+    etag = _etag(stat, f'-{encoding}' if encoding else '')
+    response = _not_modified(request, etag, stat, cache_control)
+    if response is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type or 'application/octet-stream')
+        response['Content-Length'] = stat.st_size
+        if encoding:
+            response['Content-Encoding'] = encoding
+        _set_validators(response, etag, stat, cache_control)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def _parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, or None"""
+    match = RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    if end < start:
+        return None  # e.g. bytes=500-100
+    return (start, end)
+
+
+def _iter_range(fullpath, start, length):
+    with open(fullpath, 'rb') as fileobj:
+        fileobj.seek(start)
+        while length > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file with conditional and Range request support"""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    if not os.path.isfile(fullpath):
+        raise Http404('File not found')
+
+    stat = os.stat(fullpath)
+    etag = _etag(stat)
+    cache_control = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    response = _not_modified(request, etag, stat, cache_control)
+    if response is not None:
+        return response
+
+    content_type, _ = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(stat.st_mtime):
+        range_header = None
+
+    if range_header and ',' in range_header:
+        range_header = None  # multiple ranges: send the whole file rather than multipart
+    if range_header:
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range is None or byte_range[0] >= stat.st_size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(fullpath, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = length
+    else:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        response['Content-Length'] = stat.st_size
+
+    response['Accept-Ranges'] = 'bytes'
+    _set_validators(response, etag, stat, cache_control)
+    return response
+
+
+def _load_index(request):
+    """Render index.html for ``request``, reusing the compressed copy while the output is unchanged"""
+    global _index_cache
+    body = loader.get_template('index.html').render(request=request).encode('utf-8')
+    cached = _index_cache
+    if cached and cached['body'] == body:
+        return cached
+    _index_cache = {
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'etag': f'"index-{hashlib.md5(body).hexdigest()[:16]}"',
+    }
+    return _index_cache
+
+
+def serve_index(request):
+    """Serve the SPA shell, gzipped from memory when the client accepts it"""
+    index = _load_index(request)
+    use_gzip = 'gzip' in _accepted_encodings(request)
+    etag = index['etag'][:-1] + ('-gzip"' if use_gzip else '"')
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(index['gzip'] if use_gzip else index['body'], content_type='text/html; charset=utf-8')
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+    response['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@require_safe
+def frontend(request, path=''):
+    """Serve a built frontend file if one exists, otherwise the SPA shell"""
+    if path and not path.endswith('/'):
+        try:
+            fullpath = safe_join(settings.FRONTEND_DIST_DIR, path)
+        except SuspiciousFileOperation:
+            fullpath = None
+        if fullpath and os.path.isfile(fullpath) and os.path.basename(fullpath) != 'index.html':
+            hashed = path.startswith(HASHED_ASSET_PREFIX)
+            return serve_precompressed(
+                request, fullpath, IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL,
+            )
+    return serve_index(request)
@@ -0,0 +1,266 @@
+"""
+As-you-type suggestions for event titles, organizations and usernames.
+
+Each process keeps a sorted list of ``(key, id)`` pairs per kind, where the
+keys are the normalised name and every later word of it ("career fair"
+is also found by "fair"). A lookup is a ``bisect`` to the first key starting
+with the typed prefix followed by a short forward scan, so it never touches
+the database.
+
+The index is built on first use and patched in place by model signals. Every
+change also bumps a version number in the shared Django cache; a process that
+sees a version it did not produce itself rebuilds, which keeps several
+workers consistent. One thread rebuilds (a single sort, without holding the
+lookup lock) while the others keep answering from the previous index. ``AUTOCOMPLETE_MAX_ENTRIES`` bounds memory:
+once it is reached, new objects are only indexed under their full name, and
+not at all once full names alone fill it.
+"""
+
+import bisect
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY = 'autocomplete:version'
+
+_words = re.compile(r'\w+')
+
+
+def normalize(text):
+    return ' '.join(_words.findall((text or '').casefold()))
+
+
+def _event_source():
+    from events.models import Event
+    from events.recurrence import upcoming_q
+
+    return Event.objects.filter(upcoming_q(timezone.now())).exclude(status='cancelled')
+
+
+def _organization_source():
+    from organizations.models import Organization
+
+    return Organization.objects.filter(is_verified=True)
+
+
+def _user_source():
+    return User.objects.filter(is_active=True)
+
+
+SOURCES = {
+    'events': {
+        'queryset': _event_source,
+        'fields': ['id', 'title', 'start_datetime', 'recurrence', 'recurrence_end'],
+        'names': lambda row: [row['title']],
+        'payload': lambda row: {'id': row['id'], 'title': row['title'],
+                                'start_datetime': row['start_datetime'].isoformat()},
+        # Series stay until their last occurrence; open-ended ones never expire.
+        'expires': lambda row: row['recurrence_end'] if row['recurrence'] else row['start_datetime'],
+    },
+    'organizations': {
+        'queryset': _organization_source,
+        'fields': ['id', 'name', 'slug'],
+        'names': lambda row: [row['name'], row['slug'].replace('-', ' ')],
+        'payload': lambda row: {'id': row['id'], 'name': row['name'], 'slug': row['slug']},
+    },
+    'users': {
+        'queryset': _user_source,
+        'fields': ['id', 'username'],
+        'names': lambda row: [row['username']],
+        'payload': lambda row: {'id': row['id'], 'username': row['username']},
+    },
+}
+
+
+def _keys(names):
+    """The full name plus every word-start suffix, primary key first"""
+    keys = []
+    for name in names:
+        words = normalize(name).split(' ')
+        for start in range(len(words)):
+            key = ' '.join(words[start:])
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+class PrefixIndex:
+    """Sorted ``(key, id)`` pairs for one kind of object"""
+
+    def __init__(self, source):
+        self.source = source
+        self.entries = []
+        self.keys_by_id = {}
+        self.payloads = {}
+        self.expires = {}
+
+    def _store(self, row, budget):
+        """Remember ``row`` and return its keys: at most ``budget`` beyond its full name"""
+        if budget < 0:
+            return []  # no room left, even for the full name
+        pk = row['id']
+        keys = _keys(self.source['names'](row))[:1 + budget]
+        self.keys_by_id[pk] = keys
+        self.payloads[pk] = self.source['payload'](row)
+        if 'expires' in self.source:
+            self.expires[pk] = self.source['expires'](row)
+        return keys
+
+    def add(self, row, budget):
+        """Index one ``row``; at most ``budget`` keys beyond its full name. Returns keys used."""
+        keys = self._store(row, budget)
+        for key in keys:
+            bisect.insort(self.entries, (key, row['id']))
+        return len(keys)
+
+    def remove(self, pk):
+        for key in self.keys_by_id.pop(pk, ()):
+            position = bisect.bisect_left(self.entries, (key, pk))
+            if position < len(self.entries) and self.entries[position] == (key, pk):
+                del self.entries[position]
+        self.payloads.pop(pk, None)
+        self.expires.pop(pk, None)
+
+    def search(self, prefix, limit, now):
+        results, seen = [], set()
+        position = bisect.bisect_left(self.entries, (prefix,))
+        scanned = 0
+        while position < len(self.entries) and len(results) < limit and scanned < limit * 20:
+            key, pk = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+            scanned += 1
+            if pk in seen:
+                continue
+            seen.add(pk)
+            expires = self.expires.get(pk)
+            if expires is not None and expires < now:
+                continue
+            results.append(self.payloads[pk])
+        return results
+
+
+def build_indexes(rows, limit):
+    """``(indexes, size)`` for ``{kind: rows}``, using at most ``limit`` keys in total"""
+    indexes = {kind: PrefixIndex(SOURCES[kind]) for kind in rows}
+    # Full names first, so every object is findable before suffixes use the budget.
+    size = sum(len(kind_rows) for kind_rows in rows.values())
+    for kind, kind_rows in rows.items():
+        index, pairs = indexes[kind], []
+        for row in kind_rows:
+            keys = index._store(row, limit - size)
+            size += len(keys) - 1
+            pairs.extend((key, row['id']) for key in keys)
+        # One sort rather than an insort per key, which is quadratic.
+        index.entries = sorted(pairs)
+    return indexes, size
+
+
+class Autocomplete:
+    """Per-process set of prefix indexes, one per kind"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._indexes = None
+        self._version = None
+        self._size = 0
+
+    def _shared_version(self):
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        return cache.get(VERSION_KEY)
+
+    def _build(self, version):
+        rows, room = {}, settings.AUTOCOMPLETE_MAX_ENTRIES
+        for kind, source in SOURCES.items():
+            rows[kind] = list(source['queryset']().values(*source['fields'])[:room])
+            room -= len(rows[kind])
+        indexes, size = build_indexes(rows, settings.AUTOCOMPLETE_MAX_ENTRIES)
+        with self._lock:
+            self._indexes, self._version, self._size = indexes, version, size
+        return indexes
+
+    def _current(self):
+        """Indexes to answer from, rebuilt outside ``_lock`` when another process changed something"""
+        version = self._shared_version()
+        with self._lock:
+            indexes = self._indexes
+            if indexes is not None and self._version == version:
+                return indexes
+        # One thread rebuilds; the others keep answering from the old indexes meanwhile.
+        if not self._build_lock.acquire(blocking=indexes is None):
+            return indexes
+        try:
+            with self._lock:
+                if self._indexes is not None and self._version == version:
+                    return self._indexes  # built while we waited
+            return self._build(version)
+        finally:
+            self._build_lock.release()
+
+    def suggest(self, query, limit, kinds=None):
+        prefix = normalize(query)
+        if not prefix:
+            return {kind: [] for kind in kinds or SOURCES}
+        now = timezone.now()
+        indexes = self._current()
+        with self._lock:
+            return {
+                kind: indexes[kind].search(prefix, limit, now)
+                for kind in kinds or SOURCES
+            }
+
+    def _changed(self, apply):
+        with self._lock:
+            try:
+                version = cache.incr(VERSION_KEY)
+            except ValueError:  # evicted from the cache
+                version = None
+            # Only patch in place if nobody else changed anything since our build.
+            in_sync = self._indexes is not None and version is not None and version == self._version + 1
+            if in_sync:
+                apply()
+                self._version = version
+            else:
+                self._indexes = None  # rebuild on next lookup
+
+    def refresh(self, kind, pk):
+        """Re-index one object after it was saved (or stopped qualifying)"""
+        source = SOURCES[kind]
+
+        def apply():
+            index = self._indexes[kind]
+            self._size -= len(index.keys_by_id.get(pk, ()))
+            index.remove(pk)
+            row = source['queryset']().filter(pk=pk).values(*source['fields']).first()
+            if row is not None:
+                budget = settings.AUTOCOMPLETE_MAX_ENTRIES - self._size - 1
+                self._size += index.add(row, budget)
+
+        self._changed(apply)
+
+    def discard(self, kind, pk):
+        def apply():
+            index = self._indexes[kind]
+            self._size -= len(index.keys_by_id.get(pk, ()))
+            index.remove(pk)
+
+        self._changed(apply)
+
+
+autocomplete = Autocomplete()
+
+
+def on_saved(kind, pk):
+    transaction.on_commit(lambda: autocomplete.refresh(kind, pk))
+
+
+def on_deleted(kind, pk):
+    transaction.on_commit(lambda: autocomplete.discard(kind, pk))
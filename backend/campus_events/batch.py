@@ -0,0 +1,120 @@
+"""
+Batched API reads: ``GET /api/batch/?path=/api/auth/check/&path=/api/events/?page=2``.
+
+The SPA used to fire several reads in a row when a page opens, each paying
+for its own round trip, session load and authentication. A batch runs up to
+``BATCH_MAX_REQUESTS`` GET sub-requests inside one request instead: each is
+resolved with the URL resolver and its view called directly on a copy of the
+outer request, so the session, user, database connection and serializer
+loaders (see ``loaders.py``) are shared and middleware runs once.
+
+Every sub-request gets its own entry with its status, a few caching headers
+and its JSON body, embedded as the view rendered it. A sub-request that fails
+(404, a permission error, an exception) only fails its own entry.
+"""
+
+import copy
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, QueryDict
+from django.urls import Resolver404, resolve
+from django.utils.datastructures import MultiValueDict
+
+from .loaders import Loaders
+
+logger = logging.getLogger(__name__)
+
+# Headers of the outer request that must not reach sub-requests
+DROPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+# Headers of sub-responses passed on to the client
+PASSED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+# Catch-all routes that would answer any path with a non-API response
+NOT_BATCHABLE = ('batch', 'frontend', 'media')
+
+
+def sub_request(request, path, query):
+    """A GET request for ``path`` sharing ``request``'s session, user and loaders"""
+    sub = copy.copy(request)
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in request.META.items() if key not in DROPPED_META}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query, HTTP_ACCEPT='application/json')
+    sub.GET = QueryDict(query)
+    sub._post, sub._files = QueryDict(), MultiValueDict()
+    return sub
+
+
+def resolve_api(path):
+    """``(path, match)`` for an API path, or None"""
+    if not path.startswith('/api/'):
+        return None
+    try:
+        match = resolve(path)
+        if match.url_name == 'frontend' and settings.APPEND_SLASH and not path.endswith('/'):
+            path += '/'  # where CommonMiddleware would redirect to
+            match = resolve(path)
+    except Resolver404:
+        return None
+    return None if match.url_name in NOT_BATCHABLE else (path, match)
+
+
+def _error(status, message):
+    return status, {}, json.dumps({'detail': message}).encode()
+
+
+def run(request, url, cookies):
+    """``(status, headers, body)`` of one sub-request; the body is JSON bytes"""
+    parts = urlsplit(url)
+    resolved = resolve_api(parts.path)
+    if resolved is None:
+        return _error(404, 'Not an API path.')
+    path, match = resolved
+    sub = sub_request(request, path, parts.query)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Http404:
+        return _error(404, 'Not found.')
+    except PermissionDenied:
+        return _error(403, 'You do not have permission to perform this action.')
+    except Exception:
+        logger.exception('Batched request for %s failed', url)
+        return _error(500, 'Server error.')
+
+    # Cookies (such as a CSRF token handed out) are set on the batch response.
+    cookies.update(response.cookies)
+    if sub.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        request.META['CSRF_COOKIE'] = sub.META['CSRF_COOKIE']
+        request.META['CSRF_COOKIE_NEEDS_UPDATE'] = True
+
+    if response.streaming:
+        response.close()
+        return _error(406, 'Downloads cannot be batched.')
+    headers = {name: response[name] for name in PASSED_HEADERS if response.has_header(name)}
+    if not response.content:
+        return response.status_code, headers, b'null'
+    if not response.get('Content-Type', '').startswith('application/json'):
+        return _error(406, 'Only JSON responses can be batched.')
+    return response.status_code, headers, response.content
+
+
+def run_batch(request, urls):
+    """The batch response; each sub-request's body is spliced in as rendered"""
+    # One identity map for the whole batch, see loaders.py.
+    request._loaders = getattr(request, '_loaders', None) or Loaders()
+    response = HttpResponse(content_type='application/json')
+    entries = []
+    for url in urls:
+        status, headers, body = run(request, url, response.cookies)
+        entries.append(
+            b'{"path":%s,"status":%d,"headers":%s,"body":%s}'
+            % (json.dumps(url).encode(), status, json.dumps(headers).encode(), body)
+        )
+    response.content = b'{"responses":[' + b','.join(entries) + b']}'
+    return response
@@ -0,0 +1,154 @@
+"""
+Request-scoped batch loading of related objects for serializers.
+
+Serializing a page of events used to fetch each row's category, host
+organization, host user and attendee users one query at a time. Instead, a
+serializer's ``prime()`` now walks the whole page first, hands every key it
+will need to a ``Loader`` and then attaches the results to the instances'
+relation caches. The loader resolves all pending keys of a model with one
+``in_bulk`` and keeps what it fetched for the rest of the request (an
+identity map), so the same user or organization showing up in several
+serializers is read once.
+
+Serializers opt in with ``BatchedSerializerMixin`` and a ``prime(instances)``
+method; the loaders live on the request (or the serializer context when
+there is none). Loaders for reference models (see ``refdata``) start out
+filled from the in-process cache.
+"""
+
+import copy
+
+from rest_framework import serializers
+
+from .refdata import TABLES, reference_data
+
+
+class Loader:
+    """Identity map plus pending-key batch for one model, keyed by ``field``"""
+
+    def __init__(self, model, field='pk', shared=None):
+        self.model = model
+        self.field = field
+        self.objects = {}
+        self.pending = set()
+        self.shared = shared or {}
+
+    def prime(self, keys):
+        """Queue keys to be fetched with the next lookup"""
+        self.pending.update(key for key in keys if key is not None and key not in self.objects)
+
+    def _fetch(self):
+        keys = self.pending - self.objects.keys()
+        self.pending = set()
+        for key in keys & self.shared.keys():
+            # Copies, so per-request relation caches never leak into the shared ones.
+            self.objects[key] = copy.copy(self.shared[key])
+        keys -= self.shared.keys()
+        if not keys:
+            return
+        manager = self.model._default_manager
+        if self.field == 'pk':
+            found = manager.in_bulk(keys)
+        else:
+            attname = self.model._meta.get_field(self.field).attname
+            found = {getattr(obj, attname): obj for obj in manager.filter(**{f'{self.field}__in': keys})}
+        for key in keys:
+            self.objects[key] = found.get(key)  # remember misses too
+
+    def get(self, key):
+        if key is None:
+            return None
+        if key not in self.objects:
+            self.pending.add(key)
+            self._fetch()
+        return self.objects[key]
+
+    def get_many(self, keys):
+        self.prime(keys)
+        self._fetch()
+        return [self.objects[key] for key in keys if self.objects.get(key) is not None]
+
+
+class Loaders:
+    """Every loader of one request, created on demand"""
+
+    def __init__(self):
+        self._loaders = {}
+
+    def __call__(self, model, field='pk'):
+        key = (model, field)
+        if key not in self._loaders:
+            shared = None
+            if field == 'pk' and model._meta.label in TABLES:
+                shared = reference_data.table(model._meta.label)
+            self._loaders[key] = Loader(model, field, shared)
+        return self._loaders[key]
+
+
+def loaders_for(context):
+    """The request's loaders, falling back to the serializer context"""
+    request = context.get('request')
+    holder = getattr(request, '_request', request)
+    if holder is None:
+        return context.setdefault('_loaders', Loaders())
+    if not hasattr(holder, '_loaders'):
+        holder._loaders = Loaders()
+    return holder._loaders
+
+
+def prime_forward(instances, name, loader):
+    """
+    Fetch the ``name`` foreign key of all instances at once and cache it on
+    each; returns the distinct related objects.
+    """
+    if not instances:
+        return []
+    field = instances[0]._meta.get_field(name)
+    missing = [obj for obj in instances if not field.is_cached(obj)]
+    loader.prime(getattr(obj, field.attname) for obj in missing)
+    for obj in missing:
+        field.set_cached_value(obj, loader.get(getattr(obj, field.attname)))
+    related = {}
+    for obj in instances:
+        value = field.get_cached_value(obj)
+        if value is not None:
+            related.setdefault(value.pk, value)
+    return list(related.values())
+
+
+def prime_reverse_one(instances, name, loader):
+    """Cache a reverse one-to-one (e.g. ``user.student_profile``) on all instances"""
+    if not instances:
+        return
+    related = instances[0]._meta.get_field(name)
+    loader.prime(obj.pk for obj in instances)
+    for obj in instances:
+        if not related.is_cached(obj):
+            related.set_cached_value(obj, loader.get(obj.pk))
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, 'all') else data)
+        self.child.prime(instances)
+        return super().to_representation(instances)
+
+
+class BatchedSerializerMixin:
+    """
+    Primes related objects for a whole list (or a lone instance) before rendering.
+
+    Set ``list_serializer_class = BatchListSerializer`` in the serializer's Meta.
+    """
+
+    def prime(self, instances):
+        pass
+
+    @property
+    def loaders(self):
+        return loaders_for(self.context)
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            self.prime([instance])
+        return super().to_representation(instance)
@@ -0,0 +1,61 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip alone still helps
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.html', '.js', '.mjs', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.webmanifest', '.ico',
+}
+MIN_SIZE = 512
+
+
+class Command(BaseCommand):
+    help = 'Write .gz and .br siblings for the built frontend so they can be served precompressed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.FRONTEND_DIST_DIR,
+            help='Directory to compress (defaults to the frontend build output)',
+        )
+
+    def handle(self, *args, **options):
+        root = options['path']
+        if not os.path.isdir(root):
+            self.stderr.write(self.style.ERROR(f'{root} does not exist, run "npm run build" first'))
+            return
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('brotli is not installed, only writing .gz files'))
+
+        written = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                    continue
+                source = os.path.join(dirpath, filename)
+                with open(source, 'rb') as fileobj:
+                    data = fileobj.read()
+                if len(data) < MIN_SIZE:
+                    continue
+
+                variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+                if brotli is not None:
+                    variants.append(('.br', brotli.compress(data, quality=11)))
+                for extension, compressed in variants:
+                    target = source + extension
+                    # Not worth a second request path if it barely shrinks.
+                    if len(compressed) >= len(data) * 0.9:
+                        if os.path.exists(target):
+                            os.remove(target)
+                        continue
+                    with open(target, 'wb') as fileobj:
+                        fileobj.write(compressed)
+                    os.utime(target, ns=(os.stat(source).st_atime_ns, os.stat(source).st_mtime_ns))
+                    written += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} precompressed file(s) under {root}'))
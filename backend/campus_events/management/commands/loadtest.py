@@ -0,0 +1,347 @@
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from http import client as http_client
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from events.models import Event, EventCategory
+from events.recurrence import upcoming_q
+from organizations.models import Organization, OrganizationMember
+
+USERNAME_PREFIX = 'loadtest-'
+PASSWORD = 'loadtest-password'
+ORGANIZATION_SLUG = 'loadtest-society'
+EVENT_TITLE_PREFIX = 'Load test'
+TOPICS = ['career', 'hackathon', 'robotics', 'poetry', 'chess', 'startup', 'research', 'volunteer']
+
+# Scenario name -> (default weight, needs a signed-in student)
+SCENARIOS = {
+    'browse': (40, False),
+    'check_auth': (20, False),
+    'search': (15, False),
+    'rsvp': (15, True),
+    'org': (10, False),
+}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class Client:
+    """One simulated browser: a keep-alive connection plus session and CSRF cookies"""
+
+    def __init__(self, host, port, record):
+        self.host, self.port = host, port
+        self.record = record
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, label, method, path, data=None):
+        headers = {'Accept': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http_client.HTTPConnection(self.host, self.port, timeout=60)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+            for header in response.headers.get_all('Set-Cookie') or []:
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+        except (OSError, http_client.HTTPException) as exc:
+            self.close()
+            self.record(label, time.perf_counter() - started, type(exc).__name__)
+            return None, None
+        self.record(label, time.perf_counter() - started, status)
+        return status, payload
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted mix of browsing, check_auth, search, RSVP bursts and '
+        'organization pages from many concurrent clients against one server '
+        'process, and report throughput, latency percentiles and errors per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent simulated users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds of measured load')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of load before measuring')
+        parser.add_argument('--think-ms', type=float, default=0, help='Pause between scenarios per client')
+        parser.add_argument('--signed-in', type=float, default=0.6,
+                            help='Fraction of clients that log in as students')
+        parser.add_argument('--mix', default='',
+                            help='Scenario weights replacing the default mix, '
+                                 'e.g. "browse=40,check_auth=20,search=15,rsvp=15,org=10"')
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--events', type=int, default=60)
+        parser.add_argument('--hot-events', type=int, default=3,
+                            help='Capacity-limited events that every RSVP burst targets')
+        parser.add_argument('--target', default='',
+                            help='Base URL of an already running server (its database must be this one); '
+                                 'by default runserver is started on a free port')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a repeatable mix')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data')
+        parser.add_argument('--allow-database', action='store_true',
+                            help='Run even though DEBUG is off, writing to the configured database')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['allow_database']:
+            raise CommandError(
+                'DEBUG is off, so this may be a production database. '
+                'Pass --allow-database to seed and load test it anyway.'
+            )
+        weights = self._weights(options['mix'])
+        random.seed(options['seed'])
+        server = None
+        try:
+            self.stdout.write('Seeding data...')
+            dataset = self._seed(options)
+            if options['target']:
+                parts = urlsplit(options['target'])
+                host, port = parts.hostname, parts.port or 80
+            else:
+                host, port = '127.0.0.1', self._free_port()
+                server = self._start_server(host, port)
+            self._run(host, port, dataset, weights, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+            if not options['keep']:
+                self._cleanup()
+
+    def _weights(self, mix):
+        if not mix:
+            return {name: weight for name, (weight, _) in SCENARIOS.items()}
+        weights = dict.fromkeys(SCENARIOS, 0.0)
+        for part in filter(None, (part.strip() for part in mix.split(','))):
+            name, _, weight = part.partition('=')
+            if name not in SCENARIOS:
+                raise CommandError(f'Unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Bad weight in {part!r}')
+        if not any(weights.values()):
+            raise CommandError('At least one scenario needs a positive weight')
+        return weights
+
+    def _seed(self, options):
+        existing = set(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('username', flat=True))
+        password = make_password(PASSWORD)  # hashed once, shared by every student
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{n}', password=password, first_name='Load', last_name=f'Tester {n}')
+            for n in range(options['students']) if f'{USERNAME_PREFIX}{n}' not in existing
+        ])
+        students = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk')[:options['students']]
+        )
+        StudentProfile.objects.bulk_create(
+            [StudentProfile(user=user) for user in students], ignore_conflicts=True,
+        )
+
+        organization, _ = Organization.objects.get_or_create(
+            slug=ORGANIZATION_SLUG,
+            defaults={'name': 'Load Test Society', 'description': 'Generated by manage.py loadtest',
+                      'is_verified': True},
+        )
+        OrganizationMember.objects.bulk_create(
+            [OrganizationMember(organization=organization, user=user) for user in students[::5]],
+            ignore_conflicts=True,
+        )
+
+        categories = list(EventCategory.objects.values_list('pk', flat=True)) or [None]
+        now = timezone.now()
+        events = list(Event.objects.filter(title__startswith=EVENT_TITLE_PREFIX))
+        for n in range(len(events), options['events']):
+            start = now + timedelta(days=1 + n % 30, hours=n % 9)
+            hot = n < options['hot_events']
+            events.append(Event.objects.create(
+                title=f'{EVENT_TITLE_PREFIX} {random.choice(TOPICS)} night {n}',
+                description=f'{random.choice(TOPICS).title()} meetup generated by manage.py loadtest',
+                location='Student Union', start_datetime=start, end_datetime=start + timedelta(hours=2),
+                category_id=random.choice(categories), host_organization=organization,
+                status='published', is_approved=True,
+                capacity=max(options['students'] // 4, 1) if hot else None,
+                has_free_food=n % 3 == 0,
+            ))
+        upcoming = Event.objects.filter(upcoming_q(now)).count()
+        return {
+            'pages': max(1, -(-upcoming // settings.REST_FRAMEWORK['PAGE_SIZE'])),
+            'students': [user.username for user in students],
+            'events': [event.pk for event in events],
+            'hot_events': [event.pk for event in events[:options['hot_events']]] or [events[0].pk],
+            'organization': (organization.pk, organization.slug),
+        }
+
+    def _cleanup(self):
+        Event.objects.filter(title__startswith=EVENT_TITLE_PREFIX).delete()
+        Organization.objects.filter(slug=ORGANIZATION_SLUG).delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _free_port(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            return probe.getsockname()[1]
+
+    def _start_server(self, host, port):
+        manage_py = str(settings.BASE_DIR / 'manage.py')
+        server = subprocess.Popen(
+            [sys.executable, manage_py, 'runserver', f'{host}:{port}', '--noreload'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('runserver exited during startup')
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                self.stdout.write(f'Server (pid {server.pid}) listening on {host}:{port}')
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('runserver did not start within 30s')
+
+    def _scenario(self, name, client, dataset):
+        events = dataset['events']
+        if name == 'browse':
+            client.request('events:list', 'GET', f'/api/events/?page={random.randint(1, min(dataset["pages"], 3))}')
+            if random.random() < 0.5:
+                client.request('events:detail', 'GET', f'/api/events/{random.choice(events)}/')
+            if random.random() < 0.2:
+                client.request('categories', 'GET', '/api/categories/')
+        elif name == 'check_auth':
+            client.request('auth:check', 'GET', '/api/auth/check/')
+        elif name == 'search':
+            topic = random.choice(TOPICS)
+            client.request('autocomplete', 'GET', '/api/autocomplete/?' + urlencode({'q': topic[:3]}))
+            client.request('events:search', 'GET', '/api/events/?' + urlencode({'search': topic}))
+        elif name == 'rsvp':
+            event_id = random.choice(dataset['hot_events'])
+            client.request('events:rsvp', 'POST', f'/api/events/{event_id}/rsvp/', {})
+            if random.random() < 0.3:
+                client.request('events:cancel_rsvp', 'DELETE', f'/api/events/{event_id}/cancel_rsvp/')
+        elif name == 'org':
+            organization_id, slug = dataset['organization']
+            client.request('organizations:detail', 'GET', f'/api/organizations/{slug}/')
+            client.request('events:by_organization', 'GET', f'/api/events/?host_organization={organization_id}')
+
+    def _run(self, host, port, dataset, weights, options):
+        samples = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        lock = threading.Lock()
+        measuring = threading.Event()
+        stop = threading.Event()
+
+        def record(label, seconds, outcome):
+            if not measuring.is_set():
+                return
+            with lock:
+                samples[label].append(seconds)
+                if not isinstance(outcome, int) or outcome >= 400:
+                    errors[label][outcome] += 1
+
+        signed_in_count = int(round(options['clients'] * options['signed_in']))
+        anonymous_mix = {name: weight for name, weight in weights.items() if not SCENARIOS[name][1]}
+
+        def simulate(index):
+            client = Client(host, port, record)
+            mix = weights
+            if index < signed_in_count:
+                username = dataset['students'][index % len(dataset['students'])]
+                status, _ = client.request('auth:login', 'POST', '/api/auth/login/',
+                                           {'username': username, 'password': PASSWORD})
+                if status != 200:
+                    mix = anonymous_mix
+            else:
+                mix = anonymous_mix
+            names, chances = list(mix), list(mix.values())
+            if not any(chances):
+                return
+            try:
+                while not stop.is_set():
+                    self._scenario(random.choices(names, chances)[0], client, dataset)
+                    if options['think_ms']:
+                        time.sleep(options['think_ms'] / 1000)
+            finally:
+                client.close()
+
+        threads = [threading.Thread(target=simulate, args=(n,), daemon=True) for n in range(options['clients'])]
+        self.stdout.write(f'{options["clients"]} clients ({signed_in_count} signed in), '
+                          f'{options["warmup"]:.0f}s warm-up, {options["duration"]:.0f}s measured')
+        for thread in threads:
+            thread.start()
+        time.sleep(options['warmup'])
+        measuring.set()
+        began = time.perf_counter()
+        time.sleep(options['duration'])
+        measuring.clear()
+        elapsed = time.perf_counter() - began
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        self._report(samples, errors, elapsed)
+
+    def _report(self, samples, errors, elapsed):
+        header = f'{"endpoint":<24}{"requests":>9}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}{"errors":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        everything = []
+        for label in sorted(samples):
+            latencies = sorted(seconds * 1000 for seconds in samples[label])
+            everything.extend(latencies)
+            self._row(label, latencies, sum(errors.get(label, {}).values()), elapsed)
+        everything.sort()
+        total_errors = sum(sum(counts.values()) for counts in errors.values())
+        self.stdout.write('-' * len(header))
+        self._row('total', everything, total_errors, elapsed)
+
+        for label in sorted(label for label, counts in errors.items() if counts):
+            detail = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(errors[label].items(), key=str))
+            self.stdout.write(f'  {label} errors -> {detail}')
+        rate = total_errors / len(everything) if everything else 0
+        style = self.style.SUCCESS if rate < 0.01 else self.style.WARNING
+        self.stdout.write(style(f'{len(everything) / elapsed:.1f} req/s overall, error rate {rate:.2%}'))
+
+    def _row(self, label, latencies, error_count, elapsed):
+        self.stdout.write(
+            f'{label:<24}{len(latencies):>9}{len(latencies) / elapsed:>9.1f}'
+            f'{percentile(latencies, 0.50):>9.1f}{percentile(latencies, 0.95):>9.1f}'
+            f'{percentile(latencies, 0.99):>9.1f}{(latencies[-1] if latencies else 0):>9.1f}{error_count:>8}'
+        )
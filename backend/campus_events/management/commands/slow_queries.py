@@ -0,0 +1,83 @@
+import json
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total_ms'],
+    'count': lambda stats: stats['count'],
+    'max': lambda stats: stats['max_ms'],
+    'mean': lambda stats: stats['total_ms'] / stats['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Top slow query fingerprints from the slow-query log (see campus_events/slowqueries.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total')
+        parser.add_argument('--hours', type=float, default=None, help='Only entries from the last N hours')
+        parser.add_argument('--log', default=None, help='Log file to read (default: SLOW_QUERY_LOG)')
+        parser.add_argument('--plans', action='store_true', help='Print the captured query plans')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG
+        since = timezone.now() - timedelta(hours=options['hours']) if options['hours'] else None
+        try:
+            groups = self._aggregate(path, since)
+        except FileNotFoundError:
+            raise CommandError(f'No slow-query log at {path}')
+
+        ranked = sorted(groups.values(), key=SORT_KEYS[options['sort']], reverse=True)[:options['top']]
+        if not ranked:
+            self.stdout.write('No slow queries logged')
+            return
+        self.stdout.write(f'Top {len(ranked)} of {len(groups)} fingerprints by {options["sort"]} '
+                          f'(threshold {settings.SLOW_QUERY_THRESHOLD_MS:g} ms)')
+        for rank, stats in enumerate(ranked, 1):
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank} {stats["fingerprint"]}  count={stats["count"]}  total={stats["total_ms"]:.0f}ms  '
+                f'mean={stats["total_ms"] / stats["count"]:.1f}ms  max={stats["max_ms"]:.1f}ms'
+            ))
+            self.stdout.write(f'  sql: {stats["sql"][:500]}')
+            for label in ('view', 'serializer', 'caller'):
+                for value, count in stats[label].most_common(3):
+                    self.stdout.write(f'  {label}: {value} ({count})')
+            if options['plans'] and stats['plan']:
+                self.stdout.write('  plan:')
+                for line in stats['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+
+    def _aggregate(self, path, since):
+        groups = {}
+        with open(path) as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if since is not None:
+                    logged = parse_datetime(entry.get('time', ''))
+                    if logged is None or logged < since:
+                        continue
+                stats = groups.get(entry['fingerprint'])
+                if stats is None:
+                    stats = groups[entry['fingerprint']] = {
+                        'fingerprint': entry['fingerprint'], 'sql': entry['sql'],
+                        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'plan': None,
+                        'view': Counter(), 'serializer': Counter(), 'caller': Counter(),
+                    }
+                stats['count'] += 1
+                stats['total_ms'] += entry['ms']
+                stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+                stats['plan'] = stats['plan'] or entry.get('plan')
+                for label in ('view', 'serializer', 'caller'):
+                    if entry.get(label):
+                        stats[label][entry[label]] += 1
+        return groups
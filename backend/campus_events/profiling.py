@@ -0,0 +1,156 @@
+"""
+Opt-in per-request profiler.
+
+``ProfilingMiddleware`` is only installed when ``PROFILING_ENABLED`` is set,
+so normal deployments pay nothing for it. Once installed it profiles
+
+* requests from staff users that carry ``?profile=1`` or ``X-Profile: 1``;
+* a random ``PROFILING_SAMPLE_RATE`` fraction of all other requests.
+
+Each profiled request runs under cProfile while a helper thread samples its
+stack every ``PROFILING_SAMPLE_INTERVAL`` seconds. Three files are written
+to ``PROFILING_DIR``: the cProfile stats (``.prof``, for ``pstats`` or
+snakeviz), the samples in collapsed-stack format (``.folded``, for
+flamegraph.pl or speedscope) and the request's metadata (``.json``). Staff
+can browse recent profiles at ``/admin/profiles/``.
+"""
+
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+_unsafe = re.compile(r'[^A-Za-z0-9_.-]+')
+PROFILE_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+EXTENSIONS = ('.prof', '.folded', '.json')
+
+
+def wants_profile(request):
+    flagged = request.GET.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+    if flagged and request.user.is_authenticated and request.user.is_staff:
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+class StackSampler(threading.Thread):
+    """Counts the call stacks of one thread at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in (str(settings.BASE_DIR) + os.sep, *sorted(sys.path, key=len, reverse=True)):
+        if prefix and filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    # ';' separates frames in the collapsed format.
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name or match._func_path) if match else 'unresolved'
+        name = save_profile(profiler, sampler.stacks, {
+            'view': view_name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'user': request.user.pk if request.user.is_authenticated else None,
+            'created_at': timezone.now().isoformat(),
+        })
+        response['X-Profile-Id'] = name
+        return response
+
+
+def save_profile(profiler, stacks, meta):
+    """Write the stats, collapsed stacks and metadata; returns the profile's name"""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    name = f'{stamp}-{_unsafe.sub("_", meta["view"])[:80]}-{uuid.uuid4().hex[:8]}'
+    base = os.path.join(directory, name)
+
+    profiler.dump_stats(base + '.prof')
+    with open(base + '.folded', 'w') as folded:
+        for stack, count in stacks.most_common():
+            folded.write(f'{stack} {count}\n')
+    with open(base + '.json', 'w') as sidecar:
+        json.dump({**meta, 'samples': sum(stacks.values())}, sidecar)
+    prune(directory, settings.PROFILING_KEEP)
+    return name
+
+
+def prune(directory, keep):
+    """Delete all but the ``keep`` most recent profiles"""
+    for name in list_profiles(directory)[keep:]:
+        for extension in EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory=None):
+    """Profile names in ``directory``, newest first"""
+    directory = directory or settings.PROFILING_DIR
+    try:
+        names = [entry[:-len('.json')] for entry in os.listdir(directory) if entry.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+def read_meta(name):
+    with open(os.path.join(settings.PROFILING_DIR, name + '.json')) as sidecar:
+        return json.load(sidecar)
@@ -0,0 +1,155 @@
+"""
+Publish/subscribe fan-out for live updates.
+
+Publishers are ordinary (sync) Django code such as model signals; subscribers
+are asyncio tasks in the ASGI server, one per open event stream. A subscriber
+is just a bounded ``asyncio.Queue``, so thousands of idle streams cost a few
+kilobytes each and never touch the database.
+
+The broker is chosen with ``settings.EVENT_STREAM_BROKER``. The default keeps
+everything inside the current process; ``RedisBroker`` relays messages
+between processes for deployments running several ASGI workers.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ALL = '*'
+
+
+class Subscription:
+    """Queue of messages for one subscriber, owned by its event loop"""
+
+    def __init__(self, topics, loop, maxsize):
+        self.topics = frozenset(topics) or frozenset([ALL])
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Called on the subscriber's loop. A client that cannot keep up is
+        # told to refetch instead of making the queue grow without bound.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {'type': 'resync'}
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fans messages out to subscribers living in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_loop = defaultdict(set)
+
+    def subscribe(self, topics, maxsize=None):
+        subscription = Subscription(
+            topics, asyncio.get_running_loop(), maxsize or settings.EVENT_STREAM_QUEUE_SIZE,
+        )
+        with self._lock:
+            self._by_loop[subscription.loop].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._by_loop.get(subscription.loop)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_loop[subscription.loop]
+
+    def publish(self, topic, message):
+        self.fan_out(topic, message)
+
+    def fan_out(self, topic, message):
+        """Deliver to local subscribers, waking each event loop only once"""
+        with self._lock:
+            loops = [loop for loop, subscribers in self._by_loop.items() if subscribers]
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._deliver_local, loop, topic, message)
+            except RuntimeError:  # loop already closed
+                with self._lock:
+                    self._by_loop.pop(loop, None)
+
+    def _deliver_local(self, loop, topic, message):
+        with self._lock:
+            subscribers = list(self._by_loop.get(loop, ()))
+        for subscription in subscribers:
+            if ALL in subscription.topics or topic in subscription.topics:
+                subscription.deliver(message)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis so every process sees every message.
+
+    Needs the optional ``redis`` package and ``settings.EVENT_STREAM_REDIS_URL``.
+    Each process runs one listener thread that hands received messages to
+    its local subscribers.
+    """
+
+    channel = 'campus_events:stream'
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.EVENT_STREAM_REDIS_URL)
+        self._listener = None
+
+    def subscribe(self, topics, maxsize=None):
+        self._ensure_listener()
+        return super().subscribe(topics, maxsize)
+
+    def publish(self, topic, message):
+        self._redis.publish(self.channel, json.dumps([topic, message]))
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for raw in pubsub.listen():
+            try:
+                topic, message = json.loads(raw['data'])
+            except (TypeError, ValueError):
+                continue
+            self.fan_out(topic, message)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='event-stream-redis', daemon=True)
+                self._listener.start()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENT_STREAM_BROKER)()
+    return _broker
+
+
+def publish(topic, message):
+    """Publish ``message`` (JSON-serialisable) to subscribers of ``topic``"""
+    try:
+        get_broker().publish(topic, message)
+    except Exception:
+        # Live updates are best effort and must never break a write.
+        logger.exception('Publishing to %s failed', topic)
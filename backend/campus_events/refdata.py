@@ -0,0 +1,66 @@
+"""
+In-process cache of rarely changing reference data.
+
+Event categories and verified organizations change a few times a semester
+but are rendered on every event row. Each process keeps them in memory and
+checks one version number in the shared Django cache to learn that another
+process changed them; model signals bump that number. ``Loaders`` seeds its
+identity maps from here, so serializers resolve these objects without a
+query.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'refdata:version'
+
+
+def _categories():
+    from events.models import EventCategory
+
+    return EventCategory.objects.in_bulk()
+
+
+def _verified_organizations():
+    from organizations.models import Organization
+
+    return Organization.objects.filter(is_verified=True).in_bulk()
+
+
+TABLES = {
+    'events.EventCategory': _categories,
+    'organizations.Organization': _verified_organizations,
+}
+
+
+class ReferenceData:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._tables = {}
+
+    def version(self):
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        return cache.get(VERSION_KEY)
+
+    def table(self, label):
+        """``{pk: instance}`` for a reference model; treat the instances as read-only"""
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                self._tables, self._version = {}, version
+            if label not in self._tables:
+                self._tables[label] = TABLES[label]()
+            return self._tables[label]
+
+    def invalidate(self):
+        """Make every process reload reference data on its next lookup"""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+reference_data = ReferenceData()
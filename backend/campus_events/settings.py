@@ -20,6 +20,9 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Output of `npm run build` in the frontend package
+FRONTEND_DIST_DIR = os.path.join(BASE_DIR.parent, 'frontend', 'dist')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -45,6 +48,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'corsheaders',
+    'campus_events',
+    'taskqueue',
     'accounts',
     'events',
     'organizations',
@@ -66,7 +71,7 @@ ROOT_URLCONF = 'campus_events.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR.parent, 'frontend', 'dist')],
+        'DIRS': [FRONTEND_DIST_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -88,6 +93,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # writers queue on the busy timeout instead of failing with
+            # "database is locked" when a read upgrades to a write (as in
+            # occurrence seat claims). Django only sets this per connection;
+            # it costs little since the atomic blocks here all write (bar the
+            # slow-query EXPLAIN) and autocommit reads never open a transaction.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -128,7 +143,7 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [
-    os.path.join(BASE_DIR.parent, 'frontend', 'dist'),
+    FRONTEND_DIST_DIR,
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
@@ -191,3 +206,182 @@ GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Browser cache lifetime for uploaded media. Uploads get unique file names,
+# so a day is safe; built frontend bundles are cached as immutable instead.
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Neighbours kept per event by `manage.py build_recommendations`
+RECOMMENDATIONS_TOP_K = 20
+
+# Trending ranking: each RSVP's weight halves every TRENDING_HALF_LIFE_HOURS.
+# Scores are stored relative to an epoch that starts at TRENDING_EPOCH;
+# `manage.py recompute_trending` moves it to the present once it is older
+# than TRENDING_REBASE_DAYS, keeping the stored values small.
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_EPOCH = '2025-01-01T00:00:00+00:00'
+TRENDING_REBASE_DAYS = 30
+
+# QR check-in: attendance marks are written in bulk once this many are
+# pending or the oldest has waited this many seconds.
+CHECKIN_FLUSH_SIZE = 200
+CHECKIN_FLUSH_INTERVAL = 2.0
+# Largest offline batch a scanner may upload in one request
+CHECKIN_MAX_BATCH = 5000
+# Check-in tokens stop working this many hours after the event (occurrence) ends.
+CHECKIN_TOKEN_GRACE_HOURS = 12
+
+# Live event updates over Server-Sent Events (served by asgi.py). Use
+# 'campus_events.pubsub.RedisBroker' with EVENT_STREAM_REDIS_URL when
+# running more than one ASGI worker process.
+EVENT_STREAM_BROKER = os.environ.get('EVENT_STREAM_BROKER', 'campus_events.pubsub.InProcessBroker')
+EVENT_STREAM_REDIS_URL = os.environ.get('EVENT_STREAM_REDIS_URL', 'redis://localhost:6379/0')
+EVENT_STREAM_QUEUE_SIZE = 100
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_RETRY_MS = 5000
+
+# Background tasks (`manage.py run_worker`). With TASK_QUEUE_EAGER tasks run
+# inline when enqueued, which is handy for local development without a worker.
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER', '') == '1'
+TASK_QUEUE_THREADS = 4
+TASK_QUEUE_POLL_INTERVAL = 1.0
+TASK_QUEUE_MAX_ATTEMPTS = 5
+TASK_QUEUE_RETRY_BASE = 10  # seconds, doubled on every retry
+TASK_QUEUE_RETRY_MAX = 60 * 60
+TASK_QUEUE_VISIBILITY_TIMEOUT = 15 * 60  # running this long means the worker died
+TASK_QUEUE_KEEP_DONE_DAYS = 7
+
+# Email. With DEBUG, messages are written to files unless EMAIL_BACKEND says
+# otherwise; without it they go out over SMTP (configure EMAIL_HOST etc.).
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.filebased.EmailBackend' if DEBUG else 'django.core.mail.backends.smtp.EmailBackend',
+)
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'CampusBuzz <no-reply@campusbuzz.local>')
+
+# Attendee notifications: edits within this many seconds become one email,
+# sent to this many recipients per background task.
+EVENT_NOTIFICATION_WINDOW = 5 * 60
+EVENT_NOTIFICATION_CHUNK_SIZE = 200
+
+# Cache. Per-process memory by default; set REDIS_CACHE_URL when running more
+# than one server process so invalidations (e.g. of event listings) are shared.
+if os.environ.get('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_CACHE_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Whether every server process sees the same cache. Caches that are only
+# invalidated by the process making a change are skipped when it does not.
+SHARED_CACHE = bool(os.environ.get('REDIS_CACHE_URL'))
+
+# Seconds a cached event list page or facet count may be served; writes
+# invalidate them sooner.
+EVENT_LIST_CACHE_TIMEOUT = 60
+
+# Search-box autocomplete index (kept in memory by every server process)
+AUTOCOMPLETE_MAX_ENTRIES = 500000
+AUTOCOMPLETE_DEFAULT_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+# Browser/CDN lifetime of reference data responses such as /api/categories/.
+# Clients revalidate with the ETag afterwards.
+REFERENCE_DATA_MAX_AGE = 60 * 60
+
+# Sessions and authentication. cached_db serves sessions from the cache and
+# only reads the database on a miss; 'django.contrib.sessions.backends.signed_cookies'
+# avoids server-side storage entirely. Expired rows are removed by
+# `manage.py purge_sessions`.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# CachedModelBackend only caches users with a SHARED_CACHE; otherwise it
+# behaves like ModelBackend. Listing both would check failed passwords twice.
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Events that ended this many days ago are moved to the archive tables by
+# `manage.py archive_events`. Keep it well beyond the analytics reopen window.
+ARCHIVE_AFTER_DAYS = 365
+
+# Calendar expansion of recurring events (/api/events/occurrences/): default
+# and largest window, in days, and the largest page.
+OCCURRENCE_WINDOW_DAYS = 31
+OCCURRENCE_MAX_WINDOW_DAYS = 366
+OCCURRENCE_MAX_LIMIT = 100
+
+# Roster downloads (CSV/XLSX) are streamed; rows are read and sent this many at a time.
+EXPORT_CHUNK_SIZE = 2000
+
+# Admin changelists show the planner's row estimate instead of running COUNT(*)
+# on unfiltered tables larger than this (PostgreSQL and MySQL only).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+# Opt-in request profiler (campus_events/profiling.py). The middleware is only
+# installed when PROFILING_ENABLED=1; staff then profile a request with ?profile=1
+# or an X-Profile: 1 header, and PROFILING_SAMPLE_RATE profiles that fraction of
+# all requests. Results are listed at /admin/profiles/.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_KEEP = 200
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'campus_events.profiling.ProfilingMiddleware',
+    )
+
+# Slow-query log (campus_events/slowqueries.py): statements slower than this many
+# milliseconds are logged with their caller and query plan; 0 turns it off.
+# Summarise with `manage.py slow_queries`.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'slow_queries.log'))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'campus_events.slowqueries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Delta sync for offline clients (/api/events/changes/, events/sync.py):
+# largest page, how long the change log is kept (older tokens get a fresh
+# snapshot; pruned by `manage.py prune_event_changes`) and, for databases with
+# concurrent writers such as PostgreSQL, how many seconds new changes are held
+# back so one committed late under a lower sequence number is not skipped.
+SYNC_MAX_LIMIT = 500
+SYNC_LOG_RETENTION_DAYS = 30
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '0'))
+
+# Batched reads (/api/batch/, campus_events/batch.py): most sub-requests per batch.
+BATCH_MAX_REQUESTS = 20
+
+# Homepage feed (/api/events/feed/, events/feed.py): events in it, and the
+# snapshot age after which a background rebuild is queued and after which
+# requests rebuild it themselves (the most stale it is ever served).
+FEED_SIZE = 12
+FEED_REFRESH_SECONDS = 60
+FEED_MAX_AGE = 300
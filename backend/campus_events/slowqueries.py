@@ -0,0 +1,152 @@
+"""
+Slow-query log.
+
+An execute wrapper is installed on every database connection (see
+``apps.py``). Statements that take longer than ``SLOW_QUERY_THRESHOLD_MS``
+are written as one JSON line to the ``campus_events.slowqueries`` logger
+(``SLOW_QUERY_LOG`` by default) with:
+
+* a fingerprint: the SQL with literals and ``IN`` lists normalised away, so
+  the same ORM query with different values aggregates together;
+* the view (and viewset action), the serializer and the first project frame
+  that issued it;
+* the query plan, captured with ``EXPLAIN`` the first time this process sees
+  the fingerprint.
+
+``manage.py slow_queries`` aggregates the log by fingerprint.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+_local = threading.local()
+_explained = set()
+_explained_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """``(id, normalized_sql)`` for grouping executions of the same statement shape"""
+    normalized = sql
+    for pattern, replacement in _NORMALIZE:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+def _project_path(filename):
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base) and 'site-packages' not in filename and not filename.endswith('slowqueries.py'):
+        return filename[len(base):]
+    return None
+
+
+def callers(frame):
+    """The view, serializer and first project frame on the stack above ``frame``"""
+    from django.views import View
+    from rest_framework.serializers import BaseSerializer
+
+    view = serializer = caller = None
+    while frame is not None and not (view and serializer and caller):
+        if caller is None:
+            path = _project_path(frame.f_code.co_filename)
+            if path:
+                caller = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        owner = frame.f_locals.get('self') if 'self' in frame.f_code.co_varnames else None
+        if serializer is None and isinstance(owner, BaseSerializer):
+            serializer = type(owner).__name__
+        if view is None and isinstance(owner, View):
+            cls = type(owner)
+            view = f'{cls.__module__}.{cls.__name__}'
+            if getattr(owner, 'action', None):
+                view += f'.{owner.action}'
+        frame = frame.f_back
+    return view, serializer, caller
+
+
+def explain(connection, sql, params):
+    """The plan for a SELECT as text, or None"""
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """Execute wrapper that logs statements slower than the threshold"""
+    if getattr(_local, 'active', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            _local.active = True
+            try:
+                _record(context['connection'], sql, params, many, elapsed_ms)
+            except Exception:
+                logger.exception('Could not record a slow query')
+            finally:
+                _local.active = False
+
+
+def _record(connection, sql, params, many, elapsed_ms):
+    key, normalized = fingerprint(sql)
+    view, serializer, caller = callers(sys._getframe(2))
+    entry = {
+        'time': timezone.now().isoformat(),
+        'fingerprint': key,
+        'sql': normalized[:4000],
+        'ms': round(elapsed_ms, 2),
+        'db': connection.alias,
+        'view': view,
+        'serializer': serializer,
+        'caller': caller,
+    }
+    with _explained_lock:
+        first_sight = key not in _explained
+        _explained.add(key)
+    if first_sight and not many and not connection.needs_rollback:
+        entry['plan'] = explain(connection, sql, params)
+    logger.warning(json.dumps(entry))
+
+
+def install(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the wrapper to new connections"""
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0 and slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
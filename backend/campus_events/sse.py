@@ -0,0 +1,95 @@
+"""
+Server-Sent Events stream of event and RSVP changes.
+
+This is a bare ASGI handler mounted in ``asgi.py`` ahead of Django, so an
+open stream holds no request thread, middleware state or database
+connection; it only waits on its pub/sub queue.
+
+    GET /api/events/stream/            every event
+    GET /api/events/stream/?ids=3,7    only events 3 and 7
+"""
+
+import asyncio
+import itertools
+import json
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+from .pubsub import get_broker
+
+STREAM_PATH = '/api/events/stream/'
+MAX_TOPICS = 100
+
+_event_ids = itertools.count(1)
+
+
+def _topics(query_string):
+    params = parse_qs(query_string.decode('latin-1'))
+    ids = ','.join(params.get('ids', []))
+    return {f'event:{value}' for value in ids.split(',') if value.strip().isdigit()}
+
+
+async def _send_text(send, text):
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+
+async def _plain_response(send, status, text):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8')})
+
+
+async def event_stream(scope, receive, send):
+    """ASGI app streaming change deltas as ``text/event-stream``"""
+    if scope['method'] not in ('GET', 'HEAD'):
+        return await _plain_response(send, 405, 'Method not allowed')
+    topics = _topics(scope.get('query_string', b''))
+    if len(topics) > MAX_TOPICS:
+        return await _plain_response(send, 400, f'At most {MAX_TOPICS} ids per stream')
+
+    broker = get_broker()
+    subscription = broker.subscribe(topics)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await _send_text(send, f'retry: {settings.EVENT_STREAM_RETRY_MS}\n\n')
+
+        while not disconnected.is_set():
+            getter = asyncio.ensure_future(subscription.get())
+            stopper = asyncio.ensure_future(disconnected.wait())
+            done, _ = await asyncio.wait(
+                {getter, stopper}, timeout=settings.EVENT_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            stopper.cancel()
+            if getter not in done:
+                getter.cancel()
+                if not disconnected.is_set():
+                    await _send_text(send, ': keep-alive\n\n')
+                continue
+            message = getter.result()
+            data = json.dumps(message, separators=(',', ':'))
+            await _send_text(send, f'id: {next(_event_ids)}\nevent: {message["type"]}\ndata: {data}\n\n')
+    except OSError:
+        pass  # client went away mid-write
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+    if not disconnected.is_set():
+        await send({'type': 'http.response.body', 'body': b''})
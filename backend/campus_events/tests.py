@@ -0,0 +1,172 @@
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from events.models import Event
+from organizations.models import Organization, OrganizationDailyStats
+
+from . import assets
+from .admin_utils import DateProbeQuerySet, EstimatedCountPaginator
+from .autocomplete import Autocomplete, build_indexes
+
+
+def user_rows(count):
+    return [{'id': pk, 'username': f'student {pk:07d}'} for pk in range(count)]
+
+
+class AutocompleteIndexTests(TestCase):
+    def test_lookups(self):
+        indexes, size = build_indexes({'users': user_rows(3)}, limit=100)
+        users = indexes['users']
+        now = timezone.now()
+        self.assertEqual(size, 6)
+        self.assertEqual([row['id'] for row in users.search('student', 10, now)], [0, 1, 2])
+        # Later words are indexed too.
+        self.assertEqual(users.search('0000002', 10, now), [{'id': 2, 'username': 'student 0000002'}])
+        self.assertEqual(users.search('nobody', 10, now), [])
+
+        # Single-object refreshes keep the entries sorted.
+        users.add({'id': 9, 'username': 'alumni 0000001'}, budget=10)
+        self.assertEqual(users.entries, sorted(users.entries))
+        self.assertEqual([row['id'] for row in users.search('0000001', 10, now)], [1, 9])
+        users.remove(9)
+        self.assertEqual(users.search('alumni', 10, now), [])
+
+    def test_budget_bounds_keys(self):
+        indexes, size = build_indexes({'users': user_rows(10)}, limit=12)
+        self.assertEqual(size, 12)
+        self.assertEqual(len(indexes['users'].entries), 12)
+        # Every object stays findable by its full name.
+        self.assertEqual(len(indexes['users'].search('student', 20, timezone.now())), 10)
+
+    def test_build_is_not_quadratic(self):
+        rows = user_rows(250000)
+        started = time.perf_counter()
+        indexes, size = build_indexes({'users': rows}, limit=500000)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(size, 500000)
+        # Inserting the same 500k keys one by one takes well over ten seconds.
+        self.assertLess(elapsed, 5)
+
+
+class AutocompleteTests(TestCase):
+    def test_suggest(self):
+        User.objects.create_user('carmen')
+        Organization.objects.create(name='Chess Club', slug='chess-club', is_verified=True)
+        Organization.objects.create(name='Chemistry Society', slug='chemistry-society')
+
+        with override_settings(AUTOCOMPLETE_MAX_ENTRIES=100):
+            result = Autocomplete().suggest('c', 8)
+        self.assertEqual([org['name'] for org in result['organizations']], ['Chess Club'])
+        self.assertEqual([user['username'] for user in result['users']], ['carmen'])
+
+
+class AssetTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with open(os.path.join(self.tmp.name, 'clip.bin'), 'wb') as fileobj:
+            fileobj.write(bytes(range(100)))
+        with open(os.path.join(self.tmp.name, 'index.html'), 'w') as fileobj:
+            fileobj.write('<p>{{ request.path }}</p>')
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [self.tmp.name],
+            'OPTIONS': {'context_processors': ['django.template.context_processors.request']},
+        }]
+        override = override_settings(MEDIA_ROOT=self.tmp.name, FRONTEND_DIST_DIR=self.tmp.name, TEMPLATES=templates)
+        override.enable()
+        self.addCleanup(override.disable)
+        assets._index_cache = None
+
+    def test_ranges(self):
+        response = self.client.get('/media/clip.bin', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(self.client.get('/media/clip.bin', HTTP_RANGE='bytes=500-').status_code, 416)
+
+        # Multiple ranges are ignored rather than answered with multipart.
+        response = self.client.get('/media/clip.bin', HTTP_RANGE='bytes=0-9,20-29')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+
+    def test_index_is_rendered_with_the_request(self):
+        first = self.client.get('/events/42')
+        self.assertEqual(first.content, b'<p>/events/42</p>')
+        second = self.client.get('/about/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        etag = second['ETag'].replace('-gzip', '')
+        self.assertNotEqual(first['ETag'], etag)
+        self.assertEqual(self.client.get('/about/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+def make_event(title, start):
+    return Event.objects.create(
+        title=title, description='d', location='Campus', start_datetime=start, end_datetime=start + timedelta(hours=1),
+    )
+
+
+class ScalableAdminTests(TestCase):
+    def test_date_probes_match_distinct_dates(self):
+        for day in (datetime(2024, 1, 31, 23, 30), datetime(2024, 3, 2, 9), datetime(2025, 3, 2, 18)):
+            make_event('Talk', timezone.make_aware(day))
+        probed = DateProbeQuerySet(Event)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    list(probed.datetimes('start_datetime', kind)),
+                    list(Event.objects.datetimes('start_datetime', kind)),
+                )
+        club = Organization.objects.create(name='Chess Club', slug='chess-club')
+        for day in ('2023-12-31', '2024-01-01', '2024-02-29'):
+            OrganizationDailyStats.objects.create(organization=club, date=day)
+        self.assertEqual(
+            DateProbeQuerySet(OrganizationDailyStats).dates('date', 'month', order='DESC'),
+            list(OrganizationDailyStats.objects.dates('date', 'month', order='DESC')),
+        )
+        self.assertEqual(DateProbeQuerySet(Event).filter(title='Nothing').datetimes('start_datetime', 'month'), [])
+        with self.assertRaises(ValueError):
+            probed.datetimes('start_datetime', 'week')
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_estimated_count(self):
+        make_event('Talk', timezone.now())
+        with mock.patch('campus_events.admin_utils.estimated_count', return_value=5000) as estimate:
+            self.assertEqual(EstimatedCountPaginator(Event.objects.order_by('pk'), 20).count, 5000)
+            # Filtered lists are counted exactly.
+            self.assertEqual(EstimatedCountPaginator(Event.objects.filter(title='Talk'), 20).count, 1)
+            estimate.return_value = 10
+            self.assertEqual(EstimatedCountPaginator(Event.objects.order_by('pk'), 20).count, 1)
+        # SQLite has no statistics to read.
+        self.assertEqual(EstimatedCountPaginator(Event.objects.order_by('pk'), 20).count, 1)
+
+    def test_numeric_search_also_matches_primary_key(self):
+        event = make_event('Talk', timezone.now())
+        numbered = make_event(f'{event.pk} Gala', timezone.now())
+        model_admin = admin.site._registry[Event]
+        request = RequestFactory().get('/admin/events/event/')
+        results, _ = model_admin.get_search_results(request, Event.objects.all(), str(event.pk))
+        self.assertEqual(set(results), {event, numbered})
+
+
+class LoadTestCommandTests(TestCase):
+    def test_refuses_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--allow-database'):
+            call_command('loadtest')
+        self.assertFalse(User.objects.exists())
+
+    def test_failed_seed_is_cleaned_up(self):
+        with mock.patch.object(Organization.objects, 'get_or_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                call_command('loadtest', '--allow-database', '--students=3', stdout=io.StringIO())
+        # The students created before the failure are removed again.
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
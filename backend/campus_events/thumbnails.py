@@ -0,0 +1,148 @@
+"""
+Thumbnail variants for uploaded images.
+
+Organization logos and profile pictures are uploaded at whatever resolution
+the user picked. Each image field gets a fixed-size, re-encoded variant that
+is generated by the background worker (``manage.py run_worker``), so the
+request that uploaded the image never pays for the resize.
+"""
+
+import logging
+import re
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from events.listcache import bump_list_version
+from taskqueue.queue import enqueue, task
+
+from .refdata import reference_data
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_EXTENSION = 'webp'
+THUMBNAIL_QUALITY = 80
+
+# (app_label.ModelName, source field) -> (thumbnail field, edge length in px)
+THUMBNAIL_SPECS = {
+    ('organizations.Organization', 'logo'): ('logo_thumbnail', 256),
+    ('accounts.StudentProfile', 'profile_picture'): ('profile_picture_thumbnail', 128),
+}
+
+def specs_for(model):
+    """Return [(source_field, thumbnail_field, size)] configured for a model"""
+    label = model._meta.label
+    return [
+        (source, thumb, size)
+        for (model_label, source), (thumb, size) in THUMBNAIL_SPECS.items()
+        if model_label == label
+    ]
+
+
+def thumbnail_name(source_name, size):
+    """Deterministic stem for the variant of a given source file"""
+    path = PurePosixPath(source_name)
+    return f"{path.parent}/thumbs/{path.stem}_{size}.{THUMBNAIL_EXTENSION}"
+
+
+def is_stale(instance, source_field, thumb_field, size):
+    """True when the stored variant was not generated from the current source"""
+    source = getattr(instance, source_field)
+    thumb = getattr(instance, thumb_field)
+    if not source:
+        return bool(thumb)
+    if not thumb:
+        return True
+    expected = PurePosixPath(thumbnail_name(source.name, size))
+    current = PurePosixPath(thumb.name)
+    # Storage appends "_<7 random chars>" when the name is already taken.
+    pattern = re.escape(expected.stem) + r'(_[A-Za-z0-9]{7})?'
+    return current.parent != expected.parent or not re.fullmatch(pattern, current.stem)
+
+
+def render_thumbnail(fileobj, size):
+    """Resize and re-encode an image into a square variant, returning bytes"""
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        image = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+        output = BytesIO()
+        image.save(output, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+    return output.getvalue()
+
+
+@task
+def generate_thumbnail(model_label, pk, source_field, force=False):
+    """Build (or clear) the thumbnail for one image field of one row"""
+    model = apps.get_model(model_label)
+    thumb_field, size = THUMBNAIL_SPECS[(model_label, source_field)]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    if not force and not is_stale(instance, source_field, thumb_field, size):
+        return getattr(instance, thumb_field).name
+
+    source = getattr(instance, source_field)
+    old_thumb = getattr(instance, thumb_field)
+    old_name = old_thumb.name if old_thumb else ''
+    new_name = ''
+
+    if source:
+        try:
+            with source.open('rb') as fileobj:
+                data = render_thumbnail(fileobj, size)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.warning('Could not build thumbnail for %s #%s (%s)', model_label, pk, source.name, exc_info=True)
+            return None
+        new_name = old_thumb.storage.save(thumbnail_name(source.name, size), ContentFile(data))
+
+    # Only write the variant if the source did not change while we worked,
+    # and use update() so that updated_at and post_save stay untouched.
+    updated = model.objects.filter(pk=pk, **{source_field: source.name or ''}).update(**{thumb_field: new_name})
+    if not updated and not source:
+        updated = model.objects.filter(pk=pk, **{f'{source_field}__isnull': True}).update(**{thumb_field: new_name})
+
+    if updated:
+        # update() sends no post_save; drop what caches the old variant URL.
+        transaction.on_commit(reference_data.invalidate)
+        bump_list_version()
+    if updated and old_name and old_name != new_name:
+        old_thumb.storage.delete(old_name)
+    elif not updated and new_name:
+        old_thumb.storage.delete(new_name)
+    return new_name if updated else None
+
+
+def enqueue_thumbnail(model_label, pk, source_field):
+    """Queue a thumbnail job; repeated uploads before it runs collapse into one"""
+    enqueue(
+        generate_thumbnail, model_label, pk, source_field,
+        dedup_key=f'thumbnail:{model_label}:{pk}:{source_field}',
+    )
+
+
+def schedule_stale_thumbnails(instance):
+    """Queue jobs for every image field on ``instance`` whose variant is stale"""
+    label = instance._meta.label
+    for source_field, thumb_field, size in specs_for(type(instance)):
+        if is_stale(instance, source_field, thumb_field, size):
+            enqueue_thumbnail(label, instance.pk, source_field)
+
+
+def variant_url(instance, source_field, request=None):
+    """URL of the thumbnail when it is current, falling back to the original"""
+    thumb_field, size = THUMBNAIL_SPECS[(instance._meta.label, source_field)]
+    source = getattr(instance, source_field)
+    if not source:
+        return None
+    if is_stale(instance, source_field, thumb_field, size):
+        url = source.url
+    else:
+        url = getattr(instance, thumb_field).url
+    return request.build_absolute_uri(url) if request else url
@@ -16,23 +16,25 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include, re_path
-from .views import get_csrf_token
-from django.views.generic import TemplateView, RedirectView
-from django.conf.urls.static import static
+from .views import batch, get_csrf_token, profile_file, profiles, suggest
+from .assets import frontend, serve_media
+from django.views.generic import RedirectView
 from django.conf import settings
 
 urlpatterns = [
     path('admin', RedirectView.as_view(url='/admin/')),
+    path('admin/profiles/', admin.site.admin_view(profiles), name='admin-profiles'),
+    path('admin/profiles/<str:name>.<str:extension>', admin.site.admin_view(profile_file), name='admin-profile-file'),
     path('admin/', admin.site.urls),
     path('api/csrf-token/', get_csrf_token, name='csrf-token'),
+    path('api/autocomplete/', suggest, name='autocomplete'),
+    path('api/batch/', batch, name='batch'),
     path('api/', include('accounts.urls')),
     path('api/', include('organizations.urls')),
     path('api/', include('events.urls')),    
 ]
 
-urlpatterns += static(settings.MEDIA_URL,
-    document_root=settings.MEDIA_ROOT)
-
 urlpatterns += [
-    re_path(r'^(?:.*)/?$', TemplateView.as_view(template_name='index.html')),
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    re_path(r'^(?P<path>.*)$', frontend, name='frontend'),
 ]
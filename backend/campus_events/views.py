@@ -1,7 +1,17 @@
-from django.http import JsonResponse
+import os
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404, JsonResponse
+from django.template.response import TemplateResponse
+from django.utils.cache import add_never_cache_headers
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 
+from .autocomplete import SOURCES, autocomplete
+from .batch import run_batch
+from .profiling import EXTENSIONS, PROFILE_NAME, list_profiles, read_meta
+
 
 @require_http_methods(["GET"])
 @ensure_csrf_cookie
@@ -11,3 +21,58 @@ def get_csrf_token(request):
     token = get_token(request)
     return JsonResponse({'csrftoken': token})
 
+
+
+@require_http_methods(["GET"])
+def suggest(request):
+    """Prefix suggestions for the search box: ?q=car&types=events,organizations&limit=5"""
+    try:
+        limit = int(request.GET.get('limit', settings.AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        limit = settings.AUTOCOMPLETE_DEFAULT_LIMIT
+    limit = min(max(limit, 1), settings.AUTOCOMPLETE_MAX_LIMIT)
+
+    kinds = [kind for kind in request.GET.get('types', '').split(',') if kind in SOURCES] or list(SOURCES)
+    if not request.user.is_authenticated and 'users' in kinds:
+        kinds.remove('users')  # usernames are only suggested to signed-in users
+    return JsonResponse(autocomplete.suggest(request.GET.get('q', ''), limit, kinds))
+
+
+@require_http_methods(["GET"])
+def batch(request):
+    """Several API reads in one round trip: ?path=/api/auth/check/&path=/api/categories/"""
+    paths = request.GET.getlist('path')
+    if not paths or len(paths) > settings.BATCH_MAX_REQUESTS:
+        return JsonResponse({'path': f'Expected 1 to {settings.BATCH_MAX_REQUESTS} paths.'}, status=400)
+    response = run_batch(request, paths)
+    # Entries can be private to the user; each one carries its own caching headers.
+    add_never_cache_headers(response)
+    return response
+
+
+def profiles(request):
+    """Admin page listing recent request profiles (see campus_events/profiling.py)"""
+    rows = []
+    for name in list_profiles()[:settings.PROFILING_KEEP]:
+        try:
+            rows.append({'name': name, **read_meta(name)})
+        except (OSError, ValueError):
+            continue  # pruned or half-written
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': rows,
+        'enabled': settings.PROFILING_ENABLED,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    }
+    return TemplateResponse(request, 'admin/profiles.html', context)
+
+
+def profile_file(request, name, extension):
+    """Download one profile's .prof stats or .folded stacks"""
+    if not PROFILE_NAME.match(name) or f'.{extension}' not in EXTENSIONS:
+        raise Http404
+    path = os.path.join(settings.PROFILING_DIR, f'{name}.{extension}')
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.{extension}')
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Event, EventCategory, RSVP
+
+from campus_events.admin_utils import ScalableAdminMixin
+from .models import ArchivedEvent, Event, EventCategory, EventNotification, EventOccurrence, RSVP
 
 
 @admin.register(EventCategory)
@@ -8,18 +10,58 @@ class EventCategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+class EventOccurrenceInline(admin.TabularInline):
+    model = EventOccurrence
+    extra = 0
+    readonly_fields = ['seats_taken']
+
+
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'host_organization', 'start_datetime', 'modality', 'status', 'is_approved']
     list_filter = ['status', 'is_approved', 'modality', 'category', 'has_free_food', 'has_free_swag']
-    search_fields = ['title', 'description', 'location']
+    list_select_related = ['host_organization']
+    # Prefix match on the indexed title (also used by autocomplete widgets); digits find an id.
+    search_fields = ['title__startswith']
+    search_help_text = 'Start of the title (case-sensitive), or an event id.'
+    autocomplete_fields = ['category', 'host_organization', 'host_user']
     date_hierarchy = 'start_datetime'
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'recurrence_end']
+    inlines = [EventOccurrenceInline]
 
 
 @admin.register(RSVP)
-class RSVPAdmin(admin.ModelAdmin):
-    list_display = ['user', 'event', 'rsvp_at', 'attended']
-    list_filter = ['attended', 'rsvp_at']
-    search_fields = ['user__username', 'event__title']
+class RSVPAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'event', 'occurrence_start', 'status', 'rsvp_at', 'attended']
+    list_filter = ['status', 'attended']
+    list_select_related = ['user', 'event']
+    search_fields = ['user__username__exact', 'event__title__startswith']
+    search_help_text = 'Exact username, start of an event title (case-sensitive), or an RSVP id.'
+    autocomplete_fields = ['user']
+    raw_id_fields = ['event']
     date_hierarchy = 'rsvp_at'
+
+
+@admin.register(EventNotification)
+class EventNotificationAdmin(admin.ModelAdmin):
+    list_display = ['event', 'kind', 'status', 'recipients', 'send_after', 'sent_at']
+    list_filter = ['kind', 'status']
+    list_select_related = ['event']
+    search_fields = ['event__title__startswith']
+    raw_id_fields = ['event']
+    readonly_fields = ['created_at', 'sent_at', 'recipients']
+
+
+@admin.register(ArchivedEvent)
+class ArchivedEventAdmin(admin.ModelAdmin):
+    """Read-only; use `manage.py archive_events --restore` to bring one back"""
+    list_display = ['title', 'host_organization', 'start_datetime', 'archived_at']
+    list_select_related = ['host_organization']
+    search_fields = ['title']
+    date_hierarchy = 'start_datetime'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,114 @@
+"""
+Hot/archive split for past events.
+
+``archive_events`` moves events that ended more than ``ARCHIVE_AFTER_DAYS``
+ago, together with their RSVPs, into ``ArchivedEvent``/``ArchivedRSVP`` one
+batch per transaction, so the live tables and their indexes only carry
+recent and upcoming rows. Rows keep their ids. Listing with
+``include_past=true`` unions both tables in SQL and retrieving an archived id
+falls back to the archive, so API clients do not notice the move.
+"""
+
+from django.db import transaction
+from django.db.models import Q, Value
+
+from .listcache import bump_list_version
+from .models import ArchivedEvent, ArchivedEventOccurrence, ArchivedRSVP, Event, EventOccurrence, RSVP
+from .sync import record_event_changes
+
+EVENT_FIELDS = [field.attname for field in ArchivedEvent._meta.concrete_fields if field.name != 'archived_at']
+RSVP_FIELDS = [field.attname for field in ArchivedRSVP._meta.concrete_fields]
+OCCURRENCE_FIELDS = [field.attname for field in ArchivedEventOccurrence._meta.concrete_fields]
+
+
+def archive_events(ended_before, batch_size=500):
+    """Move events that ended before ``ended_before`` into the archive; returns how many"""
+    moved = 0
+    while True:
+        ids = list(
+            Event.objects.filter(end_datetime__lt=ended_before)
+            # A series is only done once its last occurrence is.
+            .filter(Q(recurrence='') | Q(recurrence_end__lt=ended_before))
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return moved
+        with transaction.atomic():
+            ArchivedEvent.objects.bulk_create(
+                [ArchivedEvent(**row) for row in Event.objects.filter(pk__in=ids).values(*EVENT_FIELDS)]
+            )
+            ArchivedRSVP.objects.bulk_create(
+                [ArchivedRSVP(**row) for row in RSVP.objects.filter(event_id__in=ids).values(*RSVP_FIELDS)],
+                batch_size=1000,
+            )
+            # Cancelled and moved occurrences, and their seat counts, come back on restore.
+            ArchivedEventOccurrence.objects.bulk_create(
+                [ArchivedEventOccurrence(**row)
+                 for row in EventOccurrence.objects.filter(event_id__in=ids).values(*OCCURRENCE_FIELDS)],
+                batch_size=1000,
+            )
+            # Cascades to the RSVPs, occurrences, similarity rows and notifications.
+            Event.objects.filter(pk__in=ids).delete()
+        moved += len(ids)
+
+
+def restore_events(queryset, batch_size=500):
+    """Move the given archived events back into the live tables; returns how many"""
+    moved = 0
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            events = [Event(**row) for row in ArchivedEvent.objects.filter(pk__in=batch).values(*EVENT_FIELDS)]
+            rsvps = [RSVP(**row) for row in ArchivedRSVP.objects.filter(event_id__in=batch).values(*RSVP_FIELDS)]
+            occurrences = [
+                EventOccurrence(**row)
+                for row in ArchivedEventOccurrence.objects.filter(event_id__in=batch).values(*OCCURRENCE_FIELDS)
+            ]
+            # bulk_create stamps auto_now(_add) fields; put the original values back.
+            timestamps = {event.pk: (event.created_at, event.updated_at) for event in events}
+            rsvp_times = {rsvp.pk: rsvp.rsvp_at for rsvp in rsvps}
+            Event.objects.bulk_create(events)
+            RSVP.objects.bulk_create(rsvps, batch_size=1000)
+            EventOccurrence.objects.bulk_create(occurrences, batch_size=1000)
+            for event in events:
+                event.created_at, event.updated_at = timestamps[event.pk]
+            for rsvp in rsvps:
+                rsvp.rsvp_at = rsvp_times[rsvp.pk]
+            Event.objects.bulk_update(events, ['created_at', 'updated_at'], batch_size=1000)
+            RSVP.objects.bulk_update(rsvps, ['rsvp_at'], batch_size=1000)
+            record_event_changes(batch)
+            ArchivedEvent.objects.filter(pk__in=batch).delete()
+        moved += len(batch)
+    if moved:
+        bump_list_version()
+    return moved
+
+
+def as_event(archived):
+    """An unsaved-looking ``Event`` carrying an archived row, for serializers"""
+    event = Event(**{name: getattr(archived, name) for name in EVENT_FIELDS})
+    event._state.adding = False
+    event.is_archived = True
+    return event
+
+
+def union_rows(live, archived, ordering):
+    """
+    ``(pk, ..., is_archived)`` rows of both querysets merged in ``ordering``
+    order by the database, ready to be paginated.
+    """
+    columns = [term.lstrip('-') for term in ordering]
+    live = live.order_by().annotate(is_archived=Value(False)).values_list('pk', *columns, 'is_archived')
+    archived = archived.order_by().annotate(is_archived=Value(True)).values_list('pk', *columns, 'is_archived')
+    return live.union(archived, all=True).order_by(*ordering, 'pk')
+
+
+def load_rows(rows):
+    """Events for rows from ``union_rows``, in the same order"""
+    live_ids = [row[0] for row in rows if not row[-1]]
+    archived_ids = [row[0] for row in rows if row[-1]]
+    live = Event.objects.in_bulk(live_ids)
+    archived = {pk: as_event(obj) for pk, obj in ArchivedEvent.objects.in_bulk(archived_ids).items()}
+    events = [archived.get(row[0]) if row[-1] else live.get(row[0]) for row in rows]
+    return [event for event in events if event is not None]  # moved or deleted meanwhile
@@ -0,0 +1,68 @@
+"""
+Facet counts for the event filter sidebar.
+
+All facets come from one ``GROUP BY`` over the facet columns (one per table
+when archived events are included): the database returns a row per distinct
+combination (far fewer than there are events), and the per-facet totals are
+summed up here.
+"""
+
+from collections import Counter
+
+from django.db.models import Count
+
+from .models import Event
+
+FACET_COLUMNS = [
+    'category', 'category__name',
+    'modality',
+    'has_free_food', 'has_free_swag',
+    'host_organization', 'host_organization__name',
+]
+
+
+def _ranked(counts, names):
+    return [
+        {'id': pk, 'name': names[pk], 'count': count}
+        for pk, count in sorted(counts.items(), key=lambda item: (-item[1], names[item[0]]))
+    ]
+
+
+def compute_facets(*querysets):
+    """Counts per category, modality, perk and host organization within the querysets"""
+    rows = [
+        row
+        for queryset in querysets
+        for row in queryset.order_by().values(*FACET_COLUMNS).annotate(count=Count('id', distinct=True))
+    ]
+
+    total = 0
+    categories, category_names = Counter(), {}
+    organizations, organization_names = Counter(), {}
+    modalities = Counter()
+    free_food = Counter()
+    free_swag = Counter()
+    for row in rows:
+        count = row['count']
+        total += count
+        if row['category'] is not None:
+            categories[row['category']] += count
+            category_names[row['category']] = row['category__name']
+        if row['host_organization'] is not None:
+            organizations[row['host_organization']] += count
+            organization_names[row['host_organization']] = row['host_organization__name']
+        modalities[row['modality']] += count
+        free_food[row['has_free_food']] += count
+        free_swag[row['has_free_swag']] += count
+
+    return {
+        'total': total,
+        'category': _ranked(categories, category_names),
+        'modality': [
+            {'value': value, 'label': label, 'count': modalities[value]}
+            for value, label in Event.MODALITY_CHOICES
+        ],
+        'has_free_food': {'true': free_food[True], 'false': free_food[False]},
+        'has_free_swag': {'true': free_swag[True], 'false': free_swag[False]},
+        'host_organization': _ranked(organizations, organization_names),
+    }
@@ -0,0 +1,193 @@
+"""
+Precomputed homepage feed (``/api/events/feed/``).
+
+The landing page shows the next ``FEED_SIZE`` approved, published events and
+what has free food today, the same for every visitor. Rather than running
+the list pipeline per view, the answer is rendered to JSON bytes once and
+kept in the cache with the time it was built; serving it is one cache read.
+
+The snapshot is rebuilt in the background (the ``rebuild_feed`` task) when an
+event it shows or could show changes, and by ``manage.py rebuild_feed`` on a
+schedule. Served snapshots are never older than ``FEED_MAX_AGE`` seconds:
+past ``FEED_REFRESH_SECONDS`` a rebuild is queued and the old snapshot still
+served, past ``FEED_MAX_AGE`` (or once the day has changed) a request
+rebuilds it itself. Only one request at a time does; the others keep serving
+the old snapshot meanwhile. The age is sent as the ``Age`` header, and
+``feed_status`` reports it for monitoring.
+
+Rebuilds by the worker or the command only reach server processes through a
+shared cache (``SHARED_CACHE``). Without one, event changes mark this
+process's snapshot stale, so its next request rebuilds it, and refreshes are
+done by a request instead of the worker. Other processes only catch up at
+the refresh interval.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from taskqueue.queue import enqueue, task
+
+from .models import Event
+from .recurrence import expand
+from .serializers import SyncEventSerializer
+
+FEED_KEY = 'events:feed'
+REFRESH_KEY = 'events:feed-refresh'
+REBUILD_LOCK_KEY = 'events:feed-rebuilding'
+# Longest a request may hold the rebuild lock
+REBUILD_LOCK_SECONDS = 30
+
+
+def _occurrences(events, single, start, end):
+    """Start-ordered occurrences in [start, end) of the one-off ``single`` and the series among ``events``"""
+    series = list(
+        events.exclude(recurrence='').filter(start_datetime__lt=end)
+        .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start))
+    )
+    return expand(single, series, start, end)
+
+
+def build_feed():
+    """The feed rendered as JSON bytes, with when it was built and the events in it"""
+    built_at, now = time.time(), timezone.now()
+    today = timezone.localdate(now)
+    day_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    day_end = day_start + timedelta(days=1)
+    events = Event.objects.filter(status='published', is_approved=True)
+
+    # One entry per event: a daily series should not fill the whole feed.
+    upcoming, seen = [], set()
+    window_end = now + timedelta(days=settings.OCCURRENCE_WINDOW_DAYS)
+    single = (
+        events.filter(recurrence='', start_datetime__gte=now, start_datetime__lt=window_end)
+        .order_by('start_datetime', 'pk')[:settings.FEED_SIZE]
+    )
+    for occurrence in _occurrences(events, single, now, window_end):
+        if occurrence.event.pk not in seen:
+            seen.add(occurrence.event.pk)
+            upcoming.append(occurrence)
+            if len(upcoming) == settings.FEED_SIZE:
+                break
+    # Today's, including ones already under way.
+    events = events.filter(has_free_food=True)
+    single = (
+        events.filter(recurrence='', start_datetime__lt=day_end, end_datetime__gt=now)
+        .order_by('start_datetime', 'pk')
+    )
+    free_food = [
+        occurrence for occurrence in _occurrences(events, single, day_start, day_end)
+        if occurrence.end > now
+    ]
+
+    distinct = list({occurrence.event.pk: occurrence.event for occurrence in upcoming + free_food}.values())
+    to_datetime = serializers.DateTimeField().to_representation
+
+    def entry(occurrence):
+        return {
+            'event': occurrence.event.pk,
+            'occurrence_start': to_datetime(occurrence.original_start) if occurrence.original_start else None,
+            'start_datetime': to_datetime(occurrence.start),
+            'end_datetime': to_datetime(occurrence.end),
+        }
+
+    body = JSONRenderer().render({
+        'generated_at': to_datetime(now),
+        'events': {event['id']: event for event in SyncEventSerializer(distinct, many=True).data},
+        'upcoming': [entry(occurrence) for occurrence in upcoming],
+        'free_food_today': [entry(occurrence) for occurrence in free_food],
+    })
+    return {'built_at': built_at, 'day': today.isoformat(), 'event_ids': [event.pk for event in distinct], 'body': body}
+
+
+def store_feed():
+    """Build the feed and publish it to the cache; returns the snapshot"""
+    snapshot = build_feed()
+    cache.set(FEED_KEY, snapshot, None)
+    return snapshot
+
+
+@task
+def rebuild_feed():
+    store_feed()
+
+
+def snapshot_age(snapshot):
+    return max(time.time() - snapshot['built_at'], 0)
+
+
+def _rebuild_once(snapshot):
+    """Rebuild unless another request already is (then keep ``snapshot``); returns the one to serve"""
+    if snapshot is not None and not cache.add(REBUILD_LOCK_KEY, 1, REBUILD_LOCK_SECONDS):
+        return snapshot
+    try:
+        return store_feed()
+    finally:
+        cache.delete(REBUILD_LOCK_KEY)
+
+
+def is_expired(snapshot):
+    return (snapshot.get('stale') or snapshot_age(snapshot) > settings.FEED_MAX_AGE
+            or snapshot['day'] != timezone.localdate().isoformat())
+
+
+def current_feed():
+    """``(body, age in seconds)`` of a snapshot within the staleness bound"""
+    snapshot = cache.get(FEED_KEY)
+    if snapshot is None or is_expired(snapshot):
+        snapshot = _rebuild_once(snapshot)
+    elif snapshot_age(snapshot) > settings.FEED_REFRESH_SECONDS and cache.add(REFRESH_KEY, 1, settings.FEED_REFRESH_SECONDS):
+        # One rebuild per interval, however many requests see the stale copy.
+        if settings.SHARED_CACHE:
+            enqueue(rebuild_feed, dedup_key=rebuild_feed.task_name)
+        else:
+            snapshot = _rebuild_once(snapshot)
+    return snapshot['body'], snapshot_age(snapshot)
+
+
+def mark_stale():
+    """Have the next request rebuild this cache's snapshot"""
+    snapshot = cache.get(FEED_KEY)
+    if snapshot is not None:
+        cache.set(FEED_KEY, {**snapshot, 'stale': True}, None)
+
+
+def schedule_rebuild(event):
+    """Queue a rebuild if ``event`` is in the feed or might belong in it"""
+    snapshot = cache.get(FEED_KEY)
+    if snapshot is None:
+        return  # built on the next request
+    shown = event.pk in snapshot['event_ids']
+    candidate = event.status == 'published' and event.is_approved and (
+        event.recurrence or event.end_datetime >= timezone.now()
+    )
+    if not (shown or candidate):
+        return
+    if settings.SHARED_CACHE:
+        enqueue(rebuild_feed, dedup_key=rebuild_feed.task_name)
+    else:
+        # The worker's rebuild would not reach this process's cache.
+        transaction.on_commit(mark_stale)
+
+
+def feed_status():
+    """Snapshot age and size, for monitoring"""
+    snapshot = cache.get(FEED_KEY)
+    if snapshot is None:
+        return {'built': False}
+    return {
+        'built': True,
+        'age_seconds': round(snapshot_age(snapshot), 1),
+        'max_age_seconds': settings.FEED_MAX_AGE,
+        'stale': is_expired(snapshot),
+        'day': snapshot['day'],
+        'events': len(snapshot['event_ids']),
+        'bytes': len(snapshot['body']),
+    }
@@ -0,0 +1,20 @@
+from rest_framework import filters
+
+
+class EventOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that also accepts named orderings such as ``?ordering=trending``"""
+    ordering_aliases = {
+        'trending': ['-trending_score', 'start_datetime'],
+    }
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            fields = []
+            for term in params.split(','):
+                term = term.strip()
+                fields.extend(self.ordering_aliases.get(term, [term]))
+            ordering = self.remove_invalid_fields(queryset, fields, view, request)
+            if ordering:
+                return ordering
+        return self.get_default_ordering(view)
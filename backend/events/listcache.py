@@ -0,0 +1,62 @@
+"""
+Version-stamped caching for event list style responses.
+
+Every cached entry's key embeds the current "list version", a counter kept in
+the Django cache. Any write that can change what a listing shows (an event,
+RSVP, category or host organization being saved or deleted) bumps the
+version, which orphans every entry at once without having to know their
+keys; orphans simply expire. ``EVENT_LIST_CACHE_TIMEOUT`` also bounds how
+stale an entry can get as upcoming events slide into the past.
+
+With more than one server process the default per-process cache cannot see
+other processes' bumps, so configure a shared cache (see ``CACHES``).
+"""
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'events:list-version'
+
+
+def list_version():
+    # Seeded from the clock so a flushed cache never revives an old version.
+    cache.add(VERSION_KEY, time.time_ns(), None)
+    return cache.get(VERSION_KEY) or 0
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:  # evicted; any fresh value differs from the old one
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def bump_list_version():
+    """Invalidate every cached event listing once the current transaction commits"""
+    # Bumping earlier would let a concurrent request cache pre-commit data
+    # under the new version.
+    transaction.on_commit(_bump)
+
+
+def cache_key(prefix, request, per_user=False):
+    """Key for ``request``'s query string under the current list version"""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    # Paginated payloads hold absolute next/previous links, so the origin is part of the key.
+    query = f'{request.scheme}://{request.get_host()}?{query}'
+    digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+    user = request.user.pk if per_user and request.user.is_authenticated else 'anon'
+    return f'events:{prefix}:{list_version()}:{user}:{digest}'
+
+
+def cached(key, build):
+    """Return the cached value for ``key``, computing and storing it on a miss"""
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.EVENT_LIST_CACHE_TIMEOUT)
+    return value
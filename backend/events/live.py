@@ -0,0 +1,26 @@
+"""Deltas pushed to live event streams (see campus_events/sse.py)"""
+
+from django.db import transaction
+
+from campus_events.pubsub import publish
+
+# Fields pushed to live streams when an event changes
+STREAM_FIELDS = [
+    'title', 'location', 'room', 'start_datetime', 'end_datetime', 'modality',
+    'status', 'is_approved', 'capacity', 'seats_taken', 'updated_at',
+]
+
+
+def event_fields(event):
+    """Compact JSON-ready snapshot of the fields clients display live"""
+    fields = {}
+    for name in STREAM_FIELDS:
+        value = getattr(event, name)
+        fields[name] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return fields
+
+
+def publish_event_change(event_id, message):
+    """Publish a delta for one event once the current transaction commits"""
+    message = {'event': event_id, **message}
+    transaction.on_commit(lambda: publish(f'event:{event_id}', message))
@@ -0,0 +1,44 @@
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.archive import archive_events, restore_events
+from events.models import ArchivedEvent
+
+
+class Command(BaseCommand):
+    help = 'Move long-past events and their RSVPs into the archive tables, or restore them (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Archive events that ended more than this many days ago',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Events moved per transaction')
+        parser.add_argument('--restore', type=int, nargs='+', metavar='ID', help='Restore these archived events')
+        parser.add_argument(
+            '--restore-since', type=date.fromisoformat, metavar='YYYY-MM-DD',
+            help='Restore every archived event that ended on or after this date',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['restore'] or options['restore_since']:
+            archived = ArchivedEvent.objects.all()
+            if options['restore']:
+                archived = archived.filter(pk__in=options['restore'])
+            if options['restore_since']:
+                since = datetime.combine(options['restore_since'], datetime.min.time(),
+                                         tzinfo=timezone.get_current_timezone())
+                archived = archived.filter(end_datetime__gte=since)
+            moved = restore_events(archived, batch_size=options['batch_size'])
+            verb = 'Restored'
+        else:
+            cutoff = timezone.now() - timedelta(days=options['days'])
+            moved = archive_events(cutoff, batch_size=options['batch_size'])
+            verb = 'Archived'
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved} event(s) in {elapsed:.2f}s'))
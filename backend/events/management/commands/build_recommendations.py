@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.recommendations import rebuild_similarities
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the event similarity table used by /api/events/recommended/ (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=settings.RECOMMENDATIONS_TOP_K,
+            help='Neighbours to keep per event',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_similarities(top_k=options['top_k'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} event neighbour(s) in {elapsed:.2f}s'))
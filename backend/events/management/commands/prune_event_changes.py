@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.sync import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete old entries of the delta-sync change log (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_LOG_RETENTION_DAYS,
+            help='Keep changes from the last this many days; clients with older tokens resync from scratch',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change(s)'))
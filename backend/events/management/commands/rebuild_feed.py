@@ -0,0 +1,21 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from events.feed import FEED_KEY, snapshot_age, store_feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the homepage feed snapshot (run periodically, e.g. every minute)'
+
+    def handle(self, *args, **options):
+        previous = cache.get(FEED_KEY)
+        started = time.monotonic()
+        snapshot = store_feed()
+        elapsed = time.monotonic() - started
+        age = f'{snapshot_age(previous):.0f}s old' if previous else 'missing'
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the feed ({len(snapshot["event_ids"])} event(s), {len(snapshot["body"])} bytes) '
+            f'in {elapsed * 1000:.0f}ms; the previous snapshot was {age}'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from events.trending import recompute_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores for upcoming events from their RSVPs (run periodically)'
+
+    def handle(self, *args, **options):
+        updated, expired = recompute_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} upcoming event(s), reset {expired} past event(s)'
+        ))
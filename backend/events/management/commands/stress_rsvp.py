@@ -0,0 +1,108 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from events.models import Event, RSVP
+from events.rsvps import AlreadyRSVPed, cancel_rsvp, create_rsvp
+
+USERNAME_PREFIX = 'stress-rsvp-'
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    try:
+        func(*args)
+        error = None
+    except AlreadyRSVPed:
+        error = None
+    except Exception as exc:
+        error = type(exc).__name__
+    finally:
+        connection.close()
+    return started, time.perf_counter(), error
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire many parallel RSVPs and cancellations at a capacity-limited event '
+        'and check that it is never oversubscribed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--capacity', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--cancellations', type=int, default=50,
+                            help='Seated users who cancel while RSVPs are still arriving')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated event and users')
+
+    def handle(self, *args, **options):
+        users = self._users(options['users'])
+        start = timezone.now() + timedelta(days=7)
+        event = Event.objects.create(
+            title='RSVP stress test', description='Generated by manage.py stress_rsvp', location='Nowhere',
+            start_datetime=start, end_datetime=start + timedelta(hours=1), capacity=options['capacity'],
+        )
+        try:
+            self._run(event, users, options)
+        finally:
+            if not options['keep']:
+                event.delete()
+                User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _users(self, count):
+        existing = set(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{n}')
+            for n in range(count) if f'{USERNAME_PREFIX}{n}' not in existing
+        ])
+        return list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk')[:count])
+
+    def _run(self, event, users, options):
+        early = users[:options['cancellations']]
+        jobs = [(create_rsvp, event.pk, user) for user in users]
+        # Early RSVPers cancel halfway through, racing the remaining RSVPs.
+        halfway = len(jobs) // 2
+        jobs[halfway:halfway] = [(cancel_rsvp, event.pk, user) for user in early]
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(lambda job: _timed(*job), jobs))
+        elapsed = time.perf_counter() - began
+
+        event.refresh_from_db()
+        going = RSVP.objects.filter(event=event, status=RSVP.GOING).count()
+        waitlisted = RSVP.objects.filter(event=event, status=RSVP.WAITLISTED).count()
+        errors = [error for _, _, error in results if error]
+        latencies = sorted((end - start) * 1000 for start, end, _ in results)
+
+        self.stdout.write(f'{len(jobs)} operations on {options["threads"]} threads in {elapsed:.2f}s '
+                          f'({len(jobs) / elapsed:.0f} ops/s)')
+        self.stdout.write(f'latency ms: p50={statistics.median(latencies):.1f} '
+                          f'p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}')
+        # Throughput per quarter of the run, to spot collapse under contention.
+        quarters = [0] * 4
+        for _, end, _ in results:
+            quarters[min(int((end - began) / elapsed * 4), 3)] += 1
+        self.stdout.write('ops/s by quarter: ' + ', '.join(f'{n / (elapsed / 4):.0f}' for n in quarters))
+        self.stdout.write(f'capacity={event.capacity} seats_taken={event.seats_taken} '
+                          f'going={going} waitlisted={waitlisted} errors={len(errors)}')
+
+        problems = []
+        if going > event.capacity:
+            problems.append(f'oversubscribed by {going - event.capacity}')
+        if going != event.seats_taken:
+            problems.append(f'seat counter {event.seats_taken} does not match {going} going RSVPs')
+        if waitlisted and going < event.capacity:
+            problems.append('free seats left while users are waitlisted')
+        if errors:
+            problems.append(f'{len(errors)} failed operations: {sorted(set(errors))}')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No oversubscription'))
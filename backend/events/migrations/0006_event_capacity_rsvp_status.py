@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_existing_seats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    RSVP = apps.get_model('events', 'RSVP')
+    counts = RSVP.objects.values_list('event').annotate(total=models.Count('id'))
+    for event_id, total in counts:
+        Event.objects.filter(pk=event_id).update(seats_taken=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_trending_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rsvp',
+            name='status',
+            field=models.CharField(choices=[('going', 'Going'), ('waitlisted', 'Waitlisted')], default='going', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'status', 'rsvp_at'], name='events_rsvp_event_i_ca4ab1_idx'),
+        ),
+        migrations.RunPython(count_existing_seats, migrations.RunPython.noop),
+    ]
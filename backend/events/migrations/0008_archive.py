@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_notifications'),
+        ('organizations', '0010_organizationstats_organizationattendee_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=200)),
+                ('room', models.CharField(blank=True, max_length=100, null=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=14, max_digits=18, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=14, max_digits=18, null=True)),
+                ('start_datetime', models.DateTimeField(db_index=True)),
+                ('end_datetime', models.DateTimeField(db_index=True)),
+                ('modality', models.CharField(choices=[('in-person', 'In-Person'), ('online', 'Online'), ('hybrid', 'Hybrid')], max_length=20)),
+                ('has_free_food', models.BooleanField(default=False)),
+                ('has_free_swag', models.BooleanField(default=False)),
+                ('other_perks', models.TextField(blank=True)),
+                ('subcategory', models.CharField(blank=True, max_length=100)),
+                ('employers_in_attendance', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('seats_taken', models.PositiveIntegerField(default=0)),
+                ('trending_score', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.eventcategory')),
+                ('host_organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organizations.organization')),
+                ('host_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['start_datetime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRSVP',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('rsvp_at', models.DateTimeField()),
+                ('attended', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('going', 'Going'), ('waitlisted', 'Waitlisted')], default='going', max_length=20)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rsvps', to='events.archivedevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'archived RSVP',
+                'ordering': ['-rsvp_at'],
+                'unique_together': {('event', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField()),
+                ('start_datetime', models.DateTimeField(blank=True, help_text='Set when the occurrence was moved', null=True)),
+                ('end_datetime', models.DateTimeField(blank=True, null=True)),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('seats_taken', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'ordering': ['original_start'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedrsvp',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rsvp',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='recurrence',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedrsvp',
+            name='occurrence_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='rsvp',
+            name='occurrence_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='rsvp',
+            constraint=models.UniqueConstraint(condition=models.Q(('occurrence_start__isnull', True)), fields=('event', 'user'), name='unique_rsvp_per_event'),
+        ),
+        migrations.AddConstraint(
+            model_name='rsvp',
+            constraint=models.UniqueConstraint(fields=('event', 'user', 'occurrence_start'), name='unique_rsvp_per_occurrence'),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='events.event'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventoccurrence',
+            unique_together={('event', 'original_start')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_recurring_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='start_datetime',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='rsvp',
+            name='rsvp_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_event_change_log'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='eventchange',
+            name='user',
+        ),
+        migrations.AddField(
+            model_name='eventchange',
+            name='user_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
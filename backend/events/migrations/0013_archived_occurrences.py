@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_event_change_user_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEventOccurrence',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('original_start', models.DateTimeField()),
+                ('start_datetime', models.DateTimeField(blank=True, null=True)),
+                ('end_datetime', models.DateTimeField(blank=True, null=True)),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('seats_taken', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='events.archivedevent')),
+            ],
+            options={
+                'ordering': ['original_start'],
+            },
+        ),
+    ]
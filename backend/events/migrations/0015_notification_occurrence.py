@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_trending_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventnotification',
+            name='occurrence_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.db import models
 
 
@@ -29,13 +30,13 @@ class Event(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField()
     location = models.CharField(max_length=200)
     room = models.CharField(max_length=100, blank=True, null=True)
     latitude = models.DecimalField(max_digits=18, decimal_places=14, null=True, blank=True)
     longitude = models.DecimalField(max_digits=18, decimal_places=14, null=True, blank=True)
-    start_datetime = models.DateTimeField()
+    start_datetime = models.DateTimeField(db_index=True)
     end_datetime = models.DateTimeField()
     modality = models.CharField(max_length=20, choices=MODALITY_CHOICES, default='in-person')
     
@@ -58,6 +59,19 @@ class Event(models.Model):
     # Status and moderation
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     is_approved = models.BooleanField(default=False)  # For site admin approval
+
+    # Capacity; RSVPs beyond it go to the waitlist. Blank means unlimited.
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    # Time-decayed RSVP velocity, see events/trending.py
+    trending_score = models.FloatField(default=0, db_index=True, editable=False)
+
+    # Repeating events: an RFC 5545 RRULE such as "FREQ=WEEKLY;BYDAY=TU;COUNT=12",
+    # expanded from start_datetime at query time (see events/recurrence.py).
+    recurrence = models.CharField(max_length=255, blank=True)
+    # Start of the last occurrence; empty for one-off and open-ended events.
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -66,20 +80,239 @@ class Event(models.Model):
     def __str__(self):
         return self.title
 
+    def clean(self):
+        from .recurrence import parse_rule
+
+        if self.recurrence and self.start_datetime:
+            try:
+                parse_rule(self.recurrence, self.start_datetime)
+            except ValueError as exc:
+                raise ValidationError({'recurrence': str(exc)})
+
     class Meta:
         ordering = ['start_datetime']
 
 
 class RSVP(models.Model):
     """RSVP for an event"""
+    GOING = 'going'
+    WAITLISTED = 'waitlisted'
+    STATUS_CHOICES = [
+        (GOING, 'Going'),
+        (WAITLISTED, 'Waitlisted'),
+    ]
+
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rsvps')
-    rsvp_at = models.DateTimeField(auto_now_add=True)
+    rsvp_at = models.DateTimeField(auto_now_add=True, db_index=True)
     attended = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=GOING)
+    # For recurring events, the rule-generated start of the occurrence this is for.
+    occurrence_start = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        unique_together = ['event', 'user']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], condition=models.Q(occurrence_start__isnull=True),
+                                    name='unique_rsvp_per_event'),
+            models.UniqueConstraint(fields=['event', 'user', 'occurrence_start'], name='unique_rsvp_per_occurrence'),
+        ]
         ordering = ['-rsvp_at']
+        indexes = [models.Index(fields=['event', 'status', 'rsvp_at'])]
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title}"
+
+
+class EventOccurrence(models.Model):
+    """
+    One occurrence of a recurring event that differs from its rule: cancelled,
+    moved, or holding seats. Occurrences without a row are computed on the fly.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='occurrences')
+    # As generated by the rule; RSVPs refer to the occurrence by this value.
+    original_start = models.DateTimeField()
+    start_datetime = models.DateTimeField(null=True, blank=True, help_text="Set when the occurrence was moved")
+    end_datetime = models.DateTimeField(null=True, blank=True)
+    is_cancelled = models.BooleanField(default=False)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = ['event', 'original_start']
+        ordering = ['original_start']
+
+    def __str__(self):
+        return f"{self.event_id} @ {self.original_start:%Y-%m-%d %H:%M}"
+
+
+class EventChange(models.Model):
+    """
+    One entry of the change log read by delta sync (see events/sync.py); the
+    id is the sequence number sync tokens refer to.
+    """
+    # Not foreign keys: tombstones outlive the event, and a user being deleted
+    # still logs the seats their RSVPs free up.
+    event_id = models.BigIntegerField()
+    # Set for RSVP changes, which are also synced to that user.
+    user_id = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.event_id}"
+
+
+class EventSimilarity(models.Model):
+    """Precomputed item-item neighbour from RSVP co-occurrence"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='similar_events')
+    neighbor = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Event Similarities"
+        unique_together = ['event', 'neighbor']
+        ordering = ['event', '-score']
+
+    def __str__(self):
+        return f"{self.event_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+
+class TrendingEpoch(models.Model):
+    """Unix time trending scores are stored relative to; a single row, see events/trending.py"""
+    epoch = models.FloatField()
+
+    def __str__(self):
+        return f"{self.epoch:.0f}"
+
+
+class EventNotification(models.Model):
+    """A change notice for an event's attendees; edits in a short window are coalesced"""
+    KIND_CHOICES = [
+        ('changed', 'Changed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dropped', 'Dropped'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='notifications')
+    # Set for notices about one occurrence of a series; only its RSVPs get them.
+    occurrence_start = models.DateTimeField(null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='changed')
+    changes = models.JSONField(default=dict)  # field -> [old, new]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    send_after = models.DateTimeField()
+    recipients = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['event', 'status'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.event}"
+
+
+class NotificationDelivery(models.Model):
+    """Delivery state of one notification to one attendee"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    notification = models.ForeignKey(EventNotification, on_delete=models.CASCADE, related_name='deliveries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    email = models.EmailField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Notification Deliveries"
+        unique_together = ['notification', 'user']
+        indexes = [models.Index(fields=['notification', 'status'])]
+
+
+class ArchivedEvent(models.Model):
+    """
+    A past event moved out of the live table by ``manage.py archive_events``.
+    It keeps its original id so links and restores stay stable.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    location = models.CharField(max_length=200)
+    room = models.CharField(max_length=100, blank=True, null=True)
+    latitude = models.DecimalField(max_digits=18, decimal_places=14, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=18, decimal_places=14, null=True, blank=True)
+    start_datetime = models.DateTimeField(db_index=True)
+    end_datetime = models.DateTimeField(db_index=True)
+    modality = models.CharField(max_length=20, choices=Event.MODALITY_CHOICES)
+    has_free_food = models.BooleanField(default=False)
+    has_free_swag = models.BooleanField(default=False)
+    other_perks = models.TextField(blank=True)
+    category = models.ForeignKey(EventCategory, on_delete=models.SET_NULL, null=True, related_name='+')
+    subcategory = models.CharField(max_length=100, blank=True)
+    host_organization = models.ForeignKey('organizations.Organization', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    host_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    employers_in_attendance = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Event.STATUS_CHOICES)
+    is_approved = models.BooleanField(default=False)
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    seats_taken = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+    recurrence = models.CharField(max_length=255, blank=True)
+    recurrence_end = models.DateTimeField(null=True, blank=True)
+    # Copied as they were, not refreshed on archive.
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['start_datetime']
+
+
+class ArchivedRSVP(models.Model):
+    """RSVP of an archived event"""
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='rsvps')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    rsvp_at = models.DateTimeField()
+    attended = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=RSVP.STATUS_CHOICES, default=RSVP.GOING)
+    occurrence_start = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'archived RSVP'
+        ordering = ['-rsvp_at']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.event_id}"
+
+
+class ArchivedEventOccurrence(models.Model):
+    """Cancelled, moved or seat-holding occurrence of an archived series"""
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='occurrences')
+    original_start = models.DateTimeField()
+    start_datetime = models.DateTimeField(null=True, blank=True)
+    end_datetime = models.DateTimeField(null=True, blank=True)
+    is_cancelled = models.BooleanField(default=False)
+    seats_taken = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['original_start']
+
+    def __str__(self):
+        return f"{self.event_id} @ {self.original_start:%Y-%m-%d %H:%M}"
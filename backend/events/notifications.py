@@ -0,0 +1,240 @@
+"""
+Attendee notifications when an event is rescheduled, moved or cancelled.
+
+Saving an event only records what changed in a pending ``EventNotification``
+(further edits inside ``EVENT_NOTIFICATION_WINDOW`` are merged into it) and
+queues a background task. When the window closes, the task snapshots the
+recipients with one query and sends in chunks, each chunk over a single mail
+connection. Each delivery row is marked right after its message goes out, so
+a chunk retried after a crash does not resend it.
+
+Moving one occurrence of a series is recorded the same way, scoped to that
+occurrence's RSVPs. Cancelling one snapshots its recipients at once, since
+its RSVPs are removed with it.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.formats import date_format
+
+from taskqueue.queue import enqueue, task
+from .models import Event, EventNotification, NotificationDelivery, RSVP
+
+# Changes to these fields are worth telling attendees about.
+WATCHED_FIELDS = ['start_datetime', 'end_datetime', 'location', 'room', 'status']
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.astimezone(dt_timezone.utc).isoformat()
+    return value
+
+
+def detect_changes(old, event):
+    """Map of watched field -> [old, new] between a values() row and an instance"""
+    changes = {}
+    for field in WATCHED_FIELDS:
+        before, after = _jsonable(old[field]), _jsonable(getattr(event, field))
+        if before == after:
+            continue
+        if field == 'status' and 'cancelled' not in (before, after):
+            continue  # e.g. draft -> published is not news to attendees
+        changes[field] = [before, after]
+    return changes
+
+
+def occurrence_times(override, original_start, duration):
+    """Effective ``(start, end)`` of an occurrence, given its override row or None"""
+    if override is None or override.start_datetime is None:
+        return original_start, original_start + duration
+    return override.start_datetime, override.end_datetime or override.start_datetime + duration
+
+
+def detect_occurrence_changes(previous, occurrence, event):
+    """Map of start/end -> [old, new] between two override rows of one occurrence"""
+    duration = event.end_datetime - event.start_datetime
+    before = occurrence_times(previous, occurrence.original_start, duration)
+    after = occurrence_times(occurrence, occurrence.original_start, duration)
+    return {
+        field: [_jsonable(old), _jsonable(new)]
+        for field, old, new in zip(['start_datetime', 'end_datetime'], before, after)
+        if old != new
+    }
+
+
+def record_changes(event, changes, occurrence_start=None):
+    """
+    Merge ``changes`` into the event's (or one occurrence's) pending
+    notification, creating one if needed
+    """
+    if event.status == 'cancelled' and 'status' not in changes:
+        return  # editing an already cancelled event
+
+    with transaction.atomic():
+        notification = (
+            EventNotification.objects.select_for_update()
+            .filter(event=event, occurrence_start=occurrence_start, status='pending')
+            .first()
+        )
+        if notification is None:
+            notification = EventNotification(
+                event=event, occurrence_start=occurrence_start,
+                send_after=timezone.now() + timedelta(seconds=settings.EVENT_NOTIFICATION_WINDOW),
+            )
+        merged = dict(notification.changes)
+        for field, (before, after) in changes.items():
+            original = merged[field][0] if field in merged else before
+            if original == after:
+                merged.pop(field, None)  # edited back to where it started
+            else:
+                merged[field] = [original, after]
+        notification.changes = merged
+        notification.kind = 'cancelled' if event.status == 'cancelled' else 'changed'
+        if not merged:
+            notification.status = 'dropped'
+        notification.save()
+
+    if notification.status == 'pending':
+        enqueue(
+            send_notification, notification.pk,
+            dedup_key=f'event-notification:{notification.pk}',
+            delay=notification.send_after - timezone.now(),
+        )
+
+
+def notify_occurrence_cancelled(event, occurrence_start):
+    """Tell an occurrence's RSVPs it is cancelled; call before removing them"""
+    with transaction.atomic():
+        # A pending notice about moving it is moot now.
+        EventNotification.objects.filter(
+            event=event, occurrence_start=occurrence_start, status='pending',
+        ).update(status='dropped')
+        notification = EventNotification.objects.create(
+            event=event, occurrence_start=occurrence_start, kind='cancelled',
+            changes={'status': [event.status, 'cancelled']}, send_after=timezone.now(),
+        )
+        snapshot_recipients(notification)
+    enqueue(send_notification, notification.pk, dedup_key=f'event-notification:{notification.pk}')
+
+
+def snapshot_recipients(notification):
+    """Create a delivery row for everyone RSVPed to what ``notification`` is about"""
+    recipients = RSVP.objects.filter(event_id=notification.event_id)
+    if notification.occurrence_start is not None:
+        recipients = recipients.filter(occurrence_start=notification.occurrence_start)
+    # One delivery per user, however many occurrences of a series they RSVPed to.
+    recipients = recipients.values_list('user_id', 'user__email').order_by().distinct()
+    deliveries = [
+        NotificationDelivery(
+            notification_id=notification.pk, user_id=user_id, email=email or '',
+            status='pending' if email else 'skipped',
+        )
+        for user_id, email in recipients
+    ]
+    NotificationDelivery.objects.bulk_create(deliveries, batch_size=1000, ignore_conflicts=True)
+
+
+@task
+def send_notification(notification_id):
+    """Snapshot the recipients of a due notification and fan delivery out in chunks"""
+    with transaction.atomic():
+        claimed = EventNotification.objects.filter(
+            pk=notification_id, status='pending', send_after__lte=timezone.now(),
+        ).update(status='sending')
+        if not claimed:
+            return
+        notification = EventNotification.objects.get(pk=notification_id)
+        snapshot_recipients(notification)
+        # Including any snapshotted earlier, see notify_occurrence_cancelled.
+        recipients = NotificationDelivery.objects.filter(notification_id=notification_id).count()
+        EventNotification.objects.filter(pk=notification_id).update(recipients=recipients)
+
+    chunk = settings.EVENT_NOTIFICATION_CHUNK_SIZE
+    pending = list(
+        NotificationDelivery.objects.filter(notification_id=notification_id, status='pending')
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    if not pending:
+        _finish(notification_id)
+    for start in range(0, len(pending), chunk):
+        ids = pending[start:start + chunk]
+        enqueue(deliver_chunk, notification_id, ids[0], ids[-1],
+                dedup_key=f'event-notification:{notification_id}:{ids[0]}')
+
+
+@task
+def deliver_chunk(notification_id, first_id, last_id):
+    """Send one chunk of a notification over a single mail connection"""
+    notification = EventNotification.objects.select_related('event').get(pk=notification_id)
+    deliveries = list(
+        NotificationDelivery.objects.filter(
+            notification_id=notification_id, status='pending', pk__gte=first_id, pk__lte=last_id,
+        ).values_list('pk', 'email')
+    )
+    if deliveries:
+        subject, body = render_notification(notification)
+        messages = [
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email]) for _, email in deliveries
+        ]
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        try:
+            for (pk, _), message in zip(deliveries, messages):
+                try:
+                    connection.send_messages([message])
+                except Exception:
+                    NotificationDelivery.objects.filter(pk=pk).update(status='failed')
+                else:
+                    NotificationDelivery.objects.filter(pk=pk).update(status='sent', sent_at=timezone.now())
+        finally:
+            connection.close()
+
+    if not NotificationDelivery.objects.filter(notification_id=notification_id, status='pending').exists():
+        _finish(notification_id)
+
+
+def _finish(notification_id):
+    EventNotification.objects.filter(pk=notification_id, status='sending').update(
+        status='sent', sent_at=timezone.now(),
+    )
+
+
+def _display(value):
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is not None:
+        return date_format(timezone.localtime(moment), r'D M j, Y \a\t g:i A')
+    return value or '(none)'
+
+
+def render_notification(notification):
+    """Subject and plain-text body shared by every recipient of a notification"""
+    event = notification.event
+    context = {
+        'event': event,
+        'notification': notification,
+        'cancelled': notification.kind == 'cancelled',
+        'occurrence': _display(_jsonable(notification.occurrence_start)) if notification.occurrence_start else '',
+        'changes': [
+            (field.replace('_', ' '), _display(before), _display(after))
+            for field, (before, after) in notification.changes.items()
+            if field != 'status'
+        ],
+    }
+    if notification.kind == 'cancelled':
+        subject = f'Cancelled: {event.title}'
+    else:
+        subject = f'Updated: {event.title}'
+    return subject, render_to_string('events/event_notification.txt', context)
+
+
+def snapshot_watched_fields(event):
+    """Watched values currently stored for ``event``, or None if it is new"""
+    if event.pk is None:
+        return None
+    return Event.objects.filter(pk=event.pk).values(*WATCHED_FIELDS).first()
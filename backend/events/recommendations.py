@@ -0,0 +1,147 @@
+"""
+"Recommended for you" events.
+
+The model is item-item cosine similarity over the user x event RSVP matrix.
+It is rebuilt periodically by ``manage.py build_recommendations`` and the
+top-K neighbours of every event are stored in ``EventSimilarity``. Serving a
+user's recommendations is then one indexed lookup on the events they RSVPed
+to, merged with small boosts for their organizations and usual categories.
+"""
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, EventSimilarity, RSVP
+from .recurrence import upcoming_q
+
+# Neighbours below this cosine similarity are noise from a single shared RSVP.
+MIN_SCORE = 0.01
+# How many of the user's most recent RSVPs seed the lookup.
+SEED_RSVPS = 50
+ORGANIZATION_BOOST = 1.5
+CATEGORY_BOOST = 1.2
+
+
+def recommendable_events():
+    """Events that may be suggested: upcoming, approved and published"""
+    return Event.objects.filter(
+        upcoming_q(timezone.now()),
+        is_approved=True,
+        status='published',
+    )
+
+
+def compute_neighbors(pairs, candidate_ids, top_k):
+    """
+    Compute the top-K most similar candidate events for every event.
+
+    ``pairs`` is a sequence of (user_id, event_id) RSVPs. Returns a dict of
+    event_id -> [(neighbor_id, score), ...] sorted by descending score.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    if not len(pairs):
+        return {}
+    pairs = np.asarray(pairs, dtype=np.int64)
+    user_ids, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    event_ids, event_index = np.unique(pairs[:, 1], return_inverse=True)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (user_index, event_index)),
+        shape=(len(user_ids), len(event_ids)),
+    )
+    matrix.data[:] = 1  # duplicate pairs collapse to a single RSVP
+
+    is_candidate = np.isin(event_ids, np.fromiter(candidate_ids, dtype=np.int64))
+    if not is_candidate.any():
+        return {}
+    candidate_columns = np.flatnonzero(is_candidate)
+
+    # Co-occurrence counts between every event and every candidate event,
+    # normalised to cosine similarity by each event's RSVP count.
+    co_occurrence = (matrix.T @ matrix[:, candidate_columns]).tocsr()
+    counts = np.asarray(matrix.sum(axis=0)).ravel()
+    norms = np.sqrt(counts)
+    co_occurrence = sparse.diags(1 / norms) @ co_occurrence @ sparse.diags(1 / norms[candidate_columns])
+    co_occurrence = co_occurrence.tocsr()
+
+    neighbors = {}
+    for row in range(co_occurrence.shape[0]):
+        start, end = co_occurrence.indptr[row], co_occurrence.indptr[row + 1]
+        columns = candidate_columns[co_occurrence.indices[start:end]]
+        scores = co_occurrence.data[start:end]
+        keep = (columns != row) & (scores >= MIN_SCORE)
+        columns, scores = columns[keep], scores[keep]
+        if not len(scores):
+            continue
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            columns, scores = columns[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        neighbors[int(event_ids[row])] = [
+            (int(event_ids[column]), float(score))
+            for column, score in zip(columns[order], scores[order])
+        ]
+    return neighbors
+
+
+def rebuild_similarities(top_k=None, batch_size=1000):
+    """Recompute the neighbour table from all RSVPs; returns rows written"""
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    pairs = list(RSVP.objects.values_list('user_id', 'event_id').iterator(chunk_size=10000))
+    candidate_ids = set(recommendable_events().values_list('id', flat=True))
+    neighbors = compute_neighbors(pairs, candidate_ids, top_k)
+
+    computed_at = timezone.now()
+    rows = [
+        EventSimilarity(event_id=event_id, neighbor_id=neighbor_id, score=score, computed_at=computed_at)
+        for event_id, ranked in neighbors.items()
+        for neighbor_id, score in ranked
+    ]
+    with transaction.atomic():
+        EventSimilarity.objects.all().delete()
+        EventSimilarity.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def recommended_events(user, limit=10):
+    """Return up to ``limit`` upcoming events for ``user``, best first"""
+    seeds = list(
+        RSVP.objects.filter(user=user)
+        .order_by('-rsvp_at')
+        .values_list('event_id', 'event__category_id')[:SEED_RSVPS]
+    )
+    organization_ids = set(user.organization_memberships.values_list('organization_id', flat=True))
+    favourite_categories = {
+        category_id for category_id, _ in Counter(c for _, c in seeds if c).most_common(3)
+    }
+
+    scores = defaultdict(float)
+    neighbors = EventSimilarity.objects.filter(
+        event_id__in=[event_id for event_id, _ in seeds]
+    ).values_list('neighbor_id', 'score')
+    for neighbor_id, score in neighbors:
+        scores[neighbor_id] += score
+
+    candidates = recommendable_events().exclude(rsvps__user=user).select_related('category', 'host_organization')
+    if scores:
+        events = list(candidates.filter(id__in=scores.keys()))
+    else:
+        # Cold start: nothing to go on but the user's organizations.
+        events = list(candidates.filter(host_organization_id__in=organization_ids)[:limit])
+        for event in events:
+            scores[event.id] = 1.0
+
+    def rank(event):
+        score = scores[event.id]
+        if event.host_organization_id in organization_ids:
+            score *= ORGANIZATION_BOOST
+        if event.category_id in favourite_categories:
+            score *= CATEGORY_BOOST
+        return (-score, event.start_datetime)
+
+    return sorted(events, key=rank)[:limit]
@@ -0,0 +1,202 @@
+"""
+Recurring events.
+
+A recurring event is one ``Event`` row with an RFC 5545 ``RRULE`` in
+``Event.recurrence``; its ``start_datetime``/``end_datetime`` are those of the
+first occurrence. Occurrences are generated lazily from the rule in the
+campus time zone, so a weekly 6pm meeting stays at 6pm across DST changes.
+``EventOccurrence`` rows exist only for occurrences that were cancelled,
+moved, or hold seats, and RSVPs name their occurrence by its rule-generated
+start (``RSVP.occurrence_start``).
+
+``expand`` merges one-off events and the occurrences of many series into a
+single start-ordered stream without materialising more of any rule than the
+consumer actually reads, so a page of 20 costs about 20 rule steps.
+"""
+
+import heapq
+from datetime import datetime, time
+
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, YEARLY, rrulestr
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import EventOccurrence
+
+ALLOWED_FREQUENCIES = {DAILY, WEEKLY, MONTHLY, YEARLY}
+# Bounds on what a rule may expand to, so no save or request walks a rule for long.
+MAX_OCCURRENCES = 1000
+MAX_RULE_YEARS = 10
+
+
+def upcoming_q(now, prefix=''):
+    """Events that start at ``now`` or later, counting series with occurrences left"""
+    return Q(**{f'{prefix}start_datetime__gte': now}) | (
+        ~Q(**{f'{prefix}recurrence': ''})
+        & (Q(**{f'{prefix}recurrence_end__isnull': True}) | Q(**{f'{prefix}recurrence_end__gte': now}))
+    )
+
+
+def _local(moment):
+    return timezone.localtime(moment).replace(tzinfo=None)
+
+
+def _aware(naive):
+    return naive.replace(tzinfo=timezone.get_current_timezone())
+
+
+def parse_rule(text, start):
+    """The dateutil rule for ``text`` starting at ``start``; raises ValueError if unusable"""
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if not text or '\n' in text or 'DTSTART' in text.upper():
+        raise ValueError('Expected a single RRULE such as "FREQ=WEEKLY;BYDAY=TU;COUNT=10".')
+    # UNTIL is read as campus wall-clock time, like the rest of the rule.
+    rule = rrulestr(text, dtstart=_local(start), ignoretz=True)
+    if rule._freq not in ALLOWED_FREQUENCIES:
+        raise ValueError('Only DAILY, WEEKLY, MONTHLY and YEARLY rules are supported.')
+    if rule._count is not None and rule._count > MAX_OCCURRENCES:
+        raise ValueError(f'COUNT may be at most {MAX_OCCURRENCES}.')
+    horizon = rule._dtstart + relativedelta(years=MAX_RULE_YEARS)
+    if rule._until is not None and rule._until > horizon:
+        raise ValueError(f'UNTIL may be at most {MAX_RULE_YEARS} years after the start.')
+    if not _has_occurrence(rule):
+        raise ValueError('The rule never produces an occurrence.')
+    if rule._count is not None and len(rule.between(rule._dtstart, horizon, inc=True)) < rule._count:
+        raise ValueError(f'The occurrences may span at most {MAX_RULE_YEARS} years.')
+    return rule
+
+
+def _has_occurrence(rule):
+    """Whether the rule yields anything, without scanning to year 9999 when it does not"""
+    # The calendar repeats every 400 years, so a copy moved by a multiple of that
+    # yields the same dates, moved; near the last year datetime supports, an
+    # impossible rule (say 30 February) runs out within a few hundred years.
+    start = rule._dtstart
+    shift = max((datetime.max.year - 100 - start.year) // 400 * 400, 0)
+    until = rule._until.replace(year=rule._until.year + shift) if rule._until else None
+    probe = rule.replace(dtstart=start.replace(year=start.year + shift), until=until)
+    return next(iter(probe), None) is not None
+
+
+def rule_for(event):
+    """Parsed rule of a recurring event, cached on the instance"""
+    cached = getattr(event, '_rule', None)
+    if cached is None or cached[0] != (event.recurrence, event.start_datetime):
+        cached = ((event.recurrence, event.start_datetime), parse_rule(event.recurrence, event.start_datetime))
+        event._rule = cached
+    return cached[1]
+
+
+def last_start(event):
+    """Start of the final occurrence, or None when the rule never ends"""
+    rule = rule_for(event)
+    if rule._count is None and rule._until is None:
+        return None
+    # parse_rule keeps bounded rules within MAX_RULE_YEARS.
+    occurrences = rule.between(rule._dtstart, rule._dtstart + relativedelta(years=MAX_RULE_YEARS), inc=True)
+    return _aware(occurrences[-1]) if occurrences else None
+
+
+def is_occurrence(event, moment):
+    """Whether the rule generates an occurrence starting exactly at ``moment``"""
+    if moment > timezone.now() + relativedelta(years=MAX_RULE_YEARS):
+        return False  # not worth walking an open-ended rule that far
+    local = _local(moment)
+    return rule_for(event).after(local, inc=True) == local
+
+
+class Occurrence:
+    """One concrete happening of an event, recurring or not"""
+    __slots__ = ['event', 'original_start', 'start', 'end', 'seats_taken']
+
+    def __init__(self, event, original_start, start, end, seats_taken):
+        self.event = event
+        self.original_start = original_start
+        self.start = start
+        self.end = end
+        self.seats_taken = seats_taken
+
+
+def _rule_stream(event, window_start, window_end, overrides):
+    duration = event.end_datetime - event.start_datetime
+    for local in rule_for(event).xafter(_local(window_start), inc=True):
+        original = _aware(local)
+        if original >= window_end:
+            return
+        override = overrides.get((event.pk, original))
+        if override is not None and (override.is_cancelled or override.start_datetime):
+            continue  # cancelled, or yielded at its new time by the moved stream
+        seats = override.seats_taken if override is not None else 0
+        yield Occurrence(event, original, original, original + duration, seats)
+
+
+def _moved_stream(events_by_id, window_start, window_end):
+    moved = (
+        EventOccurrence.objects.filter(
+            event__in=list(events_by_id), is_cancelled=False,
+            start_datetime__gte=window_start, start_datetime__lt=window_end,
+        ).order_by('start_datetime', 'event_id')
+    )
+    for row in moved.iterator():
+        event = events_by_id[row.event_id]
+        end = row.end_datetime or row.start_datetime + (event.end_datetime - event.start_datetime)
+        yield Occurrence(event, row.original_start, row.start_datetime, end, row.seats_taken)
+
+
+def _single_stream(events):
+    for event in events:
+        yield Occurrence(event, None, event.start_datetime, event.end_datetime, event.seats_taken)
+
+
+def expand(single_events, series, window_start, window_end):
+    """
+    Start-ordered iterator over occurrences in [window_start, window_end).
+
+    ``single_events`` is an iterable of one-off events already ordered by
+    start and limited to the window; ``series`` is a list of recurring events
+    that may have occurrences in it.
+    """
+    series = [event for event in series if event.recurrence]
+    overrides = {
+        (row.event_id, row.original_start): row
+        for row in EventOccurrence.objects.filter(
+            event__in=series, original_start__gte=window_start, original_start__lt=window_end,
+        )
+    } if series else {}
+    streams = [_single_stream(single_events)]
+    streams += [_rule_stream(event, window_start, window_end, overrides) for event in series]
+    if series:
+        streams.append(_moved_stream({event.pk: event for event in series}, window_start, window_end))
+    return heapq.merge(*streams, key=lambda occurrence: (occurrence.start, occurrence.event.pk))
+
+
+def next_occurrence(event, now, overrides=()):
+    """Start of the next occurrence at or after ``now`` that is not cancelled"""
+    skipped = {row.original_start: row for row in overrides}
+    for local in rule_for(event).xafter(_local(now), count=MAX_OCCURRENCES, inc=True):
+        original = _aware(local)
+        override = skipped.get(original)
+        if override is None:
+            return original
+        start = override.start_datetime or original
+        if not override.is_cancelled and start >= now:
+            return start
+    return None
+
+
+def parse_moment(value):
+    """An aware datetime from a client-supplied date or datetime string, or None"""
+    try:
+        moment = parse_datetime(str(value or ''))
+        if moment is None:
+            day = parse_date(str(value or ''))
+            moment = datetime.combine(day, time()) if day else None
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    return moment if timezone.is_aware(moment) else _aware(moment)
@@ -0,0 +1,125 @@
+"""
+RSVP creation and cancellation with capacity limits.
+
+``Event.seats_taken`` counts RSVPs with status "going". A seat is claimed with
+a single conditional ``UPDATE ... SET seats_taken = seats_taken + 1 WHERE
+seats_taken < capacity``: the database serialises concurrent claims on the
+row, so no lock is held across the request and nobody has to count RSVP
+rows. Whoever does not get a seat is put on the waitlist, and deleting a
+"going" RSVP, whether cancelled or removed with its user, hands its seat to
+the earliest waitlisted one (see ``release_deleted_rsvp_seat`` in signals.py).
+
+Occurrences of a recurring event each have the event's capacity; their
+seats are counted the same way on ``EventOccurrence.seats_taken``, and every
+function here takes the ``occurrence_start`` the RSVP is for (None for
+one-off events).
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .listcache import bump_list_version
+from .live import publish_event_change
+from .models import Event, EventOccurrence, RSVP
+from .sync import record_rsvp_changes
+
+
+class AlreadyRSVPed(Exception):
+    pass
+
+
+def claim_seat(event_id, occurrence_start=None):
+    """Take one seat if the event (occurrence) has room; returns whether it succeeded"""
+    if occurrence_start is not None:
+        return _claim_occurrence_seat(event_id, occurrence_start)
+    return Event.objects.filter(
+        Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity')), pk=event_id,
+    ).update(seats_taken=F('seats_taken') + 1) == 1
+
+
+def _claim_occurrence_seat(event_id, occurrence_start):
+    capacity = Event.objects.filter(pk=event_id).values_list('capacity', flat=True).first()
+    occurrence, _ = EventOccurrence.objects.get_or_create(event_id=event_id, original_start=occurrence_start)
+    seats = EventOccurrence.objects.filter(pk=occurrence.pk)
+    if capacity is not None:
+        seats = seats.filter(seats_taken__lt=capacity)
+    return seats.update(seats_taken=F('seats_taken') + 1) == 1
+
+
+def release_seat(event_id, occurrence_start=None):
+    if occurrence_start is not None:
+        seats = EventOccurrence.objects.filter(event_id=event_id, original_start=occurrence_start)
+    else:
+        seats = Event.objects.filter(pk=event_id)
+    seats.filter(seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+
+
+def create_rsvp(event_id, user, occurrence_start=None):
+    """RSVP ``user`` to an event, waitlisting them when it is full"""
+    if RSVP.objects.filter(event_id=event_id, user=user, occurrence_start=occurrence_start).exists():
+        raise AlreadyRSVPed()
+    try:
+        with transaction.atomic():
+            status = RSVP.GOING if claim_seat(event_id, occurrence_start) else RSVP.WAITLISTED
+            # Rolled back together with the seat if a parallel request won.
+            return RSVP.objects.create(
+                event_id=event_id, user=user, status=status, occurrence_start=occurrence_start,
+            )
+    except IntegrityError:
+        raise AlreadyRSVPed()
+
+
+def waitlist_position(rsvp):
+    """1-based position of a waitlisted RSVP"""
+    return RSVP.objects.filter(
+        Q(rsvp_at__lt=rsvp.rsvp_at) | Q(rsvp_at=rsvp.rsvp_at, pk__lt=rsvp.pk),
+        event_id=rsvp.event_id, occurrence_start=rsvp.occurrence_start, status=RSVP.WAITLISTED,
+    ).count() + 1
+
+
+def promote_waitlist(event_id, occurrence_start=None):
+    """Move waitlisted RSVPs to "going" while seats are free; returns how many"""
+    promoted = _promote(event_id, occurrence_start)
+    if promoted:
+        bump_list_version()
+        change = {'type': 'rsvp.promoted', 'count': promoted}
+        if occurrence_start is not None:
+            change['occurrence'] = occurrence_start.isoformat()
+        publish_event_change(event_id, change)
+    return promoted
+
+
+def _promote(event_id, occurrence_start):
+    promoted = 0
+    while True:
+        candidate = (
+            RSVP.objects.filter(event_id=event_id, occurrence_start=occurrence_start, status=RSVP.WAITLISTED)
+            .order_by('rsvp_at', 'pk')
+            .values_list('pk', 'user_id')
+            .first()
+        )
+        if candidate is None:
+            return promoted
+        with transaction.atomic():
+            if not claim_seat(event_id, occurrence_start):
+                return promoted
+            won = RSVP.objects.filter(pk=candidate[0], status=RSVP.WAITLISTED).update(status=RSVP.GOING)
+            if not won:
+                # Promoted or cancelled by someone else meanwhile.
+                release_seat(event_id, occurrence_start)
+                continue
+            record_rsvp_changes(event_id, [candidate[1]])
+        promoted += 1
+
+
+def cancel_rsvp(event_id, user, occurrence_start=None):
+    """Delete the user's RSVP, freeing its seat for the waitlist; False if none"""
+    rsvp = RSVP.objects.filter(event_id=event_id, user=user, occurrence_start=occurrence_start).first()
+    if rsvp is None:
+        return False
+    # The post_delete receiver releases the seat and promotes the waitlist.
+    deleted, _ = RSVP.objects.filter(pk=rsvp.pk, status=rsvp.status).delete()
+    if not deleted:
+        # Promoted between our read and delete; try again with the new status.
+        return cancel_rsvp(event_id, user, occurrence_start)
+    return True
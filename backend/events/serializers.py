@@ -1,7 +1,13 @@
+from collections import defaultdict
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Event, EventCategory, RSVP
+from .models import ArchivedRSVP, Event, EventCategory, EventOccurrence, RSVP
+from .recurrence import next_occurrence, parse_rule
 from organizations.models import Organization
 from django.contrib.auth.models import User
+from campus_events.loaders import BatchedSerializerMixin, BatchListSerializer, prime_forward
+from campus_events.thumbnails import variant_url
 
 
 class EventCategorySerializer(serializers.ModelSerializer):
@@ -17,12 +23,18 @@ class MinimalUserSerializer(serializers.ModelSerializer):
 
 
 class MinimalOrganizationSerializer(serializers.ModelSerializer):
+    logo = serializers.SerializerMethodField()
+
     class Meta:
         model = Organization
         fields = ['id', 'name', 'slug', 'description', 'logo', 'is_verified']
 
+    def get_logo(self, obj):
+        """Serve the card-sized logo variant rather than the original upload"""
+        return variant_url(obj, 'logo', self.context.get('request'))
+
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     category = EventCategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=EventCategory.objects.all(),
@@ -44,6 +56,7 @@ class EventSerializer(serializers.ModelSerializer):
     # Changed field
     rsvp_users = serializers.SerializerMethodField()
     user_has_rsvp = serializers.SerializerMethodField()
+    next_occurrence = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
@@ -53,29 +66,148 @@ class EventSerializer(serializers.ModelSerializer):
             'has_free_swag', 'other_perks', 'category', 'category_id',
             'subcategory', 'host_organization', 'host_organization_id',
             'host_user', 'employers_in_attendance', 'status', 'is_approved',
+            'capacity', 'seats_taken', 'recurrence', 'recurrence_end', 'next_occurrence',
             'created_at', 'updated_at', 'rsvp_users', 'user_has_rsvp'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'host_user']
+        read_only_fields = ['created_at', 'updated_at', 'host_user', 'seats_taken', 'recurrence_end']
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, events):
+        """Load hosts, categories and attendees for all events in a few queries"""
+        events = [event for event in events if event.pk and not hasattr(event, '_going_user_ids')]
+        if not events:
+            return
+        users = self.loaders(User)
+        request = self.context.get('request')
+        viewer = request.user if request and request.user.is_authenticated else None
+
+        going = defaultdict(list)
+        rsvped = set()
+        # Archived events (see events/archive.py) keep their RSVPs in the archive table.
+        for model, archived in ((RSVP, False), (ArchivedRSVP, True)):
+            event_ids = [event.pk for event in events if getattr(event, 'is_archived', False) == archived]
+            if not event_ids:
+                continue
+            if 'rsvp_users' in self.fields:
+                rsvps = model.objects.filter(event_id__in=event_ids, status=RSVP.GOING).values_list('event_id', 'user_id')
+                for event_id, user_id in rsvps:
+                    going[event_id].append(user_id)
+            if viewer is not None and 'user_has_rsvp' in self.fields:
+                rsvped.update(model.objects.filter(event_id__in=event_ids, user=viewer).values_list('event_id', flat=True))
+        users.prime(user_id for user_ids in going.values() for user_id in user_ids)
+
+        prime_forward(events, 'host_user', users)
+        prime_forward(events, 'category', self.loaders(EventCategory))
+        prime_forward(events, 'host_organization', self.loaders(Organization))
+
+        # Cancelled or moved occurrences of live series, for next_occurrence.
+        now = timezone.now()
+        overrides = defaultdict(list)
+        series_ids = [event.pk for event in events if event.recurrence and not getattr(event, 'is_archived', False)]
+        if series_ids:
+            changed = EventOccurrence.objects.filter(event_id__in=series_ids, original_start__gte=now).exclude(
+                is_cancelled=False, start_datetime__isnull=True,
+            )
+            for occurrence in changed:
+                overrides[occurrence.event_id].append(occurrence)
+
+        for event in events:
+            # A user going to several occurrences of a series is listed once.
+            event._going_user_ids = list(dict.fromkeys(going[event.pk]))
+            event._user_has_rsvp = event.pk in rsvped
+            event._occurrence_overrides = overrides[event.pk]
+
+    def validate(self, attrs):
+        recurrence = attrs.get('recurrence', self.instance.recurrence if self.instance else '')
+        start = attrs.get('start_datetime', self.instance.start_datetime if self.instance else None)
+        if recurrence and start:
+            try:
+                parse_rule(recurrence, start)
+            except ValueError as exc:
+                raise serializers.ValidationError({'recurrence': str(exc)})
+        if self.instance is not None:
+            self.validate_schedule_change(recurrence, start)
+        return attrs
+
+    def validate_schedule_change(self, recurrence, start):
+        """
+        RSVPs and overrides of a series name occurrences by their start, and
+        a one-off event's RSVPs name none; a new rule (or a series' new start,
+        or a one-off event becoming a series and back) would orphan them.
+        """
+        event = self.instance
+        if recurrence == event.recurrence and (not recurrence or start == event.start_datetime):
+            return
+        if event.rsvps.exists() or event.occurrences.exists():
+            field = 'recurrence' if recurrence != event.recurrence else 'start_datetime'
+            raise serializers.ValidationError({
+                field: 'The schedule cannot change once the event has RSVPs or changed occurrences; '
+                       'cancel or move single occurrences instead.'
+            })
 
     def get_rsvp_users(self, obj):
         """
         Return a list of usernames of users who have RSVPed for this event.
+        Waitlisted users are not included.
         """
-        return [MinimalUserSerializer(rsvp.user).data for rsvp in obj.rsvps.all()]
+        if hasattr(obj, '_going_user_ids'):
+            return MinimalUserSerializer(self.loaders(User).get_many(obj._going_user_ids), many=True).data
+        return [MinimalUserSerializer(rsvp.user).data for rsvp in obj.rsvps.all() if rsvp.status == RSVP.GOING]
 
     def get_user_has_rsvp(self, obj):
+        if hasattr(obj, '_user_has_rsvp'):
+            return obj._user_has_rsvp
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return RSVP.objects.filter(event=obj, user=request.user).exists()
         return False
 
+    def get_next_occurrence(self, obj):
+        """Start of the next occurrence of a recurring event, skipping cancelled ones"""
+        if not obj.recurrence or getattr(obj, 'is_archived', False):
+            return None
+        overrides = getattr(obj, '_occurrence_overrides', None)
+        if overrides is None:
+            overrides = obj.occurrences.filter(original_start__gte=timezone.now())
+        start = next_occurrence(obj, timezone.now(), overrides)
+        return serializers.DateTimeField().to_representation(start) if start else None
+
+
+class SyncEventSerializer(EventSerializer):
+    """Event as kept by offline replicas; attendees are left out and the viewer's RSVPs sync separately"""
+
+    class Meta(EventSerializer.Meta):
+        fields = [name for name in EventSerializer.Meta.fields if name not in ('rsvp_users', 'user_has_rsvp')]
 
-class RSVPSerializer(serializers.ModelSerializer):
+
+class RSVPSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     event = EventSerializer(read_only=True)
 
     class Meta:
         model = RSVP
-        fields = ['id', 'event', 'user', 'rsvp_at', 'attended']
-        read_only_fields = ['user', 'rsvp_at']
+        fields = ['id', 'event', 'user', 'rsvp_at', 'attended', 'status', 'occurrence_start']
+        read_only_fields = ['user', 'rsvp_at', 'status', 'occurrence_start']
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, rsvps):
+        prime_forward(rsvps, 'user', self.loaders(User))
+        events = prime_forward(rsvps, 'event', self.loaders(Event))
+        self.fields['event'].prime(events)
+
+
+
+class OccurrenceChangeSerializer(serializers.Serializer):
+    """Cancel, move or restore one occurrence of a recurring event"""
+    occurrence = serializers.DateTimeField(help_text='Start of the occurrence as generated by the rule')
+    is_cancelled = serializers.BooleanField(default=False)
+    start_datetime = serializers.DateTimeField(required=False, allow_null=True)
+    end_datetime = serializers.DateTimeField(required=False, allow_null=True)
 
+    def validate(self, attrs):
+        start, end = attrs.get('start_datetime'), attrs.get('end_datetime')
+        if end and not start:
+            raise serializers.ValidationError({'start_datetime': 'Required when end_datetime is given.'})
+        if start and end and end <= start:
+            raise serializers.ValidationError({'end_datetime': 'Must be after start_datetime.'})
+        return attrs
@@ -0,0 +1,186 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from campus_events import autocomplete
+from campus_events.refdata import reference_data
+
+from .checkin import going_rsvps
+from .feed import schedule_rebuild
+from .listcache import bump_list_version
+from .live import event_fields, publish_event_change
+from .models import Event, EventCategory, EventOccurrence, RSVP
+from .notifications import detect_changes, record_changes, snapshot_watched_fields
+from .recurrence import last_start
+from .rsvps import promote_waitlist, release_seat
+from .sync import record_event_changes, record_rsvp_changes, record_upcoming_changes
+from .trending import record_rsvp
+
+
+@receiver(post_save, sender=RSVP)
+def add_rsvp_to_trending(sender, instance, created, **kwargs):
+    """Bump the event's trending score as soon as an RSVP arrives"""
+    if created:
+        record_rsvp(instance.event_id, instance.rsvp_at)
+
+
+def deleted_with_event(origin):
+    """Whether a cascade started from deleting (or archiving) events"""
+    return isinstance(origin, Event) or (isinstance(origin, QuerySet) and origin.model is Event)
+
+
+@receiver(post_delete, sender=RSVP)
+def remove_rsvp_from_trending(sender, instance, origin=None, **kwargs):
+    """Take a cancelled RSVP back out of the event's trending score"""
+    if deleted_with_event(origin):
+        return  # the event itself is going away
+    record_rsvp(instance.event_id, instance.rsvp_at, sign=-1)
+
+
+@receiver(post_delete, sender=RSVP)
+def release_deleted_rsvp_seat(sender, instance, origin=None, **kwargs):
+    """Free a "going" RSVP's seat however it was deleted, e.g. with its user"""
+    if deleted_with_event(origin) or instance.status != RSVP.GOING:
+        return
+    release_seat(instance.event_id, instance.occurrence_start)
+    transaction.on_commit(lambda: promote_waitlist(instance.event_id, instance.occurrence_start))
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+def track_going_rsvp(sender, instance, signal, raw=False, **kwargs):
+    """Keep check-in's in-memory sets of "going" RSVPs current"""
+    if raw:
+        return
+    # Bound now: a deleted instance's pk is cleared before the commit.
+    event_id, ids = instance.event_id, [instance.pk]
+    if signal is post_save and instance.status == RSVP.GOING:
+        transaction.on_commit(lambda: going_rsvps.update(event_id, added=ids))
+    else:
+        transaction.on_commit(lambda: going_rsvps.update(event_id, removed=ids))
+
+
+@receiver(post_save, sender=RSVP)
+def stream_rsvp_created(sender, instance, created, **kwargs):
+    if created:
+        publish_event_change(instance.event_id, {'type': 'rsvp.created', 'status': instance.status})
+
+
+@receiver(post_delete, sender=RSVP)
+def stream_rsvp_deleted(sender, instance, origin=None, **kwargs):
+    if not deleted_with_event(origin):
+        publish_event_change(instance.event_id, {'type': 'rsvp.deleted', 'status': instance.status})
+
+
+@receiver(post_save, sender=Event)
+def stream_event_saved(sender, instance, created, **kwargs):
+    publish_event_change(instance.pk, {
+        'type': 'event.created' if created else 'event.updated',
+        'fields': event_fields(instance),
+    })
+
+
+@receiver(post_delete, sender=Event)
+def stream_event_deleted(sender, instance, **kwargs):
+    publish_event_change(instance.pk, {'type': 'event.deleted'})
+
+
+@receiver(pre_save, sender=Event)
+def set_recurrence_end(sender, instance, raw=False, **kwargs):
+    """Store when a series ends so "upcoming" stays a plain indexed filter"""
+    if not raw:
+        instance.recurrence_end = last_start(instance) if instance.recurrence else None
+
+
+@receiver(pre_save, sender=Event)
+def remember_watched_fields(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._watched_before_save = snapshot_watched_fields(instance)
+
+
+@receiver(post_save, sender=Event)
+def notify_attendees_of_changes(sender, instance, created, raw=False, **kwargs):
+    """Queue a (coalesced) notice to attendees when time, place or status changes"""
+    before = getattr(instance, '_watched_before_save', None)
+    if created or raw or before is None:
+        return
+    changes = detect_changes(before, instance)
+    if changes:
+        record_changes(instance, changes)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_save, sender=EventCategory)
+@receiver(post_delete, sender=EventCategory)
+@receiver(post_save, sender=EventOccurrence)
+@receiver(post_delete, sender=EventOccurrence)
+def invalidate_event_listings(sender, **kwargs):
+    """Drop cached event lists and facet counts after anything they show changes"""
+    bump_list_version()
+
+
+@receiver(post_save, sender=Event)
+def index_event_title(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.on_saved('events', instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event_title(sender, instance, **kwargs):
+    autocomplete.on_deleted('events', instance.pk)
+
+
+@receiver(post_save, sender=EventCategory)
+@receiver(post_delete, sender=EventCategory)
+def invalidate_categories(sender, **kwargs):
+    transaction.on_commit(reference_data.invalidate)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def log_event_change(sender, instance, raw=False, **kwargs):
+    """Feed delta sync (events/sync.py); deletions become tombstones"""
+    if not raw:
+        record_event_changes([instance.pk])
+
+
+@receiver(post_save, sender=EventOccurrence)
+@receiver(post_delete, sender=EventOccurrence)
+def log_occurrence_change(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not deleted_with_event(origin):
+        record_event_changes([instance.event_id])
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+def log_rsvp_change(sender, instance, raw=False, origin=None, **kwargs):
+    """Synced to the RSVPing user, and to everyone as a change in seats"""
+    if not raw and not deleted_with_event(origin):
+        record_rsvp_changes(instance.event_id, [instance.user_id])
+
+
+@receiver(post_save, sender=EventCategory)
+@receiver(pre_delete, sender=EventCategory)
+def log_category_change(sender, instance, raw=False, **kwargs):
+    """Events embed their category; before a delete, while they still point to it"""
+    if not raw:
+        record_upcoming_changes(category=instance)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def refresh_feed(sender, instance, raw=False, **kwargs):
+    """Rebuild the homepage feed snapshot in the background (see events/feed.py)"""
+    if not raw:
+        schedule_rebuild(instance)
+
+
+@receiver(post_save, sender=EventOccurrence)
+@receiver(post_delete, sender=EventOccurrence)
+def refresh_feed_for_occurrence(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not deleted_with_event(origin):
+        schedule_rebuild(instance.event)
@@ -0,0 +1,186 @@
+"""
+Delta sync for offline and mobile clients (``/api/events/changes/``).
+
+Every write that changes what a client's copy of the upcoming events shows
+appends an ``EventChange`` row in the same transaction: event saves and
+deletes, occurrence overrides, edits to a host organization or category,
+and RSVP changes, which also name the RSVPing user. Row ids are the
+monotonic change sequence a sync token points into. ``Event.updated_at`` is
+sent with every event, but timestamps can tie and are not in commit order,
+so they are not used as the cursor.
+
+A sync returns every event whose last change is newer than the token, once,
+in sequence order:
+
+* events a client should hold (upcoming, published and approved) in full;
+* tombstones for the others: deleted, cancelled, unpublished or ended;
+* the requesting user's current RSVPs on events their RSVPs changed on.
+
+Events that slip into the past without a change get no tombstone; clients
+drop them by their start (or ``recurrence_end``) themselves. Without a
+token, or with one from before the pruned part of the log, the client gets a
+snapshot of every event it should hold instead, flagged with ``reset``.
+
+SQLite serialises writers, so sequence numbers are handed out in commit
+order. With concurrent writers a slow transaction can commit a lower number
+after a higher one was synced; ``SYNC_SETTLE_SECONDS`` holds the newest rows
+back long enough for that.
+"""
+
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import Event, EventChange, RSVP
+from .recurrence import upcoming_q
+
+# "<sequence>", or "<sequence>.<last event id>" while a snapshot is paged
+TOKEN = re.compile(r'^(\d+)(?:\.(\d+))?$')
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def record_event_changes(event_ids):
+    """Log a change for each event, e.g. after a save or delete"""
+    EventChange.objects.bulk_create([EventChange(event_id=event_id) for event_id in event_ids])
+
+
+def record_rsvp_changes(event_id, user_ids):
+    """Log RSVP changes of ``user_ids`` on one event"""
+    EventChange.objects.bulk_create([EventChange(event_id=event_id, user_id=user_id) for user_id in user_ids])
+
+
+def record_upcoming_changes(**lookup):
+    """Log a change for the upcoming events matching ``lookup``, e.g. when their host is renamed"""
+    record_event_changes(list(
+        Event.objects.filter(upcoming_q(timezone.now()), **lookup).values_list('pk', flat=True)
+    ))
+
+
+def prune(before):
+    """Delete change rows logged before ``before``, keeping the newest; returns how many"""
+    latest = EventChange.objects.aggregate(latest=Max('pk'))['latest']
+    if latest is None:
+        return 0
+    # Tokens are checked against the oldest row left, so the log is never emptied.
+    deleted, _ = EventChange.objects.filter(created_at__lt=before, pk__lt=latest).delete()
+    return deleted
+
+
+def held_events(now):
+    """The events a client replica should contain"""
+    return Event.objects.filter(upcoming_q(now), status='published', is_approved=True)
+
+
+def removal_reason(event, upcoming):
+    """Why a changed event is not (or no longer) in replicas; None if it is"""
+    if event is None:
+        return 'deleted'
+    if event.status == 'cancelled':
+        return 'cancelled'
+    if event.status != 'published' or not event.is_approved:
+        return 'unpublished'
+    if not upcoming:
+        return 'ended'
+    return None
+
+
+def user_rsvps(user, event_ids):
+    """``{event_id: [rsvp, ...]}`` of the user's RSVPs; an empty list means none"""
+    rsvps = {event_id: [] for event_id in event_ids}
+    rows = (
+        RSVP.objects.filter(user=user, event_id__in=event_ids)
+        .order_by('event_id', 'occurrence_start')
+        .values('event_id', 'occurrence_start', 'status', 'attended', 'rsvp_at')
+    )
+    for row in rows:
+        rsvps[row.pop('event_id')].append(row)
+    return rsvps
+
+
+def settled_head():
+    """The newest sequence number clients may be sent"""
+    changes = EventChange.objects.all()
+    if settings.SYNC_SETTLE_SECONDS:
+        changes = changes.filter(created_at__lte=timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS))
+    return changes.aggregate(head=Max('pk'))['head'] or 0
+
+
+def changes_since(token, user, limit):
+    """
+    One sync page for ``token`` (None for an empty replica): a dict of the next
+    ``token``, ``has_more``, ``reset``, ``events`` (instances), ``removed`` and
+    ``rsvps``. Raises InvalidToken for malformed tokens.
+    """
+    if token:
+        match = TOKEN.match(token)
+        if match is None:
+            raise InvalidToken()
+        since, after = int(match[1]), int(match[2] or 0)
+        if not after:
+            bounds = EventChange.objects.aggregate(oldest=Min('pk'), latest=Max('pk'))
+            # Older than the pruned log, or from another database.
+            expired = since > (bounds['latest'] or 0) or (bounds['oldest'] and since < bounds['oldest'] - 1)
+            if not expired:
+                return delta(since, user, limit)
+            since = None
+    else:
+        since, after = None, 0
+    return snapshot(settled_head() if since is None else since, after, user, limit)
+
+
+def snapshot(head, after, user, limit):
+    """Every event a replica should hold, paged by id; changes after ``head`` follow as deltas"""
+    events = list(held_events(timezone.now()).filter(pk__gt=after).order_by('pk')[:limit + 1])
+    more = len(events) > limit
+    events = events[:limit]
+    return {
+        'token': f'{head}.{events[-1].pk}' if more else str(head),
+        'has_more': more,
+        'reset': not after,
+        'events': events,
+        'removed': [],
+        'rsvps': user_rsvps(user, [event.pk for event in events]) if user else {},
+    }
+
+
+def delta(since, user, limit):
+    head = settled_head()
+    changes = EventChange.objects.filter(pk__gt=since, pk__lte=head).values('event_id').order_by()
+    if user:
+        changes = changes.annotate(seq=Max('pk'), mine=Max('pk', filter=Q(user_id=user.pk)))
+    else:
+        changes = changes.annotate(seq=Max('pk'))
+    # Each event once, at its last change, so a token never skips a newer one.
+    rows = list(changes.order_by('seq')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    event_ids = [row['event_id'] for row in rows]
+    events = Event.objects.in_bulk(event_ids)
+    upcoming = set(Event.objects.filter(upcoming_q(timezone.now()), pk__in=event_ids).values_list('pk', flat=True))
+    kept, removed = [], []
+    for event_id in event_ids:
+        reason = removal_reason(events.get(event_id), event_id in upcoming)
+        if reason:
+            removed.append({'id': event_id, 'reason': reason})
+        else:
+            kept.append(events[event_id])
+
+    rsvps = {}
+    if user:
+        kept_ids = {event.pk for event in kept}
+        rsvps = user_rsvps(user, [row['event_id'] for row in rows if row['mine'] and row['event_id'] in kept_ids])
+    return {
+        'token': str(rows[-1]['seq'] if more else max(head, since)),
+        'has_more': more,
+        'reset': False,
+        'events': kept,
+        'removed': removed,
+        'rsvps': rsvps,
+    }
@@ -0,0 +1,485 @@
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from taskqueue.models import Task
+
+from . import feed, rsvps
+from .archive import archive_events, restore_events
+from .checkin import attendance_buffer, check_in, going_rsvps, make_token
+from .models import ArchivedEvent, Event, EventChange, EventNotification, EventOccurrence, RSVP
+from .notifications import deliver_chunk, render_notification, send_notification
+from .recurrence import last_start, parse_rule
+from .trending import current_epoch, record_rsvp, recompute_scores
+
+
+def make_event(**fields):
+    start = timezone.now() + timedelta(days=1)
+    defaults = {
+        'title': 'Test event', 'description': 'd', 'location': 'Campus',
+        'start_datetime': start, 'end_datetime': start + timedelta(hours=1),
+        'status': 'published', 'is_approved': True,
+    }
+    return Event.objects.create(**{**defaults, **fields})
+
+
+class DeleteUserTests(TestCase):
+    def test_deleting_user_with_rsvps(self):
+        event = make_event()
+        user = User.objects.create_user('attendee')
+        rsvps.create_rsvp(event.pk, user)
+
+        user.delete()
+
+        self.assertFalse(RSVP.objects.filter(event=event).exists())
+        self.assertTrue(EventChange.objects.filter(event_id=event.pk, user_id=user.pk).exists())
+
+    def test_deleting_user_frees_seat(self):
+        event = make_event(capacity=1)
+        user = User.objects.create_user('attendee')
+        rsvps.create_rsvp(event.pk, user)
+        waitlisted = rsvps.create_rsvp(event.pk, User.objects.create_user('next'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+
+        waitlisted.refresh_from_db()
+        event.refresh_from_db()
+        self.assertEqual(waitlisted.status, RSVP.GOING)
+        self.assertEqual(event.seats_taken, 1)
+
+
+class RecurrenceLimitTests(TestCase):
+    def test_rejects_unbounded_rules(self):
+        start = timezone.now()
+        for rule in ['FREQ=DAILY;UNTIL=99991231', 'FREQ=DAILY;COUNT=3000000',
+                     'FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30;COUNT=1', 'FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29;COUNT=1000']:
+            with self.subTest(rule=rule), self.assertRaises(ValueError):
+                parse_rule(rule, start)
+
+    def test_last_start(self):
+        start = timezone.make_aware(datetime(2030, 6, 4, 18, 0))
+        event = make_event(start_datetime=start, end_datetime=start + timedelta(hours=1),
+                           recurrence='FREQ=WEEKLY;COUNT=3')
+        self.assertEqual(last_start(event), start + timedelta(weeks=2))
+
+
+class ArchiveTests(TestCase):
+    def test_restore_keeps_occurrences(self):
+        start = timezone.now() - timedelta(days=30)
+        event = make_event(start_datetime=start, end_datetime=start + timedelta(hours=1),
+                           recurrence='FREQ=DAILY;COUNT=3')
+        EventOccurrence.objects.create(event=event, original_start=start, is_cancelled=True)
+
+        archive_events(timezone.now())
+        self.assertFalse(EventOccurrence.objects.exists())
+        restore_events(ArchivedEvent.objects.filter(pk=event.pk))
+
+        occurrence = EventOccurrence.objects.get(event_id=event.pk)
+        self.assertEqual(occurrence.original_start, start)
+        self.assertTrue(occurrence.is_cancelled)
+
+
+class CheckinTests(TestCase):
+    def setUp(self):
+        # Ids are reused across tests; start with empty in-memory state.
+        going_rsvps._events.clear()
+        attendance_buffer._seen.clear()
+        self.host = User.objects.create_user('host')
+        self.event = make_event(host_user=self.host, capacity=1)
+        self.client = APIClient()
+
+    def token(self, rsvp):
+        return make_token(rsvp, rsvp.event.end_datetime)
+
+    def test_non_numeric_pk(self):
+        self.client.force_authenticate(self.host)
+        self.assertEqual(self.client.get('/api/events/abc/checkin_token/').status_code, 404)
+        self.assertEqual(self.client.post('/api/events/abc/check_in/', {'token': 'x'}).status_code, 404)
+
+    def test_waitlisted_rsvp(self):
+        going = rsvps.create_rsvp(self.event.pk, User.objects.create_user('first'))
+        waitlisted = User.objects.create_user('second')
+        rsvp = rsvps.create_rsvp(self.event.pk, waitlisted)
+        self.assertEqual(rsvp.status, RSVP.WAITLISTED)
+
+        self.client.force_authenticate(waitlisted)
+        self.assertEqual(self.client.get(f'/api/events/{self.event.pk}/checkin_token/').status_code, 404)
+        self.client.force_authenticate(self.host)
+        response = self.client.post(f'/api/events/{self.event.pk}/check_in/', {'token': self.token(rsvp)})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/events/{self.event.pk}/check_in/', {'token': self.token(going)})
+        self.assertEqual(response.data['message'], 'Checked in')
+
+    def test_token_from_endpoint(self):
+        user = User.objects.create_user('attendee')
+        rsvps.create_rsvp(self.event.pk, user)
+        self.client.force_authenticate(user)
+        token = self.client.get(f'/api/events/{self.event.pk}/checkin_token/').data['token']
+        self.client.force_authenticate(self.host)
+        response = self.client.post(f'/api/events/{self.event.pk}/check_in/', {'tokens': [token]}, format='json')
+        self.assertEqual(len(response.data['checked_in']), 1)
+
+    def test_expired_token(self):
+        rsvp = rsvps.create_rsvp(self.event.pk, User.objects.create_user('attendee'))
+        token = make_token(rsvp, timezone.now() - timedelta(days=2))
+        self.assertEqual(check_in(self.event.pk, [token])['invalid'], [token])
+
+    def test_scans_use_in_memory_going_set(self):
+        event = make_event()
+        first = rsvps.create_rsvp(event.pk, User.objects.create_user('first'))
+        check_in(event.pk, [self.token(first)], flush=True)  # primes the set
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = rsvps.create_rsvp(event.pk, User.objects.create_user('second'))
+        token = self.token(second)
+        with self.assertNumQueries(0):
+            self.assertEqual(check_in(event.pk, [token])['checked_in'], [second.pk])
+        attendance_buffer.flush()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            third = rsvps.create_rsvp(event.pk, User.objects.create_user('third'))
+            rsvps.cancel_rsvp(event.pk, third.user)
+        token = self.token(third)
+        self.assertEqual(check_in(event.pk, [token])['invalid'], [token])
+
+    def test_late_scans_are_written_at_once(self):
+        start = timezone.now() - timedelta(hours=3)
+        event = make_event(start_datetime=start, end_datetime=start + timedelta(hours=1))
+        rsvp = rsvps.create_rsvp(event.pk, User.objects.create_user('attendee'))
+
+        check_in(event.pk, [self.token(rsvp)])
+
+        rsvp.refresh_from_db()
+        self.assertTrue(rsvp.attended)
+
+
+class NotificationTests(TestCase):
+    def test_one_delivery_per_user_of_a_series(self):
+        start = timezone.make_aware(datetime(2030, 6, 4, 18, 0))
+        event = make_event(start_datetime=start, end_datetime=start + timedelta(hours=1),
+                           recurrence='FREQ=WEEKLY;COUNT=3')
+        user = User.objects.create_user('attendee', email='attendee@example.com')
+        rsvps.create_rsvp(event.pk, user, start)
+        rsvps.create_rsvp(event.pk, user, start + timedelta(weeks=1))
+        notification = EventNotification.objects.create(event=event, send_after=timezone.now())
+
+        send_notification(notification.pk)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.recipients, 1)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_retried_chunk_does_not_resend(self):
+        event = make_event()
+        for name in ['a', 'b', 'c']:
+            rsvps.create_rsvp(event.pk, User.objects.create_user(name, email=f'{name}@example.com'))
+        notification = EventNotification.objects.create(event=event, send_after=timezone.now())
+        send_notification(notification.pk)
+        ids = list(notification.deliveries.order_by('pk').values_list('pk', flat=True))
+
+        send = EmailBackend.send_messages
+        calls = []
+
+        def crash_on_second(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise SystemExit  # the worker dies mid-chunk
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', crash_on_second):
+            with self.assertRaises(SystemExit):
+                deliver_chunk(notification.pk, ids[0], ids[-1])
+        deliver_chunk(notification.pk, ids[0], ids[-1])
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertFalse(notification.deliveries.exclude(status='sent').exists())
+
+
+class TrendingTests(TestCase):
+    def test_rsvp_far_past_epoch(self):
+        event = make_event()
+        rsvp_at = timezone.make_aware(datetime(2060, 1, 1))
+
+        record_rsvp(event.pk, rsvp_at)
+        record_rsvp(event.pk, rsvp_at)
+        record_rsvp(event.pk, rsvp_at, sign=-1)
+
+        event.refresh_from_db()
+        self.assertGreater(event.trending_score, 0)
+        self.assertLess(event.trending_score, float('inf'))
+
+    def test_recompute_rebases_epoch(self):
+        event = make_event()
+        other = make_event()
+        rsvps.create_rsvp(event.pk, User.objects.create_user('first'))
+        rsvps.create_rsvp(event.pk, User.objects.create_user('second'))
+        rsvps.create_rsvp(other.pk, User.objects.create_user('third'))
+
+        recompute_scores()
+
+        self.assertAlmostEqual(current_epoch(), timezone.now().timestamp(), delta=60)
+        event.refresh_from_db()
+        other.refresh_from_db()
+        self.assertAlmostEqual(event.trending_score, 2, places=3)
+        self.assertAlmostEqual(other.trending_score, 1, places=3)
+        # New RSVPs are added on the rebased scale.
+        rsvps.create_rsvp(other.pk, User.objects.create_user('fourth'))
+        rsvps.create_rsvp(other.pk, User.objects.create_user('fifth'))
+        other.refresh_from_db()
+        self.assertAlmostEqual(other.trending_score, 3, places=3)
+
+
+class OccurrenceApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user('host')
+        start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        self.event = make_event(host_user=self.host, capacity=1, start_datetime=start,
+                                end_datetime=start + timedelta(hours=1), recurrence='FREQ=DAILY;COUNT=3')
+        self.client = APIClient()
+        self.first, self.second, _ = [item['occurrence_start'] for item in self.occurrences()]
+
+    def occurrences(self, **params):
+        cache.clear()  # listings are cached per list version
+        response = self.client.get('/api/events/occurrences/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item for item in response.data['results'] if item['event'] == self.event.pk]
+
+    def rsvp(self, username, occurrence):
+        user = User.objects.create_user(username, email=f'{username}@example.com')
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/events/{self.event.pk}/rsvp/', {'occurrence': occurrence})
+
+    def change(self, **data):
+        self.client.force_authenticate(self.host)
+        return self.client.post(f'/api/events/{self.event.pk}/occurrence/', data)
+
+    def test_occurrence_window(self):
+        self.assertEqual(len(self.occurrences()), 3)
+        self.assertEqual(len(self.occurrences(start_date=self.first, end_date=self.second)), 1)
+        response = self.client.get('/api/events/occurrences/', {'start_date': self.second, 'end_date': self.first})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rsvp_per_occurrence(self):
+        self.assertEqual(self.rsvp('a', self.first).data['status'], RSVP.GOING)
+        self.assertEqual(self.rsvp('b', self.first).data['status'], RSVP.WAITLISTED)
+        self.assertEqual(self.rsvp('c', self.second).data['status'], RSVP.GOING)
+        self.assertEqual(self.rsvp('d', '').status_code, 400)
+        self.assertEqual([item['seats_taken'] for item in self.occurrences()], [1, 1, 0])
+
+    def test_cancel_occurrence(self):
+        self.rsvp('a', self.first)
+        self.rsvp('b', self.first)
+        self.rsvp('c', self.second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.change(occurrence=self.first, is_cancelled=True).status_code, 200)
+
+        self.assertFalse(RSVP.objects.filter(event=self.event, occurrence_start=self.first).exists())
+        self.assertEqual(EventOccurrence.objects.get(event=self.event, original_start=self.first).seats_taken, 0)
+        self.assertEqual(RSVP.objects.filter(event=self.event).count(), 1)
+        notification = EventNotification.objects.get(event=self.event, kind='cancelled')
+        self.assertEqual(notification.occurrence_start, datetime.fromisoformat(self.first))
+        self.assertEqual(
+            sorted(notification.deliveries.values_list('email', flat=True)), ['a@example.com', 'b@example.com'],
+        )
+        _, body = render_notification(notification)
+        self.assertIn('" on ', body)
+        self.assertIn('has been cancelled', body)
+        self.assertEqual(self.rsvp('e', self.first).status_code, 400)
+        self.assertEqual(len(self.occurrences()), 2)
+
+    def test_move_occurrence(self):
+        self.rsvp('a', self.second)
+        moved = datetime.fromisoformat(self.second) + timedelta(hours=2)
+
+        response = self.change(occurrence=self.second, start_datetime=moved.isoformat())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(RSVP.objects.filter(event=self.event, occurrence_start=self.second).exists())
+        notification = EventNotification.objects.get(event=self.event, status='pending')
+        self.assertEqual(notification.occurrence_start, datetime.fromisoformat(self.second))
+        self.assertIn('start_datetime', notification.changes)
+        starts = [item['start_datetime'] for item in self.occurrences()]
+        self.assertIn(moved, [datetime.fromisoformat(start) for start in starts])
+
+    def test_schedule_change_with_rsvps(self):
+        self.client.force_authenticate(self.host)
+        url = f'/api/events/{self.event.pk}/'
+        self.assertEqual(self.client.patch(url, {'recurrence': 'FREQ=DAILY;COUNT=5'}).status_code, 200)
+
+        self.rsvp('a', self.first)
+        self.client.force_authenticate(self.host)
+        self.assertEqual(self.client.patch(url, {'recurrence': 'FREQ=WEEKLY;COUNT=3'}).status_code, 400)
+        self.assertEqual(self.client.patch(url, {'recurrence': ''}).status_code, 400)
+        later = self.event.start_datetime + timedelta(hours=1)
+        self.assertEqual(self.client.patch(url, {'start_datetime': later, 'end_datetime': later + timedelta(hours=1)})
+                         .status_code, 400)
+        self.assertEqual(self.client.patch(url, {'title': 'Renamed'}).status_code, 200)
+
+    def test_one_off_becoming_a_series(self):
+        event = make_event(host_user=self.host)
+        rsvps.create_rsvp(event.pk, User.objects.create_user('a'))
+        self.client.force_authenticate(self.host)
+        response = self.client.patch(f'/api/events/{event.pk}/', {'recurrence': 'FREQ=DAILY;COUNT=2'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def expire(self):
+        snapshot = cache.get(feed.FEED_KEY)
+        cache.set(feed.FEED_KEY, {**snapshot, 'built_at': snapshot['built_at'] - 3600}, None)
+
+    def test_one_request_rebuilds_an_expired_snapshot(self):
+        old = feed.store_feed()
+        self.expire()
+        cache.add(feed.REBUILD_LOCK_KEY, 1)  # another request is rebuilding
+        with mock.patch.object(feed, 'build_feed') as build:
+            body, _ = feed.current_feed()
+        build.assert_not_called()
+        self.assertEqual(body, old['body'])
+
+        cache.delete(feed.REBUILD_LOCK_KEY)
+        _, age = feed.current_feed()
+        self.assertLess(age, 60)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_changes_mark_local_snapshot_stale(self):
+        feed.store_feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            event = make_event(title='Late addition')
+        self.assertTrue(cache.get(feed.FEED_KEY)['stale'])
+        body, _ = feed.current_feed()
+        self.assertIn(b'Late addition', body)
+        self.assertIn(event.pk, cache.get(feed.FEED_KEY)['event_ids'])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_changes_queue_a_rebuild_with_shared_cache(self):
+        feed.store_feed()
+        make_event()
+        self.assertTrue(Task.objects.filter(name=feed.rebuild_feed.task_name).exists())
+
+    def test_status(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/events/feed/status/').status_code, 403)
+        client.get('/api/events/feed/')
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        status = client.get('/api/events/feed/status/').data
+        self.assertTrue(status['built'])
+        self.assertFalse(status['stale'])
+
+
+class ListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_links_follow_the_requested_origin(self):
+        for number in range(21):
+            make_event(title=f'Event {number}')
+        client = APIClient()
+        first = client.get('/api/events/', HTTP_HOST='events.example.edu')
+        self.assertTrue(first.data['next'].startswith('http://events.example.edu/'))
+        second = client.get('/api/events/', HTTP_HOST='internal:8000', secure=True)
+        self.assertTrue(second.data['next'].startswith('https://internal:8000/'))
+
+
+class RsvpTests(TestCase):
+    def setUp(self):
+        self.event = make_event(capacity=2)
+        self.client = APIClient()
+
+    def rsvp(self, name):
+        user = User.objects.create_user(name)
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/events/{self.event.pk}/rsvp/').data
+
+    def cancel(self, name):
+        self.client.force_authenticate(User.objects.get(username=name))
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.delete(f'/api/events/{self.event.pk}/cancel_rsvp/')
+
+    def statuses(self):
+        return dict(RSVP.objects.filter(event=self.event).values_list('user__username', 'status'))
+
+    def test_capacity_waitlist_and_cancel(self):
+        self.assertEqual(self.rsvp('ana')['status'], RSVP.GOING)
+        self.assertEqual(self.rsvp('ben')['status'], RSVP.GOING)
+        third = self.rsvp('cho')
+        self.assertEqual((third['status'], third['waitlist_position']), (RSVP.WAITLISTED, 1))
+        self.assertEqual(self.rsvp('dev')['waitlist_position'], 2)
+
+        # A going cancellation hands its seat to the head of the waitlist.
+        self.assertEqual(self.cancel('ana').status_code, 200)
+        self.assertEqual(self.statuses(), {'ben': RSVP.GOING, 'cho': RSVP.GOING, 'dev': RSVP.WAITLISTED})
+        # A waitlisted cancellation frees nothing.
+        self.cancel('dev')
+        self.assertEqual(self.statuses(), {'ben': RSVP.GOING, 'cho': RSVP.GOING})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(self.cancel('dev').status_code, 404)
+
+    def test_occurrences_have_their_own_seats(self):
+        event = make_event(capacity=1, recurrence='FREQ=WEEKLY;COUNT=3')
+        start = event.start_datetime
+        first = rsvps.create_rsvp(event.pk, User.objects.create_user('ana'), start)
+        other = rsvps.create_rsvp(event.pk, User.objects.create_user('ben'), start + timedelta(weeks=1))
+        full = rsvps.create_rsvp(event.pk, User.objects.create_user('cho'), start)
+        self.assertEqual([first.status, other.status, full.status], [RSVP.GOING, RSVP.GOING, RSVP.WAITLISTED])
+        with self.captureOnCommitCallbacks(execute=True):
+            rsvps.cancel_rsvp(event.pk, first.user, start)
+        full.refresh_from_db()
+        self.assertEqual(full.status, RSVP.GOING)
+
+
+class ConcurrentRsvpTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('threads cannot share an in-memory SQLite database; set a TEST NAME to run this')
+
+    def rsvp_in_parallel(self, event, occurrence_start=None):
+        users = [User.objects.create_user(f'user{number}') for number in range(12)]
+        errors = []
+
+        def attempt(user):
+            try:
+                rsvps.create_rsvp(event.pk, user, occurrence_start)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        statuses = RSVP.objects.filter(event=event).values_list('status', flat=True)
+        self.assertEqual(sorted(statuses), [RSVP.GOING] * 3 + [RSVP.WAITLISTED] * 9)
+
+    def test_parallel_rsvps_never_overbook(self):
+        event = make_event(capacity=3)
+        self.rsvp_in_parallel(event)
+        event.refresh_from_db()
+        self.assertEqual(event.seats_taken, 3)
+
+    def test_parallel_occurrence_rsvps_never_overbook(self):
+        # Reads before its first write, which needs the IMMEDIATE transaction mode.
+        event = make_event(capacity=3, recurrence='FREQ=WEEKLY;COUNT=3')
+        self.rsvp_in_parallel(event, event.start_datetime)
+        self.assertEqual(EventOccurrence.objects.get(event=event).seats_taken, 3)
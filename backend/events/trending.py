@@ -0,0 +1,102 @@
+"""
+Trending score for upcoming events.
+
+Every RSVP contributes a weight that decays exponentially with its age. To
+keep the score maintainable with a single atomic ``UPDATE`` per RSVP, it is
+stored relative to an epoch: an RSVP at time ``t`` adds
+``exp(lambda * (t - epoch))``. All events decay by the same factor as time
+moves on, so ordering by the stored value is the same as ordering by the
+decayed score at any instant, and nothing needs rewriting just because time
+passed. ``current_score`` converts back to "RSVPs worth of recent activity".
+
+Weights grow as ``t`` moves away from the epoch, so ``recompute_scores``
+moves the epoch (kept in ``TrendingEpoch``) to the present once it is older
+than ``TRENDING_REBASE_DAYS``, rewriting every score in the same transaction.
+``record_rsvp`` reads the epoch in its ``UPDATE``, so it always adds on the
+scale the scores are stored in. Exponents are capped at ``MAX_EXPONENT`` in
+case rebasing stops running: ordering then degrades, but RSVPs keep working.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Subquery, Value
+from django.db.models.functions import Coalesce, Exp, Least
+from django.utils import timezone
+
+from .listcache import bump_list_version
+from .models import Event, RSVP, TrendingEpoch
+from .recurrence import upcoming_q
+
+# exp() of anything larger overflows a float
+MAX_EXPONENT = 700
+
+
+def decay_rate():
+    """Decay constant lambda per second"""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def initial_epoch():
+    return datetime.fromisoformat(settings.TRENDING_EPOCH).timestamp()
+
+
+def current_epoch():
+    """Unix time the stored scores are relative to"""
+    epoch = TrendingEpoch.objects.values_list('epoch', flat=True).first()
+    return initial_epoch() if epoch is None else epoch
+
+
+def rsvp_weight(rsvp_at, epoch):
+    """Contribution of one RSVP, relative to ``epoch``"""
+    return math.exp(min(decay_rate() * (rsvp_at.timestamp() - epoch), MAX_EXPONENT))
+
+
+def current_score(stored_score, now=None):
+    """Convert a stored score into its decayed value at ``now``"""
+    now = now or timezone.now()
+    return stored_score * math.exp(-decay_rate() * (now.timestamp() - current_epoch()))
+
+
+def record_rsvp(event_id, rsvp_at, sign=1):
+    """Add (or with ``sign=-1`` remove) one RSVP from an event's score"""
+    epoch = Coalesce(
+        Subquery(TrendingEpoch.objects.values('epoch')[:1]), Value(initial_epoch()), output_field=FloatField(),
+    )
+    exponent = Value(decay_rate() * rsvp_at.timestamp()) - decay_rate() * epoch
+    Event.objects.filter(pk=event_id).update(
+        trending_score=F('trending_score') + sign * Exp(Least(exponent, Value(float(MAX_EXPONENT))))
+    )
+
+
+def recompute_scores(batch_size=500):
+    """Rebuild scores for upcoming events from RSVPs and zero out past ones"""
+    now = timezone.now()
+    upcoming = Event.objects.filter(upcoming_q(now))
+
+    with transaction.atomic():
+        epoch = current_epoch()
+        if now.timestamp() - epoch > settings.TRENDING_REBASE_DAYS * 86400:
+            epoch = now.timestamp()
+            TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': epoch})
+
+        totals = defaultdict(float)
+        rsvps = RSVP.objects.filter(upcoming_q(now, prefix='event__')).values_list('event_id', 'rsvp_at')
+        for event_id, rsvp_at in rsvps.iterator(chunk_size=5000):
+            totals[event_id] += rsvp_weight(rsvp_at, epoch)
+
+        changed = []
+        for event in upcoming.only('id', 'trending_score').iterator(chunk_size=batch_size):
+            score = totals.get(event.id, 0.0)
+            if not math.isclose(event.trending_score, score):
+                event.trending_score = score
+                changed.append(event)
+        Event.objects.bulk_update(changed, ['trending_score'], batch_size=batch_size)
+
+        expired = Event.objects.exclude(upcoming_q(now)).exclude(trending_score=0).update(trending_score=0)
+    if changed or expired:
+        bump_list_version()
+    return len(changed), expired
@@ -7,6 +7,9 @@ router.register(r'categories', views.EventCategoryViewSet, basename='eventcatego
 router.register(r'events', views.EventViewSet, basename='event')
 
 urlpatterns = [
+    # Before the router, which would take "feed" for an event id.
+    path('events/feed/', views.feed, name='event-feed'),
+    path('events/feed/status/', views.feed_snapshot_status, name='event-feed-status'),
     path('', include(router.urls)),
 ]
 
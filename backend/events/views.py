@@ -1,58 +1,175 @@
-from rest_framework import viewsets, filters, status, permissions
-from rest_framework.decorators import action
+import hashlib
+from datetime import timedelta
+from itertools import islice
+
+from rest_framework import viewsets, filters, serializers, status, permissions
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_http_methods
+
+from campus_events.exports import export_response, requested_format
+from campus_events.refdata import reference_data
 
-from organizations.models import Organization
-from .models import Event, EventCategory, RSVP
-from .serializers import EventSerializer, EventCategorySerializer
+from organizations.models import Organization, OrganizationMember
+from .models import ArchivedEvent, ArchivedRSVP, Event, EventCategory, EventOccurrence, RSVP
+from .serializers import EventSerializer, EventCategorySerializer, OccurrenceChangeSerializer, SyncEventSerializer
+from .recommendations import recommended_events
+from .filters import EventOrderingFilter
+from .archive import as_event, load_rows, union_rows
+from .facets import compute_facets
+from .listcache import cache_key, cached
+from .checkin import check_in, make_token
+from .feed import current_feed, feed_status
+from .notifications import detect_occurrence_changes, notify_occurrence_cancelled, occurrence_times, record_changes
+from .recurrence import MAX_RULE_YEARS, expand, is_occurrence, parse_moment, upcoming_q
+from . import rsvps as rsvp_service
+from . import sync
 
 
 class EventCategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for event categories"""
+    """ViewSet for event categories, served from the in-process reference cache"""
     queryset = EventCategory.objects.all()
     serializer_class = EventCategorySerializer
 
+    def list(self, request, *args, **kwargs):
+        # The query string (page number) is part of the representation.
+        query = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()[:8]
+        etag = f'"categories-{reference_data.version()}-{query}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            categories = sorted(reference_data.table('events.EventCategory').values(), key=lambda c: c.name)
+            page = self.paginate_queryset(categories)
+            if page is not None:
+                response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+            else:
+                response = Response(self.get_serializer(categories, many=True).data)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.REFERENCE_DATA_MAX_AGE)
+        return response
+
+
+@require_http_methods(["GET"])
+def feed(request):
+    """Homepage feed, served as prebuilt JSON (see events/feed.py)"""
+    body, age = current_feed()
+    response = HttpResponse(body, content_type='application/json')
+    # Caches count Age against max-age, so the staleness bound holds downstream too.
+    response['Age'] = str(int(age))
+    patch_cache_control(response, public=True, max_age=settings.FEED_MAX_AGE)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def feed_snapshot_status(request):
+    """Age and size of this process's feed snapshot, for monitoring (staff only)"""
+    return Response(feed_status())
+
+
+def can_manage_event(user, event):
+    """Whether ``user`` hosts ``event`` directly or leads its host organization"""
+    if user.is_staff or (event.host_user_id and event.host_user_id == user.id):
+        return True
+    if not event.host_organization_id:
+        return False
+    return OrganizationMember.objects.filter(
+        Q(is_leader=True) | Q(is_board_member=True),
+        organization_id=event.host_organization_id,
+        user=user,
+    ).exists()
+
 
 class EventViewSet(viewsets.ModelViewSet):
     """ViewSet for events"""
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, EventOrderingFilter]
     filterset_fields = ['category', 'modality', 'has_free_food', 'has_free_swag', 'host_organization', 'is_approved', 'status']
     search_fields = ['title', 'description', 'location']
-    ordering_fields = ['start_datetime', 'created_at']
+    ordering_fields = ['start_datetime', 'created_at', 'trending_score']
     ordering = ['-start_datetime']
 
     def get_queryset(self):
-        queryset = Event.objects.all()
-        
+        queryset = self.apply_request_filters(Event.objects.all())
+
+        # Only show upcoming events by default (can be overridden); a series
+        # counts while it has occurrences left.
+        # Check-in and rosters are needed once the event has started, so they
+        # need past ones, and the calendar view filters by its own time window.
+        if self.action not in ('retrieve', 'check_in', 'roster', 'occurrences'):
+            if not self.includes_past():
+                queryset = queryset.filter(upcoming_q(timezone.now()))
+        return queryset
+
+    def get_archive_queryset(self):
+        """Archived (long past) events matching the request, see events/archive.py"""
+        return self.apply_request_filters(ArchivedEvent.objects.all())
+
+    def includes_past(self):
+        return self.request.query_params.get('include_past', 'false').lower() == 'true'
+
+    def apply_request_filters(self, queryset, dates=True):
         # Filter by date range if provided
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
+        start_date = self.request.query_params.get('start_date', None) if dates else None
+        end_date = self.request.query_params.get('end_date', None) if dates else None
         
         if start_date:
             queryset = queryset.filter(start_datetime__gte=start_date)
         if end_date:
             queryset = queryset.filter(end_datetime__lte=end_date)
-        
-        # Only show upcoming events by default (can be overridden)
-        if self.action != 'retrieve':
-            if self.request.query_params.get('include_past', 'false').lower() != 'true':
-                queryset = queryset.filter(start_datetime__gte=timezone.now())
 
         rsvped_by_user = self.request.query_params.get('rsvped_by_user', None)
         if rsvped_by_user and self.request.user.is_authenticated:
+            # A subquery, as a join would repeat series RSVPed for several occurrences.
+            rsvp_model = queryset.model._meta.get_field('rsvps').related_model
+            rsvped = rsvp_model.objects.filter(user=self.request.user).values('event_id')
             if rsvped_by_user.lower() == 'true':
-                queryset = queryset.filter(rsvps__user=self.request.user)
+                queryset = queryset.filter(pk__in=rsvped)
             elif rsvped_by_user.lower() == 'false':
-                queryset = queryset.exclude(rsvps__user=self.request.user)
+                queryset = queryset.exclude(pk__in=rsvped)
             
         return queryset
 
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Old events may have been moved to the archive.
+            pk = str(self.kwargs.get(self.lookup_field, ''))
+            archived = ArchivedEvent.objects.filter(pk=pk).first() if pk.isdigit() else None
+            if self.action not in ('retrieve', 'roster') or archived is None:
+                raise
+            return as_event(archived)
+
+    def list(self, request, *args, **kwargs):
+        # user_has_rsvp makes each page specific to the viewer.
+        key = cache_key('list', request, per_user=True)
+        return Response(cached(key, lambda: self.list_data(request, *args, **kwargs)))
+
+    def list_data(self, request, *args, **kwargs):
+        if not self.includes_past():
+            return super().list(request, *args, **kwargs).data
+        live = self.filter_queryset(self.get_queryset())
+        archived = self.filter_queryset(self.get_archive_queryset())
+        ordering = EventOrderingFilter().get_ordering(request, live, self)
+        rows = union_rows(live, archived, ordering)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(load_rows(page), many=True).data).data
+        return self.get_serializer(load_rows(rows), many=True).data
+
     def perform_create(self, serializer):
         
         # Get host_organization from validated data if present
@@ -70,6 +187,195 @@ class EventViewSet(viewsets.ModelViewSet):
             host_user = self.request.user
             serializer.save(host_user=host_user)
 
+    def perform_update(self, serializer):
+        event = serializer.save()
+        # Raising or removing the capacity frees seats for the waitlist(s).
+        waitlisted = (
+            RSVP.objects.filter(event=event, status=RSVP.WAITLISTED)
+            .order_by().values_list('occurrence_start', flat=True).distinct()
+        )
+        for occurrence_start in waitlisted:
+            rsvp_service.promote_waitlist(event.pk, occurrence_start)
+
+    def occurrence_for(self, event, upcoming=False):
+        """
+        The occurrence start named by the request's ``occurrence`` parameter for
+        a recurring event; None for one-off events.
+        """
+        if not event.recurrence:
+            return None
+        start = parse_moment(self.request.data.get('occurrence') or self.request.query_params.get('occurrence'))
+        if start is None or not is_occurrence(event, start):
+            raise ValidationError({'occurrence': 'Expected the start datetime of one of the event\'s occurrences.'})
+        if upcoming:
+            override = EventOccurrence.objects.filter(event=event, original_start=start).first()
+            if override is not None and override.is_cancelled:
+                raise ValidationError({'occurrence': 'This occurrence has been cancelled.'})
+            if (override and override.start_datetime or start) < timezone.now():
+                raise ValidationError({'occurrence': 'This occurrence has already started.'})
+        return start
+
+    def occurrence_window(self):
+        """The [start, end) window requested from the occurrences view"""
+        params = self.request.query_params
+        start = parse_moment(params['start_date']) if params.get('start_date') else timezone.now()
+        if start is None:
+            raise ValidationError({'start_date': 'Expected a date or datetime.'})
+        if params.get('end_date'):
+            end = parse_moment(params['end_date'])
+            if end is None:
+                raise ValidationError({'end_date': 'Expected a date or datetime.'})
+        else:
+            end = start + timedelta(days=settings.OCCURRENCE_WINDOW_DAYS)
+        if abs(start - timezone.now()) > timedelta(days=365 * MAX_RULE_YEARS):
+            raise ValidationError({'start_date': f'Must be within {MAX_RULE_YEARS} years of today.'})
+        if not start < end <= start + timedelta(days=settings.OCCURRENCE_MAX_WINDOW_DAYS):
+            raise ValidationError({'end_date': f'Must be after start_date and at most '
+                                               f'{settings.OCCURRENCE_MAX_WINDOW_DAYS} days later.'})
+        return start, end
+
+    @action(detail=False, methods=['get'])
+    def occurrences(self, request):
+        """
+        Calendar view: one item per occurrence starting in a time window, with
+        recurring events expanded on the fly.
+
+        ``start_date``/``end_date`` bound the window (default: from now for
+        ``OCCURRENCE_WINDOW_DAYS``); the other list filters apply to the events.
+        Pages are read with ``offset`` and ``limit``, and each distinct event
+        is serialized once under ``events``.
+        """
+        window = self.occurrence_window()
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), settings.OCCURRENCE_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': 'Expected integers for offset and limit.'})
+        key = cache_key('occurrences', request, per_user=True)
+        return Response(cached(key, lambda: self.occurrence_page(request, window, offset, limit)))
+
+    def occurrence_page(self, request, window, offset, limit):
+        start, end = window
+        events = self.filter_queryset(self.apply_request_filters(Event.objects.all(), dates=False))
+        # Only the one-off events that can land on this page are read.
+        single = (
+            events.filter(recurrence='', start_datetime__gte=start, start_datetime__lt=end)
+            .order_by('start_datetime', 'pk')[:offset + limit + 1]
+        )
+        series = list(
+            events.exclude(recurrence='').filter(start_datetime__lt=end)
+            .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start))
+        )
+        # One extra item tells whether there is a next page.
+        page = list(islice(expand(single, series, start, end), offset, offset + limit + 1))
+        more = len(page) > limit
+        page = page[:limit]
+
+        distinct = list({occurrence.event.pk: occurrence.event for occurrence in page}.values())
+        to_datetime = serializers.DateTimeField().to_representation
+        return {
+            'next': replace_query_param(request.build_absolute_uri(), 'offset', offset + limit) if more else None,
+            'events': {event['id']: event for event in self.get_serializer(distinct, many=True).data},
+            'results': [
+                {
+                    'event': occurrence.event.pk,
+                    'occurrence_start': to_datetime(occurrence.original_start) if occurrence.original_start else None,
+                    'start_datetime': to_datetime(occurrence.start),
+                    'end_datetime': to_datetime(occurrence.end),
+                    'seats_taken': occurrence.seats_taken,
+                }
+                for occurrence in page
+            ],
+        }
+
+    @action(detail=True, methods=['post'], url_path='occurrence', permission_classes=[IsAuthenticated])
+    def change_occurrence(self, request, pk=None):
+        """
+        Cancel, move or restore one occurrence of a recurring event (hosts only).
+
+        Its RSVPs are told about a cancellation or move. Cancelling removes
+        them, which frees their seats; restoring opens it for new RSVPs.
+        """
+        event = self.get_object()
+        if not can_manage_event(request.user, event):
+            return Response({'error': 'Only event hosts can change occurrences.'},
+                            status=status.HTTP_403_FORBIDDEN)
+        if not event.recurrence:
+            return Response({'error': 'This event does not repeat.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = OccurrenceChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if not is_occurrence(event, data['occurrence']):
+            raise ValidationError({'occurrence': 'Expected the start datetime of one of the event\'s occurrences.'})
+        original_start = data['occurrence']
+        with transaction.atomic():
+            previous = EventOccurrence.objects.filter(event=event, original_start=original_start).first()
+            was_cancelled = previous is not None and previous.is_cancelled
+            occurrence, _ = EventOccurrence.objects.update_or_create(
+                event=event, original_start=original_start,
+                defaults={
+                    'is_cancelled': data['is_cancelled'],
+                    'start_datetime': data.get('start_datetime'),
+                    'end_datetime': data.get('end_datetime'),
+                },
+            )
+            if occurrence.is_cancelled and not was_cancelled:
+                notify_occurrence_cancelled(event, original_start)
+                # The RSVP post_delete receiver releases their seats.
+                RSVP.objects.filter(event=event, occurrence_start=original_start).delete()
+                occurrence.refresh_from_db(fields=['seats_taken'])
+            elif not occurrence.is_cancelled and not was_cancelled:
+                changes = detect_occurrence_changes(previous, occurrence, event)
+                if changes:
+                    record_changes(event, changes, original_start)
+        return Response({
+            'occurrence': data['occurrence'], 'is_cancelled': occurrence.is_cancelled,
+            'start_datetime': occurrence.start_datetime, 'end_datetime': occurrence.end_datetime,
+            'seats_taken': occurrence.seats_taken,
+        })
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync for offline clients, see events/sync.py.
+
+        Call without ``since`` for a snapshot, then with the returned ``token``
+        for what changed since; repeat while ``has_more``. ``reset`` means the
+        local copy must be dropped before applying the page.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), settings.SYNC_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        user = request.user if request.user.is_authenticated else None
+        try:
+            page = sync.changes_since(request.query_params.get('since'), user, limit)
+        except sync.InvalidToken:
+            raise ValidationError({'since': 'Invalid sync token.'})
+        page['events'] = SyncEventSerializer(page['events'], many=True, context=self.get_serializer_context()).data
+        return Response(page)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Sidebar counts per category, modality, perk and host for the current filters"""
+        per_user = 'rsvped_by_user' in request.query_params
+        key = cache_key('facets', request, per_user=per_user)
+        querysets = [self.filter_queryset(self.get_queryset())]
+        if self.includes_past():
+            querysets.append(self.filter_queryset(self.get_archive_queryset()))
+        return Response(cached(key, lambda: compute_facets(*querysets)))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def recommended(self, request):
+        """Upcoming events suggested from the user's RSVP history"""
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        events = recommended_events(request.user, limit=max(limit, 1))
+        serializer = self.get_serializer(events, many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):
         """Approve an event (set is_approved=True)"""
@@ -90,23 +396,112 @@ class EventViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def rsvp(self, request, pk=None):
-        """RSVP to an event"""
+        """RSVP to an event, joining the waitlist if it is full"""
         event = self.get_object()
-        rsvp, created = RSVP.objects.get_or_create(
-            event=event,
-            user=request.user
-        )
-        if created:
-            return Response({'message': 'RSVP successful'}, status=status.HTTP_201_CREATED)
-        return Response({'message': 'Already RSVPed'}, status=status.HTTP_200_OK)
+        occurrence_start = self.occurrence_for(event, upcoming=True)
+        try:
+            rsvp = rsvp_service.create_rsvp(event.pk, request.user, occurrence_start)
+        except rsvp_service.AlreadyRSVPed:
+            return Response({'message': 'Already RSVPed'}, status=status.HTTP_200_OK)
+        if rsvp.status == RSVP.WAITLISTED:
+            return Response(
+                {'message': 'Event is full, added to waitlist', 'status': rsvp.status,
+                 'waitlist_position': rsvp_service.waitlist_position(rsvp)},
+                status=status.HTTP_201_CREATED
+            )
+        return Response({'message': 'RSVP successful', 'status': rsvp.status}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['delete'], permission_classes=[IsAuthenticated])
     def cancel_rsvp(self, request, pk=None):
-        """Cancel RSVP to an event"""
+        """Cancel RSVP to an event, promoting the next waitlisted user"""
         event = self.get_object()
-        try:
-            rsvp = RSVP.objects.get(event=event, user=request.user)
-            rsvp.delete()
+        if rsvp_service.cancel_rsvp(event.pk, request.user, self.occurrence_for(event)):
             return Response({'message': 'RSVP cancelled'}, status=status.HTTP_200_OK)
-        except RSVP.DoesNotExist:
+        return Response({'error': 'No RSVP found'}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def roster(self, request, pk=None):
+        """Download the RSVP and attendance list as CSV, or XLSX with ``?file_format=xlsx`` (hosts only)"""
+        event = self.get_object()
+        if not can_manage_event(request.user, event):
+            return Response({'error': 'Only event hosts can download the roster.'},
+                            status=status.HTTP_403_FORBIDDEN)
+        file_format = requested_format(request)
+        if file_format is None:
+            return Response({'file_format': 'Expected csv or xlsx.'}, status=status.HTTP_400_BAD_REQUEST)
+        model = ArchivedRSVP if getattr(event, 'is_archived', False) else RSVP
+        rows = (
+            model.objects.filter(event_id=event.pk)
+            .order_by('occurrence_start', 'rsvp_at', 'pk')
+            .values_list(
+                'user__username', 'user__first_name', 'user__last_name', 'user__email',
+                'status', 'occurrence_start', 'rsvp_at', 'attended',
+            )
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        header = ['Username', 'First name', 'Last name', 'Email', 'Status', 'Occurrence', 'RSVP at', 'Attended']
+        return export_response(f'event-{event.pk}-roster', header, rows, file_format)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def checkin_token(self, request, pk=None):
+        """Signed check-in token for the current user's RSVP, to render as a QR code"""
+        # Recurring events: ?occurrence=<start> picks the occurrence.
+        if not pk.isdigit():
+            raise Http404
+        occurrence_start = parse_moment(request.query_params.get('occurrence'))
+        # Waitlisted RSVPs hold no seat, so they get no ticket.
+        rsvp = RSVP.objects.filter(
+            event_id=pk, user=request.user, occurrence_start=occurrence_start, status=RSVP.GOING
+        ).select_related('event').first()
+        if rsvp is None:
             return Response({'error': 'No RSVP found'}, status=status.HTTP_404_NOT_FOUND)
+        # Tokens expire a while after the event (occurrence) ends.
+        event = rsvp.event
+        ends_at = event.end_datetime
+        if occurrence_start is not None:
+            override = EventOccurrence.objects.filter(event=event, original_start=occurrence_start).first()
+            duration = event.end_datetime - event.start_datetime
+            ends_at = occurrence_times(override, occurrence_start, duration)[1]
+        return Response({'token': make_token(rsvp, ends_at), 'attended': rsvp.attended})
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def check_in(self, request, pk=None):
+        """
+        Mark attendance from scanned check-in tokens.
+
+        Send ``{"token": "..."}`` for a live scan, or ``{"tokens": [...]}`` to
+        upload scans collected while the scanner was offline. Live scans are
+        buffered and written in bulk; batch uploads are written before the
+        response is returned.
+        """
+        if not pk.isdigit():
+            raise Http404
+        # Scanners hit this endpoint in bursts, so remember who may scan.
+        cache_key = f'events:checkin-host:{pk}:{request.user.pk}'
+        allowed = cache.get(cache_key)
+        if allowed is None:
+            event = self.get_object()
+            allowed = can_manage_event(request.user, event)
+            cache.set(cache_key, allowed, 300)
+        if not allowed:
+            return Response({'error': 'Only event hosts can check in attendees.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        if 'tokens' in request.data:
+            tokens = request.data.get('tokens')
+            if not isinstance(tokens, list) or len(tokens) > settings.CHECKIN_MAX_BATCH:
+                return Response(
+                    {'tokens': f'Expected a list of at most {settings.CHECKIN_MAX_BATCH} tokens.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(check_in(int(pk), tokens, flush=True))
+
+        token = request.data.get('token')
+        if not token:
+            return Response({'token': 'This field is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        result = check_in(int(pk), [token])
+        if result['invalid']:
+            return Response({'error': 'Invalid check-in token.'}, status=status.HTTP_400_BAD_REQUEST)
+        if result['duplicate']:
+            return Response({'message': 'Already checked in', 'rsvp': result['duplicate'][0]})
+        return Response({'message': 'Checked in', 'rsvp': result['checked_in'][0]})
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from campus_events.admin_utils import ScalableAdminMixin
 from .models import Organization, OrganizationMember
 
 
@@ -6,7 +8,9 @@ from .models import Organization, OrganizationMember
 class OrganizationAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_by', 'is_verified', 'created_at']
     list_filter = ['is_verified', 'created_at']
+    list_select_related = ['created_by']
     search_fields = ['name', 'description']
+    autocomplete_fields = ['created_by']
     readonly_fields = ['created_at', 'updated_at']
     list_editable = ['is_verified']  # Allow quick editing from list view
     fieldsets = (
@@ -34,7 +38,13 @@ class OrganizationAdmin(admin.ModelAdmin):
 
 
 @admin.register(OrganizationMember)
-class OrganizationMemberAdmin(admin.ModelAdmin):
-    list_display = ['user', 'organization', 'is_board_member', 'is_leader', 'joined_at']
-    list_filter = ['is_board_member', 'is_leader', 'joined_at']
-    search_fields = ['user__username', 'organization__name']
+class OrganizationMemberAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'organization', 'role', 'is_board_member', 'is_leader', 'joined_at']
+    list_filter = ['is_board_member', 'is_leader']
+    list_select_related = ['user', 'organization']
+    search_fields = ['user__username__exact', 'organization__name__startswith']
+    search_help_text = 'Exact username, start of an organization name (case-sensitive), or a membership id.'
+    autocomplete_fields = ['user', 'organization']
+    date_hierarchy = 'joined_at'
+    # The model's leaders-first ordering would sort the whole table.
+    ordering = ['-joined_at']
@@ -0,0 +1,221 @@
+"""
+Incremental analytics rollups for organizations.
+
+``roll_up`` recomputes a window of days from raw rows and upserts them into
+the rollup tables; the analytics endpoint only ever reads those tables. Each
+run reopens the last few days already rolled up, because attendance is
+marked after the fact, and refreshes per-event totals for every event that
+starts inside the window or later (their RSVPs are still moving).
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from events.models import ArchivedRSVP, Event, RSVP
+from .models import (
+    Organization, OrganizationAttendee, OrganizationDailyStats,
+    OrganizationEventStats, OrganizationMember, OrganizationStats,
+)
+
+# Days already rolled up that are recomputed on every run.
+REOPEN_DAYS = 3
+# Days processed per transaction when backfilling a long history.
+CHUNK_DAYS = 31
+
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.combine(start, time.min, tzinfo=tz),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+    )
+
+
+def _first_activity_date():
+    dates = [
+        RSVP.objects.aggregate(first=Min('rsvp_at'))['first'],
+        Event.objects.filter(host_organization__isnull=False).aggregate(first=Min('start_datetime'))['first'],
+        OrganizationMember.objects.aggregate(first=Min('joined_at'))['first'],
+    ]
+    dates = [timezone.localtime(d).date() for d in dates if d]
+    return min(dates) if dates else None
+
+
+def default_start_date():
+    """First day the next incremental run should recompute"""
+    watermark = OrganizationStats.objects.aggregate(through=Min('rolled_up_through'))['through']
+    if watermark is None:
+        return _first_activity_date()
+    return watermark - timedelta(days=REOPEN_DAYS - 1)
+
+
+def _roll_up_days(start, end):
+    """Recompute daily rows for [start, end]; returns the organizations touched"""
+    lower, upper = _day_bounds(start, end)
+    rows = defaultdict(lambda: defaultdict(int))
+
+    rsvps = (
+        RSVP.objects.filter(rsvp_at__gte=lower, rsvp_at__lt=upper, event__host_organization__isnull=False)
+        .annotate(day=TruncDate('rsvp_at'))
+        .values('event__host_organization', 'day')
+        .annotate(total=Count('id'))
+    )
+    for row in rsvps:
+        rows[(row['event__host_organization'], row['day'])]['rsvps'] = row['total']
+
+    events = (
+        Event.objects.filter(start_datetime__gte=lower, start_datetime__lt=upper, host_organization__isnull=False)
+        .annotate(day=TruncDate('start_datetime'))
+        .values('host_organization', 'day')
+        .annotate(total=Count('id', distinct=True), attended=Count('rsvps', filter=Q(rsvps__attended=True)))
+    )
+    for row in events:
+        day = rows[(row['host_organization'], row['day'])]
+        day['events'] = row['total']
+        day['attended'] = row['attended']
+
+    joins = (
+        OrganizationMember.objects.filter(joined_at__gte=lower, joined_at__lt=upper)
+        .annotate(day=TruncDate('joined_at'))
+        .values('organization', 'day')
+        .annotate(total=Count('id'))
+    )
+    for row in joins:
+        rows[(row['organization'], row['day'])]['new_members'] = row['total']
+
+    members_before = dict(
+        OrganizationMember.objects.filter(joined_at__lt=lower)
+        .values_list('organization')
+        .annotate(total=Count('id'))
+    )
+    member_count = defaultdict(int, members_before)
+    objects = []
+    for (organization_id, day), values in sorted(rows.items(), key=lambda item: item[0][1]):
+        member_count[organization_id] += values['new_members']
+        objects.append(OrganizationDailyStats(
+            organization_id=organization_id, date=day, member_count=member_count[organization_id], **values,
+        ))
+
+    OrganizationDailyStats.objects.filter(date__gte=start, date__lte=end).delete()
+    OrganizationDailyStats.objects.bulk_create(objects, batch_size=1000)
+    return {organization_id for organization_id, _ in rows}
+
+
+def _roll_up_events(start):
+    """Refresh per-event totals for events starting on or after ``start``"""
+    lower, _ = _day_bounds(start, start)
+    events = (
+        Event.objects.filter(start_datetime__gte=lower, host_organization__isnull=False)
+        .values('id', 'title', 'host_organization', 'start_datetime')
+        .annotate(total=Count('rsvps'), attended=Count('rsvps', filter=Q(rsvps__attended=True)))
+    )
+    objects = [
+        OrganizationEventStats(
+            organization_id=row['host_organization'], event_id=row['id'], title=row['title'],
+            event_start=row['start_datetime'],
+            rsvps=row['total'], attended=row['attended'],
+        )
+        for row in events
+    ]
+    # Events may have been moved to another organization or earlier date.
+    OrganizationEventStats.objects.filter(
+        Q(event_start__gte=lower) | Q(event_id__in=[obj.event_id for obj in objects])
+    ).delete()
+    OrganizationEventStats.objects.bulk_create(objects, batch_size=1000)
+    return {obj.organization_id for obj in objects}
+
+
+def _roll_up_attendees(start):
+    """Recount attended events for everyone who RSVPed to a reopened event"""
+    lower, _ = _day_bounds(start, start)
+    affected = set(
+        RSVP.objects.filter(event__start_datetime__gte=lower, event__host_organization__isnull=False)
+        .values_list('event__host_organization', 'user')
+        .distinct()
+    )
+    by_organization = defaultdict(set)
+    for organization_id, user_id in affected:
+        by_organization[organization_id].add(user_id)
+
+    for organization_id, user_ids in by_organization.items():
+        counts = defaultdict(int)
+        # Older attendance lives in the archive tables.
+        for model in (RSVP, ArchivedRSVP):
+            for user_id, total in (
+                model.objects.filter(event__host_organization=organization_id, attended=True, user__in=user_ids)
+                .values_list('user')
+                .annotate(total=Count('event', distinct=True))
+            ):
+                counts[user_id] += total
+        OrganizationAttendee.objects.filter(organization_id=organization_id, user__in=user_ids).delete()
+        OrganizationAttendee.objects.bulk_create([
+            OrganizationAttendee(organization_id=organization_id, user_id=user_id, events_attended=total)
+            for user_id, total in counts.items() if total
+        ], batch_size=1000)
+    return set(by_organization)
+
+
+def _refresh_totals(organization_ids, through):
+    daily = dict(
+        (row['organization'], row)
+        for row in OrganizationDailyStats.objects.filter(organization__in=organization_ids)
+        .values('organization')
+        .annotate(events=Sum('events'), rsvps=Sum('rsvps'), attended=Sum('attended'))
+    )
+    repeat = dict(
+        OrganizationAttendee.objects.filter(organization__in=organization_ids, events_attended__gte=2)
+        .values_list('organization')
+        .annotate(total=Count('id'))
+    )
+    members = dict(
+        OrganizationMember.objects.filter(organization__in=organization_ids)
+        .values_list('organization')
+        .annotate(total=Count('id'))
+    )
+    for organization_id in organization_ids:
+        totals = daily.get(organization_id, {})
+        OrganizationStats.objects.update_or_create(
+            organization_id=organization_id,
+            defaults={
+                'events': totals.get('events') or 0,
+                'rsvps': totals.get('rsvps') or 0,
+                'attended': totals.get('attended') or 0,
+                'repeat_attendees': repeat.get(organization_id, 0),
+                'members': members.get(organization_id, 0),
+                'rolled_up_through': through,
+            },
+        )
+
+
+def roll_up(start=None, end=None):
+    """Recompute rollups for days [start, end]; returns the number of days processed"""
+    end = end or timezone.localdate()
+    start = start or default_start_date()
+    if start is None or start > end:
+        return 0
+
+    touched = set()
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS - 1), end)
+        with transaction.atomic():
+            touched |= _roll_up_days(chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    with transaction.atomic():
+        touched |= _roll_up_events(start)
+        touched |= _roll_up_attendees(start)
+        _refresh_totals(touched, end)
+        # Organizations without activity in the window still advance.
+        OrganizationStats.objects.bulk_create(
+            [OrganizationStats(organization_id=pk) for pk in
+             Organization.objects.filter(stats__isnull=True).values_list('id', flat=True)],
+            batch_size=1000,
+        )
+        OrganizationStats.objects.update(rolled_up_through=end)
+    return (end - start).days + 1
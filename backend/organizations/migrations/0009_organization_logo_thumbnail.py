@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0008_organization_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='logo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='org_logos/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_trending_score'),
+        ('organizations', '0009_organization_logo_thumbnail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('rsvps', models.PositiveIntegerField(default=0)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('repeat_attendees', models.PositiveIntegerField(default=0)),
+                ('members', models.PositiveIntegerField(default=0)),
+                ('rolled_up_through', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='organizations.organization')),
+            ],
+            options={
+                'verbose_name_plural': 'Organization Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizationAttendee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('events_attended', models.PositiveIntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendees', to='organizations.organization')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('organization', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('rsvps', models.PositiveIntegerField(default=0)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('new_members', models.PositiveIntegerField(default=0)),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='organizations.organization')),
+            ],
+            options={
+                'verbose_name_plural': 'Organization Daily Stats',
+                'ordering': ['organization', '-date'],
+                'unique_together': {('organization', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizationEventStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_start', models.DateTimeField()),
+                ('rsvps', models.PositiveIntegerField(default=0)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='organization_stats', to='events.event')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_stats', to='organizations.organization')),
+            ],
+            options={
+                'verbose_name_plural': 'Organization Event Stats',
+                'ordering': ['organization', '-event_start'],
+                'indexes': [models.Index(fields=['organization', '-event_start'], name='organizatio_organiz_909d9c_idx')],
+            },
+        ),
+    ]
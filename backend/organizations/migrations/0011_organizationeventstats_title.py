@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_titles(apps, schema_editor):
+    OrganizationEventStats = apps.get_model('organizations', 'OrganizationEventStats')
+    Event = apps.get_model('events', 'Event')
+    titles = dict(Event.objects.filter(
+        pk__in=OrganizationEventStats.objects.values('event_id')
+    ).values_list('pk', 'title'))
+    stats = list(OrganizationEventStats.objects.all())
+    for row in stats:
+        row.title = titles.get(row.event_id, '')
+    OrganizationEventStats.objects.bulk_update(stats, ['title'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_archive'),
+        ('organizations', '0010_organizationstats_organizationattendee_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationeventstats',
+            name='title',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='organizationeventstats',
+            name='event',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='organization_stats', to='events.event'),
+        ),
+        migrations.RunPython(copy_titles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0011_organizationeventstats_title'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='organizationmember',
+            name='joined_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
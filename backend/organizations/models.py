@@ -13,6 +13,7 @@ class Organization(models.Model):
     slack = models.URLField(blank=True)
     discord = models.URLField(blank=True)
     logo = models.ImageField(upload_to="org_logos/", blank=True)
+    logo_thumbnail = models.ImageField(upload_to="org_logos/thumbs/", blank=True, editable=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='created_organizations', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -31,8 +32,65 @@ class OrganizationMember(models.Model):
     is_board_member = models.BooleanField(default=False)
     is_leader = models.BooleanField(default=False)
     role = models.CharField(max_length=255, blank=True)
-    joined_at = models.DateTimeField(auto_now_add=True)
+    joined_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         unique_together = ['organization', 'user']
         ordering = ['-is_leader', '-is_board_member', 'joined_at']
+
+
+class OrganizationStats(models.Model):
+    """All-time analytics totals, maintained by `manage.py rollup_organization_stats`"""
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='stats')
+    events = models.PositiveIntegerField(default=0)
+    rsvps = models.PositiveIntegerField(default=0)
+    attended = models.PositiveIntegerField(default=0)
+    repeat_attendees = models.PositiveIntegerField(default=0)
+    members = models.PositiveIntegerField(default=0)
+    rolled_up_through = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Organization Stats"
+
+
+class OrganizationDailyStats(models.Model):
+    """Per-day analytics rollup for an organization"""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    events = models.PositiveIntegerField(default=0)  # events starting that day
+    rsvps = models.PositiveIntegerField(default=0)  # RSVPs placed that day
+    attended = models.PositiveIntegerField(default=0)  # attendees of that day's events
+    new_members = models.PositiveIntegerField(default=0)
+    member_count = models.PositiveIntegerField(default=0)  # members at end of day
+
+    class Meta:
+        verbose_name_plural = "Organization Daily Stats"
+        unique_together = ['organization', 'date']
+        ordering = ['organization', '-date']
+
+
+class OrganizationEventStats(models.Model):
+    """RSVP and attendance totals for one event hosted by an organization"""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='event_stats')
+    # No constraint: the stats outlive the event row when it is archived.
+    event = models.OneToOneField('events.Event', on_delete=models.DO_NOTHING, db_constraint=False, related_name='organization_stats')
+    title = models.CharField(max_length=200, blank=True)
+    event_start = models.DateTimeField()
+    rsvps = models.PositiveIntegerField(default=0)
+    attended = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Organization Event Stats"
+        indexes = [models.Index(fields=['organization', '-event_start'])]
+        ordering = ['organization', '-event_start']
+
+
+class OrganizationAttendee(models.Model):
+    """How many of an organization's events a user attended (for repeat attendees)"""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='attendees')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    events_attended = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['organization', 'user']
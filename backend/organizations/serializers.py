@@ -1,9 +1,15 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from events.serializers import EventSerializer
-from .models import Organization, OrganizationMember
+from .models import Organization, OrganizationDailyStats, OrganizationEventStats, OrganizationMember, OrganizationStats
 from accounts.models import StudentProfile
+from campus_events.loaders import BatchedSerializerMixin, BatchListSerializer, prime_forward, prime_reverse_one
+from campus_events.thumbnails import variant_url
 
-class OrganizationSerializer(serializers.ModelSerializer):
+class OrganizationSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     members_count = serializers.SerializerMethodField()
     events = EventSerializer(many=True, read_only=True)
     members = serializers.SerializerMethodField()
@@ -16,12 +22,34 @@ class OrganizationSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'members_count', 'members', 'events'
         ]
         read_only_fields = ['slug', 'is_verified', 'created_at', 'updated_at', 'created_by']
-    
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, organizations):
+        """Load members and events of every organization up front"""
+        organizations = [org for org in organizations if org.pk and not hasattr(org, '_members')]
+        if not organizations:
+            return
+        by_org = defaultdict(list)
+        for member in OrganizationMember.objects.filter(organization__in=organizations):
+            by_org[member.organization_id].append(member)
+        for org in organizations:
+            org._members = by_org[org.pk]
+        OrganizationMemberSerializer(context=self.context).prime(
+            [member for members in by_org.values() for member in members]
+        )
+
+        prefetch_related_objects(organizations, 'events')
+        self.fields['events'].child.prime([event for org in organizations for event in org.events.all()])
+
     def get_members_count(self, obj):
+        if hasattr(obj, '_members'):
+            return len(obj._members)
         return obj.members.count()
     
     def get_members(self, obj):
-        members = obj.members.select_related("user").all()
+        members = getattr(obj, '_members', None)
+        if members is None:
+            members = obj.members.select_related("user", "user__student_profile").all()
         return OrganizationMemberSerializer(
             members, 
             many=True, 
@@ -29,11 +57,17 @@ class OrganizationSerializer(serializers.ModelSerializer):
         ).data
 
 class MinimalOrganizationSerializer(serializers.ModelSerializer):
+    logo = serializers.SerializerMethodField()
+
     class Meta:
         model = Organization
         fields = ['id', 'name', 'slug', 'description', 'logo', 'is_verified']
 
-class OrganizationMemberSerializer(serializers.ModelSerializer):
+    def get_logo(self, obj):
+        """Serve the card-sized logo variant rather than the original upload"""
+        return variant_url(obj, 'logo', self.context.get('request'))
+
+class OrganizationMemberSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     organization = MinimalOrganizationSerializer(read_only=True)
 
@@ -56,6 +90,12 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
             'joined_at'
         ]
         read_only_fields = ['id', 'joined_at']
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, members):
+        users = prime_forward(members, 'user', self.loaders(User))
+        prime_reverse_one(users, 'student_profile', self.loaders(StudentProfile, 'user'))
+        prime_forward(members, 'organization', self.loaders(Organization))
 
     def get_user_username(self, obj):
         return obj.user.username
@@ -64,12 +104,36 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         profile = getattr(obj.user, "student_profile", None)
         if profile and profile.profile_picture:
-            relative_url = profile.profile_picture.url
-            return request.build_absolute_uri(relative_url) if request else relative_url
+            return variant_url(profile, "profile_picture", request)
         return ""
 
     def get_user_full_name(self, obj):
         first = obj.user.first_name or ""
         last = obj.user.last_name or ""
         full = f"{first} {last}".strip()
-        return full if full else obj.user.username
\ No newline at end of file
+        return full if full else obj.user.username
+
+class OrganizationStatsSerializer(serializers.ModelSerializer):
+    attendance_rate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrganizationStats
+        fields = ['events', 'rsvps', 'attended', 'attendance_rate', 'repeat_attendees', 'members', 'rolled_up_through']
+
+    def get_attendance_rate(self, obj):
+        return round(obj.attended / obj.rsvps, 4) if obj.rsvps else None
+
+class OrganizationDailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrganizationDailyStats
+        fields = ['date', 'events', 'rsvps', 'attended', 'new_members', 'member_count']
+
+class OrganizationEventStatsSerializer(serializers.ModelSerializer):
+    attendance_rate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrganizationEventStats
+        fields = ['event', 'title', 'event_start', 'rsvps', 'attended', 'attendance_rate']
+
+    def get_attendance_rate(self, obj):
+        return round(obj.attended / obj.rsvps, 4) if obj.rsvps else None
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from campus_events import autocomplete
+from campus_events.refdata import reference_data
+from campus_events.thumbnails import schedule_stale_thumbnails
+from events.listcache import bump_list_version
+from events.sync import record_upcoming_changes
+from .models import Organization
+
+
+@receiver(post_save, sender=Organization)
+def refresh_logo_thumbnail(sender, instance, **kwargs):
+    """Regenerate the logo thumbnail off-request whenever the logo changes"""
+    schedule_stale_thumbnails(instance)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_event_listings(sender, **kwargs):
+    """Events embed their host organization, so cached listings go stale"""
+    bump_list_version()
+
+
+@receiver(post_save, sender=Organization)
+def index_organization_name(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.on_saved('organizations', instance.pk)
+
+
+@receiver(post_delete, sender=Organization)
+def unindex_organization_name(sender, instance, **kwargs):
+    autocomplete.on_deleted('organizations', instance.pk)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_reference_data(sender, **kwargs):
+    """Verified organizations are cached in memory by every process"""
+    transaction.on_commit(reference_data.invalidate)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(pre_delete, sender=Organization)
+def log_hosted_event_changes(sender, instance, raw=False, created=False, **kwargs):
+    """Hosted events embed the organization, so they are synced again (see events/sync.py)"""
+    if not raw and not created:
+        record_upcoming_changes(host_organization=instance)
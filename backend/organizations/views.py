@@ -1,10 +1,28 @@
+from datetime import timedelta
+
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Organization, OrganizationMember
-from .serializers import OrganizationSerializer
+
+from campus_events.exports import export_response, requested_format
+from .models import Organization, OrganizationMember, OrganizationStats
+from .serializers import (
+    OrganizationSerializer, OrganizationStatsSerializer,
+    OrganizationDailyStatsSerializer, OrganizationEventStatsSerializer,
+)
+from django.conf import settings
+from django.db.models import Q
 from django.utils.text import slugify
 
 
+def is_officer(user, organization):
+    """Whether ``user`` is staff or a leader or board member of ``organization``"""
+    return user.is_staff or OrganizationMember.objects.filter(
+        Q(is_board_member=True) | Q(is_leader=True), organization=organization, user=user
+    ).exists()
+
+
 class OrganizationViewSet(viewsets.ModelViewSet):
     """ViewSet for organizations"""
     queryset = Organization.objects.filter(is_verified=True)
@@ -60,3 +78,63 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             is_leader=True,
             role="President"
         )
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def analytics(self, request, pk=None):
+        """Attendance and membership stats, read from the rollup tables only"""
+        lookup = {'pk': pk} if pk.isdigit() else {'slug': pk}
+        try:
+            org = Organization.objects.get(**lookup)
+        except Organization.DoesNotExist:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not is_officer(request.user, org):
+            return Response({'detail': 'Only organization leaders can view analytics.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            days = min(max(int(request.query_params.get('days', 90)), 1), 365)
+        except ValueError:
+            days = 90
+
+        stats = OrganizationStats.objects.filter(organization=org).first()
+        if stats is None or stats.rolled_up_through is None:
+            return Response({'organization': org.id, 'totals': None, 'daily': [], 'events': []})
+
+        since = stats.rolled_up_through - timedelta(days=days - 1)
+        daily = org.daily_stats.filter(date__gte=since).order_by('date')
+        events = org.event_stats.order_by('-event_start')[:20]
+        return Response({
+            'organization': org.id,
+            'totals': OrganizationStatsSerializer(stats).data,
+            'daily': OrganizationDailyStatsSerializer(daily, many=True).data,
+            'events': OrganizationEventStatsSerializer(events, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def roster(self, request, pk=None):
+        """Download the member list as CSV, or XLSX with ``?file_format=xlsx`` (leaders only)"""
+        lookup = {'pk': pk} if pk.isdigit() else {'slug': pk}
+        try:
+            org = Organization.objects.get(**lookup)
+        except Organization.DoesNotExist:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not is_officer(request.user, org):
+            return Response({'detail': 'Only organization leaders can download the member list.'},
+                            status=status.HTTP_403_FORBIDDEN)
+        file_format = requested_format(request)
+        if file_format is None:
+            return Response({'file_format': 'Expected csv or xlsx.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (
+            OrganizationMember.objects.filter(organization=org)
+            .order_by('-is_leader', '-is_board_member', 'joined_at', 'pk')
+            .values_list(
+                'user__username', 'user__first_name', 'user__last_name', 'user__email',
+                'role', 'is_leader', 'is_board_member', 'joined_at',
+            )
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        header = ['Username', 'First name', 'Last name', 'Email', 'Role', 'Leader', 'Board member', 'Joined']
+        return export_response(f'{org.slug}-members', header, rows, file_format)
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedup_key']
+    readonly_fields = ['created_at', 'finished_at', 'locked_at', 'locked_by', 'last_error']
+
+    actions = ['retry_tasks']
+
+    def retry_tasks(self, request, queryset):
+        """Re-queue selected failed tasks"""
+        updated = queryset.filter(status=Task.FAILED).update(
+            status=Task.PENDING, attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} task(s) re-queued.')
+    retry_tasks.short_description = "Retry selected failed tasks"
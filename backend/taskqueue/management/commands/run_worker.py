@@ -0,0 +1,64 @@
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from taskqueue.queue import claim, purge_finished, requeue_stale, run, worker_id
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks queued in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.TASK_QUEUE_THREADS,
+                            help='Tasks run concurrently by this worker')
+        parser.add_argument('--poll-interval', type=float, default=settings.TASK_QUEUE_POLL_INTERVAL,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no task is due instead of polling forever')
+
+    def handle(self, *args, **options):
+        owner = worker_id()
+        threads = max(options['threads'], 1)
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running tasks, then stopping...')
+            stopping.set()
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(f'Worker {owner} started with {threads} thread(s)')
+        ran = failed = 0
+        last_maintenance = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='task') as pool:
+            while not stopping.is_set():
+                if time.monotonic() - last_maintenance > 60:
+                    requeue_stale()
+                    purge_finished(settings.TASK_QUEUE_KEEP_DONE_DAYS)
+                    last_maintenance = time.monotonic()
+
+                free = threads - len(running)
+                tasks = claim(free, owner) if free else []
+                close_old_connections()
+                running.update(pool.submit(run, task) for task in tasks)
+                if not running:
+                    if options['once']:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+
+                # Refill as soon as any slot frees up, or poll again for new work.
+                done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    ran += 1
+                    if not future.result():
+                        failed += 1
+            wait(running)
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {owner} stopped after {ran} task(s), {failed} failed'))
@@ -0,0 +1,163 @@
+"""
+A small durable task queue stored in the project database.
+
+Register a function with ``@task`` and call ``enqueue(func, *args)`` from a
+view; the row is written in the caller's transaction, so the work happens if
+and only if the request's changes commit. ``manage.py run_worker`` claims due
+rows with a conditional ``UPDATE`` (safe with several workers and no external
+broker), runs them on a thread pool and retries failures with exponential
+backoff.
+"""
+
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func):
+    """Mark ``func`` as runnable by the worker; its arguments must be JSON-serialisable"""
+    name = f'{func.__module__}.{func.__qualname__}'
+    _registry[name] = func
+    func.task_name = name
+    return func
+
+
+def _resolve(name):
+    if name not in _registry:
+        import_string(name)  # importing the module registers its tasks
+    return _registry[name]
+
+
+def enqueue(func, *args, dedup_key=None, delay=None, max_attempts=None, **kwargs):
+    """
+    Queue ``func(*args, **kwargs)`` to run in the background.
+
+    If a pending task with the same ``dedup_key`` is already queued, nothing
+    new is added and the existing task is returned.
+    """
+    name = getattr(func, 'task_name', None)
+    if name is None:
+        raise ValueError(f'{func!r} is not registered with @task')
+    if settings.TASK_QUEUE_EAGER:
+        func(*args, **kwargs)
+        return None
+
+    fields = {
+        'name': name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'dedup_key': dedup_key,
+        'run_at': timezone.now() + (delay or timedelta()),
+        'max_attempts': max_attempts or settings.TASK_QUEUE_MAX_ATTEMPTS,
+    }
+    if dedup_key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**fields)
+    except IntegrityError:
+        return Task.objects.filter(dedup_key=dedup_key, status=Task.PENDING).first()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_stale(timeout=None):
+    """Put back tasks whose worker died while running them"""
+    timeout = timeout or settings.TASK_QUEUE_VISIBILITY_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff)
+    superseded = {
+        'status': Task.FAILED, 'last_error': 'Worker lost; superseded by a newer copy.', 'finished_at': timezone.now(),
+    }
+    with transaction.atomic():
+        # A newer pending copy already covers these; re-queueing would duplicate it.
+        pending_keys = Task.objects.filter(status=Task.PENDING, dedup_key__isnull=False).values('dedup_key')
+        stale.filter(dedup_key__in=pending_keys).update(**superseded)
+        # Only one pending copy per key may exist: put back the newest stale one.
+        newest = (
+            stale.filter(dedup_key__isnull=False).values('dedup_key').order_by()
+            .annotate(newest=Max('pk')).values('newest')
+        )
+        stale.filter(dedup_key__isnull=False).exclude(pk__in=newest).update(**superseded)
+        return stale.update(status=Task.PENDING, locked_by='', locked_at=None)
+
+
+def claim(limit, owner):
+    """Atomically take up to ``limit`` due tasks for ``owner``"""
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+        .order_by('run_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in candidates:
+        # Another worker may have taken it since we looked.
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_by=owner, locked_at=now, attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def backoff(attempts):
+    """Seconds to wait before the next try, with jitter"""
+    base = settings.TASK_QUEUE_RETRY_BASE * (2 ** (attempts - 1))
+    return min(base, settings.TASK_QUEUE_RETRY_MAX) * random.uniform(0.8, 1.2)
+
+
+def run(task_row):
+    """Execute one claimed task and record its outcome"""
+    try:
+        func = _resolve(task_row.name)
+        func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Task %s #%s failed (attempt %s)', task_row.name, task_row.pk, task_row.attempts)
+        if task_row.attempts >= task_row.max_attempts:
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.FAILED, last_error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+            )
+        else:
+            retry_at = timezone.now() + timedelta(seconds=backoff(task_row.attempts))
+            try:
+                Task.objects.filter(pk=task_row.pk).update(
+                    status=Task.PENDING, last_error=error, run_at=retry_at, locked_by='', locked_at=None,
+                )
+            except IntegrityError:
+                # A fresh copy with the same dedup key was queued meanwhile.
+                Task.objects.filter(pk=task_row.pk).update(
+                    status=Task.FAILED, last_error=error, finished_at=timezone.now(),
+                )
+        return False
+    else:
+        Task.objects.filter(pk=task_row.pk).update(
+            status=Task.DONE, finished_at=timezone.now(), locked_by='', locked_at=None,
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def purge_finished(older_than_days):
+    """Delete done tasks older than the given age; returns how many"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = Task.objects.filter(status=Task.DONE, finished_at__lt=cutoff).delete()
+    return deleted